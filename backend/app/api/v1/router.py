@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1 import hotmoney, stock, daily, limit, sector, trend, stock_screen
+from app.api.v1 import hotmoney, stock, daily, limit, sector, trend, stock_screen, signal
 
 api_router = APIRouter()
 
@@ -10,3 +10,4 @@ api_router.include_router(limit.router)
 api_router.include_router(sector.router)
 api_router.include_router(trend.router)
 api_router.include_router(stock_screen.router)
+api_router.include_router(signal.router)
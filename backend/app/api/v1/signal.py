@@ -0,0 +1,99 @@
+"""
+信号API接口
+读取 daily_signal 中预计算的每日策略信号
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.core.database import get_db
+from app.models.signal import DailySignal, DailySignalState
+from strategy.signal_store import load_day_signals, strategy_hash
+from strategy.strategy_store import get_signal_engine
+
+router = APIRouter(prefix="/signal", tags=["信号"])
+
+
+# ============== 响应模型 ==============
+
+class SignalItem(BaseModel):
+    """信号股票"""
+    rank: int
+    ts_code: str
+    trade_date: str
+    signal_count: int
+    total_score: float
+    signal_types: str
+
+
+class SignalStateItem(BaseModel):
+    """策略物化状态"""
+    strategy: str
+    start_date: Optional[str] = None
+    last_date: Optional[str] = None
+    updated_at: Optional[str] = None
+    up_to_date: bool  # 策略定义未变化
+
+
+# ============== 接口 ==============
+
+@router.get("")
+def get_signals(
+    trade_date: Optional[str] = Query(None, description="交易日期 YYYYMMDD，默认最新物化的交易日"),
+    strategies: Optional[str] = Query(None, description="策略名称，逗号分隔，默认全部"),
+    min_score: float = Query(0.0, description="最小综合得分"),
+    limit: int = Query(50, ge=1, le=1000, description="返回数量"),
+    db: Session = Depends(get_db)
+):
+    """获取指定交易日的物化信号（按综合得分降序）"""
+    try:
+        if trade_date is None:
+            trade_date = db.query(func.max(DailySignal.trade_date)).scalar()
+            if trade_date is None:
+                return {"success": True, "data": {"trade_date": None, "items": []}}
+
+        names = [name.strip() for name in strategies.split(',') if name.strip()] if strategies else None
+        result_df = load_day_signals(
+            db.get_bind(), trade_date, names, min_score=min_score, top_n=limit, engine=get_signal_engine()
+        )
+        if result_df is None:
+            raise HTTPException(status_code=409, detail="信号表未物化到该交易日或策略定义已变化，请先运行信号物化")
+
+        items = [
+            SignalItem(
+                rank=int(row.rank),
+                ts_code=row.ts_code,
+                trade_date=row.trade_date,
+                signal_count=int(row.signal_count),
+                total_score=float(row.total_score),
+                signal_types=row.signal_types,
+            )
+            for row in result_df.itertuples(index=False)
+        ]
+        return {"success": True, "data": {"trade_date": trade_date, "items": items}}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取信号失败: {e}")
+
+
+@router.get("/status")
+def get_signal_status(db: Session = Depends(get_db)):
+    """获取各策略的信号物化状态"""
+    try:
+        engine = get_signal_engine()
+        items: List[SignalStateItem] = []
+        for state in db.query(DailySignalState).order_by(DailySignalState.strategy).all():
+            strategy = engine.get_strategy(state.strategy)
+            items.append(SignalStateItem(
+                strategy=state.strategy,
+                start_date=state.start_date,
+                last_date=state.last_date,
+                updated_at=state.updated_at.strftime('%Y-%m-%d %H:%M:%S') if state.updated_at else None,
+                up_to_date=strategy is not None and strategy_hash(strategy) == state.strategy_hash,
+            ))
+        return {"success": True, "data": items}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取信号物化状态失败: {e}")
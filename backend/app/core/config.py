@@ -25,6 +25,15 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/app.log"
 
+    # 本地行情缓存目录（相对路径基于 backend 目录）
+    MARKET_CACHE_DIR: str = "data/market_cache"
+
+    # 内存映射面板存储目录（相对路径基于 backend 目录）
+    PANEL_STORE_DIR: str = "data/panel_store"
+
+    # 回测数据上下文磁盘缓存目录（相对路径基于 backend 目录）
+    MARKET_CONTEXT_DIR: str = "data/market_context"
+
     @property
     def DATABASE_URL(self) -> str:
         return f"mysql+mysqlconnector://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
@@ -5,7 +5,8 @@ from app.models.daily import DailyData
 from app.models.limit import DailyLimitData
 from app.models.sector import DailySectorLimitData, ThsIndex
 from app.models.kline import WeeklyData, MonthlyData, AdjFactor
-from app.models.indicator import DailyIndicator
+from app.models.indicator import DailyIndicator, DailyIndicatorState
+from app.models.signal import DailySignal, DailySignalState
 from app.models.daily_basic import DailyBasic
 from app.models.fina_indicator import FinaIndicator
 
@@ -22,6 +23,9 @@ __all__ = [
     "MonthlyData",
     "AdjFactor",
     "DailyIndicator",
+    "DailyIndicatorState",
+    "DailySignal",
+    "DailySignalState",
     "DailyBasic",
     "FinaIndicator",
 ]
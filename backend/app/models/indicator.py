@@ -104,4 +104,34 @@ class DailyIndicator(Base):
     dma_ama = Column(Float, comment="DMA AMA线 (DIF的10日均线)")
 
     # ============== VR (成交量比率) ==============
-    vr = Column(Float, comment="VR 成交量比率")
\ No newline at end of file
+    vr = Column(Float, comment="VR 成交量比率")
+
+
+class DailyIndicatorState(Base):
+    """指标增量计算状态表 - 每只股票最后一个已计算交易日的递推状态
+
+    滚动窗口类指标 (MA/BOLL/RSI/WR/CCI 等) 只依赖最近 N 根K线，增量计算时从
+    daily_data 回看窗口重算；EMA、累计和、连续计数这类递推指标依赖全部历史，
+    需要在这里保存上一交易日的取值以便续算。递推值每天读出再写回，使用双精度
+    避免单精度 FLOAT 的舍入误差逐日累积。
+    """
+    __tablename__ = "daily_indicator_state"
+
+    ts_code = Column(String(20), primary_key=True, comment="股票代码")
+    trade_date = Column(String(10), comment="最后计算的交易日期")
+
+    # KDJ 平滑值
+    k_value = Column(Float(precision=53), comment="KDJ K值")
+    d_value = Column(Float(precision=53), comment="KDJ D值")
+
+    # MACD EMA
+    ema_fast = Column(Float(precision=53), comment="MACD 快线 EMA12")
+    ema_slow = Column(Float(precision=53), comment="MACD 慢线 EMA26")
+    macd_dea = Column(Float(precision=53), comment="MACD DEA线")
+
+    # OBV 累计值
+    obv = Column(Float(precision=53), comment="OBV 累计能量线")
+
+    # 连续涨跌计数
+    consecutive_down = Column(Integer, comment="连续下跌天数")
+    consecutive_up = Column(Integer, comment="连续上涨天数")
@@ -0,0 +1,39 @@
+"""
+每日信号物化表
+按 (股票, 交易日, 策略) 保存信号与得分，由 strategy.signal_store 增量写入
+"""
+from sqlalchemy import Column, String, Float, Boolean, DateTime, PrimaryKeyConstraint, Index
+from app.models.base import Base
+
+
+class DailySignal(Base):
+    """每日信号表 - 策略得分大于 0 的 (股票, 交易日) 记录
+
+    除触发信号的记录外，也保存部分条件满足（得分 > 0 但未触发）的记录，
+    这样按任意策略组合读取时综合得分与实时计算一致。
+    """
+    __tablename__ = "daily_signal"
+    __table_args__ = (
+        PrimaryKeyConstraint('trade_date', 'strategy', 'ts_code'),
+        Index('idx_signal_ts_code', 'ts_code', 'trade_date'),
+    )
+
+    trade_date = Column(String(10), comment="交易日期")
+    strategy = Column(String(64), comment="策略名称")
+    ts_code = Column(String(20), comment="股票代码")
+    is_signal = Column(Boolean, comment="是否触发信号")
+    score = Column(Float(precision=53), comment="策略得分（双精度，保证综合得分与实时计算一致）")
+
+
+class DailySignalState(Base):
+    """信号物化状态表 - 每个策略的定义哈希与已物化的最后交易日
+
+    策略定义变化（哈希不一致）时该策略的历史信号全部重算。
+    """
+    __tablename__ = "daily_signal_state"
+
+    strategy = Column(String(64), primary_key=True, comment="策略名称")
+    strategy_hash = Column(String(64), comment="策略定义哈希")
+    start_date = Column(String(10), comment="物化起始交易日期")
+    last_date = Column(String(10), comment="已物化的最后交易日期")
+    updated_at = Column(DateTime, comment="更新时间")
@@ -232,7 +232,8 @@ class IndicatorService:
     def get_all_indicators_batch(
         db: Session,
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        use_cache: bool = False
     ) -> pd.DataFrame:
         """
         批量获取所有股票的指标数据（用于策略回测）
@@ -241,10 +242,18 @@ class IndicatorService:
             db: 数据库会话
             start_date: 开始日期 (YYYYMMDD)
             end_date: 结束日期 (YYYYMMDD)
+            use_cache: 优先从本地行情缓存读取，未建立缓存时查询数据库
 
         Returns:
             pandas DataFrame
         """
+        if use_cache:
+            from strategy.market_cache import MarketCache
+
+            df = MarketCache().try_read('daily_indicator', start_date, end_date)
+            if df is not None:
+                return df
+
         query = "SELECT * FROM daily_indicator WHERE 1=1"
         params = {}
 
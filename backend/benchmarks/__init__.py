@@ -0,0 +1,4 @@
+"""
+性能基准测试
+用合成行情数据对指标计算、信号检测和回测计时，不依赖数据库；结果保存为 JSON 便于跨提交对比
+"""
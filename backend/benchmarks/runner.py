@@ -0,0 +1,421 @@
+"""
+基准测试运行器
+在合成行情数据上对指标计算、信号检测和回测计时，记录耗时、吞吐量（行/秒）和峰值内存，
+结果保存为 JSON；对比两份结果可发现跨提交的性能回退。
+
+运行方式（backend 目录下）:
+    python -m benchmarks.runner --stocks 500 --days 750
+    python -m benchmarks.runner --cases signals,backtest --repeat 3
+    python -m benchmarks.runner --compare benchmarks/results/旧.json benchmarks/results/新.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from benchmarks.synthetic import make_daily_data, split_dates
+from strategy.backtest_engine import BacktestConfig, BacktestEngine
+from strategy.data_loader import KEY_COLUMNS, PRICE_COLUMNS, compact_frame, frame_with_lookback
+from strategy.indicator_calc import INDICATOR_COLUMNS, calculate_all_indicators
+from strategy.indicator_panel import calculate_all_indicators_panel
+from strategy.signal_engine import ConditionMaskCache, SignalEngine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 结果输出目录
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+
+
+@dataclass
+class BenchmarkParams:
+    """基准测试参数"""
+    stocks: int = 300                 # 股票数量
+    days: int = 600                   # 交易日数量
+    seed: int = 42                    # 随机种子
+    warmup_days: int = 120            # 回测前的指标预热交易日数
+    repeat: int = 1                   # 每项重复次数（取最短耗时）
+    strategies: Optional[List[str]] = None  # 信号检测与回测使用的策略，None 表示全部内置策略
+
+
+# ============== 内存回测引擎 ==============
+
+class InMemoryBacktestEngine(BacktestEngine):
+    """从内存中的指标与价格数据回测，不访问数据库（db 参数可为 None，sql_filter 被忽略）"""
+
+    def __init__(
+        self,
+        indicator_df: pd.DataFrame,
+        price_df: pd.DataFrame,
+        config: Optional[BacktestConfig] = None,
+        **kwargs
+    ):
+        super().__init__(config, **kwargs)
+        self.indicator_df = indicator_df
+        self.price_df = price_df
+
+    def load_data(
+        self,
+        db,
+        start_date: str,
+        end_date: str,
+        indicator_columns: Optional[List[str]] = None,
+        sql_filter: Optional[Tuple[str, list]] = None,
+        lookback: int = 0
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        indicator_df = frame_with_lookback(self.indicator_df, start_date, end_date, lookback)
+        if indicator_columns is not None:
+            indicator_df = indicator_df[KEY_COLUMNS + [c for c in indicator_columns if c in indicator_df.columns]]
+
+        price_dates = self.price_df['trade_date'].astype(str)
+        price_df = self.price_df[(price_dates >= start_date) & (price_dates <= end_date)]
+        return indicator_df.reset_index(drop=True), price_df.reset_index(drop=True)
+
+
+# ============== 测试项 ==============
+
+def _make_daily(params: BenchmarkParams) -> pd.DataFrame:
+    return make_daily_data(params.stocks, params.days, seed=params.seed)
+
+
+def _make_indicators(params: BenchmarkParams) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """合成日线与对应的指标数据（与 load_indicator_frame 一样降为 float32）"""
+    daily = _make_daily(params)
+    indicators = calculate_all_indicators_panel(daily)[INDICATOR_COLUMNS]
+    indicators = compact_frame(indicators, date_dtype='str')
+    return daily, indicators
+
+
+def _setup_backtest(params: BenchmarkParams) -> Dict:
+    daily, indicators = _make_indicators(params)
+    start_date = split_dates(daily, params.warmup_days)
+    if start_date is None:
+        raise ValueError(f"交易日数量 {params.days} 不足以跳过 {params.warmup_days} 天预热期")
+    return {
+        'indicators': indicators,
+        'prices': daily[KEY_COLUMNS + PRICE_COLUMNS],
+        'start_date': start_date,
+        'end_date': daily['trade_date'].max(),
+        'strategies': params.strategies,
+    }
+
+
+def _setup_backtest_vector(params: BenchmarkParams) -> Dict:
+    state = _setup_backtest(params)
+    # 每个测试项在新进程中运行：计时前先在少量股票上回测一次，
+    # numba 编译（或读取编译缓存）不计入回测耗时
+    codes = state['prices']['ts_code'].unique()[:2]
+    _run_backtest({
+        **state,
+        'indicators': state['indicators'][state['indicators']['ts_code'].isin(codes)],
+        'prices': state['prices'][state['prices']['ts_code'].isin(codes)],
+    }, vectorized=True)
+    return state
+
+
+def _run_indicators(daily: pd.DataFrame) -> Tuple[int, Dict]:
+    for _, stock_df in daily.groupby('ts_code', sort=False):
+        calculate_all_indicators(stock_df.reset_index(drop=True))
+    return len(daily), {}
+
+
+def _run_indicators_panel(daily: pd.DataFrame) -> Tuple[int, Dict]:
+    calculate_all_indicators_panel(daily)
+    return len(daily), {}
+
+
+def _run_signals(state: Dict) -> Tuple[int, Dict]:
+    # 每次使用新的掩码缓存，重复运行不命中上一次的结果
+    engine = SignalEngine(mask_cache=ConditionMaskCache())
+    result_df = engine.detect_signals(state['indicators'], state['strategies'])
+    return len(result_df), {'signals': int(result_df['has_signal'].sum())}
+
+
+def _run_backtest(state: Dict, vectorized: bool = False) -> Tuple[int, Dict]:
+    engine = InMemoryBacktestEngine(state['indicators'], state['prices'], vectorized=vectorized)
+    performance = engine.run_backtest(None, state['start_date'], state['end_date'], state['strategies'])
+    prices = state['prices']
+    rows = int(((prices['trade_date'] >= state['start_date']) & (prices['trade_date'] <= state['end_date'])).sum())
+    return rows, {'trades': int(performance.get('total_trades', 0)),
+                  'total_return': float(performance.get('total_return', 0.0))}
+
+
+@dataclass
+class BenchmarkCase:
+    """测试项：setup 生成输入数据（不计时），run 执行被测操作并返回 (处理行数, 附加指标)"""
+    name: str
+    description: str
+    setup: Callable[[BenchmarkParams], Any]
+    run: Callable[[Any], Tuple[int, Dict]]
+
+
+BENCHMARK_CASES: Dict[str, BenchmarkCase] = {
+    case.name: case for case in [
+        BenchmarkCase('indicators', '逐股票 calculate_all_indicators', _make_daily, _run_indicators),
+        BenchmarkCase('indicators_panel', '全市场面板 calculate_all_indicators_panel', _make_daily,
+                      _run_indicators_panel),
+        BenchmarkCase('signals', 'SignalEngine.detect_signals',
+                      lambda params: {'indicators': _make_indicators(params)[1], 'strategies': params.strategies},
+                      _run_signals),
+        BenchmarkCase('backtest', 'BacktestEngine.run_backtest（内存数据）', _setup_backtest, _run_backtest),
+        BenchmarkCase('backtest_vector', 'BacktestEngine.run_backtest 数组化回测（内存数据）', _setup_backtest_vector,
+                      partial(_run_backtest, vectorized=True)),
+    ]
+}
+
+
+# ============== 计时与内存 ==============
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存 (MB)"""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / 1024 / 1024
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(name: str, params: BenchmarkParams) -> Dict:
+    """
+    运行单个测试项
+
+    Returns:
+        {'seconds': 最短耗时, 'rows': 处理行数, 'rows_per_sec', 'setup_seconds',
+         'setup_peak_rss_mb': 准备数据后的峰值内存, 'peak_rss_mb': 运行后的峰值内存, ...附加指标}
+    """
+    case = BENCHMARK_CASES[name]
+
+    start = time.perf_counter()
+    state = case.setup(params)
+    setup_seconds = time.perf_counter() - start
+    setup_peak = peak_rss_mb()
+
+    best = float('inf')
+    rows, extra = 0, {}
+    for _ in range(max(params.repeat, 1)):
+        start = time.perf_counter()
+        rows, extra = case.run(state)
+        best = min(best, time.perf_counter() - start)
+
+    return {
+        'description': case.description,
+        'seconds': best,
+        'rows': rows,
+        'rows_per_sec': rows / best if best > 0 else 0.0,
+        'setup_seconds': setup_seconds,
+        'setup_peak_rss_mb': setup_peak,
+        'peak_rss_mb': peak_rss_mb(),
+        **extra,
+    }
+
+
+def _run_case_isolated(name: str, params: BenchmarkParams, verbose: bool) -> Dict:
+    """子进程入口：峰值内存只反映本测试项"""
+    if not verbose:
+        logger.disable('strategy')
+    return run_case(name, params)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    cases: Optional[List[str]] = None,
+    params: Optional[BenchmarkParams] = None,
+    isolate: bool = True,
+    verbose: bool = False
+) -> Dict:
+    """
+    运行基准测试
+
+    Args:
+        cases: 测试项名称列表，None 表示全部（见 BENCHMARK_CASES）
+        params: 测试参数
+        isolate: 每个测试项在独立子进程中运行（峰值内存互不影响）
+        verbose: 输出被测模块的日志
+
+    Returns:
+        {'meta': 运行环境与参数, 'results': {测试项: 结果}}
+    """
+    params = params or BenchmarkParams()
+    cases = cases or list(BENCHMARK_CASES.keys())
+    unknown = [name for name in cases if name not in BENCHMARK_CASES]
+    if unknown:
+        raise ValueError(f"未知测试项: {', '.join(unknown)}，可选: {', '.join(BENCHMARK_CASES)}")
+
+    results = {}
+    for name in cases:
+        logger.info(f"运行 {name} ({params.stocks} 只股票 x {params.days} 个交易日)...")
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context('spawn')) as executor:
+                results[name] = executor.submit(_run_case_isolated, name, params, verbose).result()
+        else:
+            results[name] = run_case(name, params)
+        r = results[name]
+        logger.info(f"{name}: {r['seconds']:.3f} 秒, {r['rows_per_sec']:,.0f} 行/秒, 峰值内存 {r['peak_rss_mb']:.0f} MB")
+
+    return {
+        'meta': {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'isolate': isolate,
+            'params': asdict(params),
+        },
+        'results': results,
+    }
+
+
+def save_report(report: Dict, output: Optional[str] = None) -> str:
+    """保存结果 JSON，默认 RESULTS_DIR/benchmark_{提交}_{时间}.json"""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        commit = (report['meta'].get('git_commit') or 'nogit')[:8]
+        output = os.path.join(RESULTS_DIR, f"benchmark_{commit}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return output
+
+
+# ============== 结果对比 ==============
+
+def compare_reports(base: Dict, new: Dict, threshold: float = 0.1) -> List[Dict]:
+    """
+    对比两份结果
+
+    Args:
+        base: 基准结果
+        new: 新结果
+        threshold: 耗时或峰值内存增加超过该比例视为回退
+
+    Returns:
+        [{'case', 'base_seconds', 'new_seconds', 'time_change', 'base_rss_mb', 'new_rss_mb',
+          'rss_change', 'regression'}]，只包含两份结果都有的测试项
+    """
+    if base['meta'].get('params') != new['meta'].get('params'):
+        logger.warning("两份结果的测试参数不同，对比结果仅供参考")
+
+    rows = []
+    for name, new_result in new['results'].items():
+        base_result = base['results'].get(name)
+        if base_result is None:
+            continue
+        time_change = new_result['seconds'] / base_result['seconds'] - 1 if base_result['seconds'] > 0 else 0.0
+        rss_change = (new_result['peak_rss_mb'] / base_result['peak_rss_mb'] - 1
+                      if base_result['peak_rss_mb'] > 0 else 0.0)
+        rows.append({
+            'case': name,
+            'base_seconds': base_result['seconds'],
+            'new_seconds': new_result['seconds'],
+            'time_change': time_change,
+            'base_rss_mb': base_result['peak_rss_mb'],
+            'new_rss_mb': new_result['peak_rss_mb'],
+            'rss_change': rss_change,
+            'regression': time_change > threshold or rss_change > threshold,
+        })
+    return rows
+
+
+def print_report(report: Dict):
+    print(f"\n提交: {report['meta'].get('git_commit') or '-'}  参数: {report['meta']['params']}")
+    print(f"{'测试项':<20}{'耗时(秒)':>12}{'行/秒':>16}{'峰值内存(MB)':>16}")
+    print("-" * 64)
+    for name, r in report['results'].items():
+        print(f"{name:<20}{r['seconds']:>12.3f}{r['rows_per_sec']:>16,.0f}{r['peak_rss_mb']:>16.0f}")
+
+
+def print_comparison(rows: List[Dict]):
+    print(f"\n{'测试项':<20}{'基准(秒)':>12}{'当前(秒)':>12}{'耗时变化':>12}{'内存变化':>12}")
+    print("-" * 68)
+    for row in rows:
+        flag = '  <-- 回退' if row['regression'] else ''
+        print(f"{row['case']:<20}{row['base_seconds']:>12.3f}{row['new_seconds']:>12.3f}"
+              f"{row['time_change']:>+12.1%}{row['rss_change']:>+12.1%}{flag}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='指标/信号/回测性能基准测试')
+    parser.add_argument('--cases', type=str, default=None,
+                        help=f"测试项，逗号分隔（默认全部: {','.join(BENCHMARK_CASES)}）")
+    parser.add_argument('--stocks', type=int, default=BenchmarkParams.stocks, help='股票数量')
+    parser.add_argument('--days', type=int, default=BenchmarkParams.days, help='交易日数量')
+    parser.add_argument('--seed', type=int, default=BenchmarkParams.seed, help='随机种子')
+    parser.add_argument('--warmup-days', type=int, default=BenchmarkParams.warmup_days, help='回测前的预热交易日数')
+    parser.add_argument('--repeat', type=int, default=BenchmarkParams.repeat, help='每项重复次数（取最短耗时）')
+    parser.add_argument('--strategies', type=str, default=None, help='策略名称，逗号分隔（默认全部）')
+    parser.add_argument('--no-isolate', action='store_true', help='在当前进程中运行全部测试项')
+    parser.add_argument('--verbose', action='store_true', help='输出被测模块的日志')
+    parser.add_argument('--output', type=str, default=None, help='结果 JSON 路径')
+    parser.add_argument('--compare', type=str, nargs=2, metavar=('BASE', 'NEW'), default=None,
+                        help='对比两份结果 JSON，有回退时退出码为 1')
+    parser.add_argument('--threshold', type=float, default=0.1, help='对比时视为回退的增幅')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], 'r', encoding='utf-8') as f:
+            base_report = json.load(f)
+        with open(args.compare[1], 'r', encoding='utf-8') as f:
+            new_report = json.load(f)
+        comparison = compare_reports(base_report, new_report, args.threshold)
+        print_comparison(comparison)
+        sys.exit(1 if any(row['regression'] for row in comparison) else 0)
+
+    if not args.verbose:
+        logger.disable('strategy')
+
+    bench_params = BenchmarkParams(
+        stocks=args.stocks,
+        days=args.days,
+        seed=args.seed,
+        warmup_days=args.warmup_days,
+        repeat=args.repeat,
+        strategies=args.strategies.split(',') if args.strategies else None,
+    )
+    report = run_benchmarks(
+        cases=args.cases.split(',') if args.cases else None,
+        params=bench_params,
+        isolate=not args.no_isolate,
+        verbose=args.verbose,
+    )
+    path = save_report(report, args.output)
+    print_report(report)
+    print(f"\n结果已保存到: {path}")
@@ -0,0 +1,106 @@
+"""
+合成行情数据生成
+生成与 daily_data 表结构一致的 [股票 x 交易日] 长表，含上市时间不一、随机停牌和涨跌停截断，
+同一参数（含 seed）生成的数据完全相同
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# daily_data 的列顺序
+DAILY_COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 'pre_close',
+                 'price_change', 'pct_chg', 'vol', 'amount']
+
+
+def make_trade_dates(n_days: int, start_date: str = '20200102') -> np.ndarray:
+    """从 start_date 起的 n_days 个工作日 (YYYYMMDD)"""
+    return pd.bdate_range(pd.Timestamp(start_date), periods=n_days).strftime('%Y%m%d').to_numpy()
+
+
+def make_ts_codes(n_stocks: int) -> np.ndarray:
+    """股票代码：依次分配到深市、沪市"""
+    return np.array([f"{i:06d}.SZ" if i % 2 == 0 else f"{600000 + i:06d}.SH" for i in range(n_stocks)])
+
+
+def make_daily_data(
+    n_stocks: int = 500,
+    n_days: int = 750,
+    seed: int = 42,
+    start_date: str = '20200102',
+    suspend_rate: float = 0.01,
+    late_listing_rate: float = 0.1,
+    limit_pct: float = 0.1
+) -> pd.DataFrame:
+    """
+    生成合成日线数据
+
+    Args:
+        n_stocks: 股票数量
+        n_days: 交易日数量
+        seed: 随机种子
+        start_date: 第一个交易日 (YYYYMMDD)
+        suspend_rate: 每个交易日的停牌概率（停牌日无数据）
+        late_listing_rate: 区间内才上市的股票比例
+        limit_pct: 涨跌停幅度，日收益率截断在 ±limit_pct
+
+    Returns:
+        按 (ts_code, trade_date) 升序、列与 daily_data 一致的 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    dates = make_trade_dates(n_days, start_date)
+    codes = make_ts_codes(n_stocks)
+
+    # 收益率：市场因子 + 个股波动，截断在涨跌停内，收盘价保留两位小数
+    market = rng.normal(0.0003, 0.012, (n_days, 1))
+    vol_scale = rng.uniform(0.01, 0.035, n_stocks)
+    returns = np.clip(market + rng.normal(0, 1, (n_days, n_stocks)) * vol_scale, -limit_pct, limit_pct)
+    start_price = rng.uniform(3, 80, n_stocks)
+    close = np.round(start_price * np.exp(np.cumsum(np.log1p(returns), axis=0)), 2)
+    close = np.maximum(close, 0.01)
+
+    spread = rng.uniform(0, 0.04, (n_days, n_stocks))
+    high = np.round(close * (1 + spread * rng.uniform(0, 1, (n_days, n_stocks))), 2)
+    low = np.round(close * (1 - spread * rng.uniform(0, 1, (n_days, n_stocks))), 2)
+    open_ = np.round(low + (high - low) * rng.uniform(0, 1, (n_days, n_stocks)), 2)
+
+    # 成交量（手）与量价相关，成交额（千元）= 成交量 × 均价 / 10
+    base_vol = rng.lognormal(11, 1, n_stocks)
+    vol = np.maximum(base_vol * np.exp(rng.normal(0, 0.4, (n_days, n_stocks)) + 8 * np.abs(returns)), 1).astype(np.int64)
+    amount = np.round(vol * (high + low + close) / 3 / 10, 3)
+
+    # 有效性：上市前与停牌日没有数据
+    valid = rng.uniform(0, 1, (n_days, n_stocks)) >= suspend_rate
+    listing = np.zeros(n_stocks, dtype=np.int64)
+    late = rng.uniform(0, 1, n_stocks) < late_listing_rate
+    listing[late] = rng.integers(0, max(n_days // 2, 1), late.sum())
+    valid &= np.arange(n_days)[:, None] >= listing[None, :]
+
+    # 转为按股票优先的长表
+    stock_idx, date_idx = np.nonzero(valid.T)
+    df = pd.DataFrame({
+        'ts_code': codes[stock_idx],
+        'trade_date': dates[date_idx],
+        'open': open_[date_idx, stock_idx],
+        'high': high[date_idx, stock_idx],
+        'low': low[date_idx, stock_idx],
+        'close': close[date_idx, stock_idx],
+        'vol': vol[date_idx, stock_idx],
+        'amount': amount[date_idx, stock_idx],
+    })
+
+    # 昨收为该股票上一个有数据交易日的收盘价（上市首日为开盘价）
+    first = np.r_[True, stock_idx[1:] != stock_idx[:-1]]
+    pre_close = np.r_[np.nan, df['close'].to_numpy()[:-1]]
+    pre_close[first] = df['open'].to_numpy()[first]
+    df['pre_close'] = pre_close
+    df['price_change'] = np.round(df['close'] - df['pre_close'], 2)
+    df['pct_chg'] = np.round(df['price_change'] / df['pre_close'] * 100, 4)
+
+    return df[DAILY_COLUMNS]
+
+
+def split_dates(df: pd.DataFrame, warmup_days: int) -> Optional[str]:
+    """跳过前 warmup_days 个交易日后的第一个交易日（指标预热期之后），数据不足时返回 None"""
+    dates = np.sort(df['trade_date'].unique())
+    return dates[warmup_days] if len(dates) > warmup_days else None
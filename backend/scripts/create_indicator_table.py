@@ -18,15 +18,18 @@ from loguru import logger
 from sqlalchemy import text
 from app.core.database import engine
 from app.models.base import Base
-from app.models.indicator import DailyIndicator
+from app.models.indicator import DailyIndicator, DailyIndicatorState
+
+# 增量计算状态表中逐日读写的递推列
+STATE_DOUBLE_COLUMNS = ['k_value', 'd_value', 'ema_fast', 'ema_slow', 'macd_dea', 'obv']
 
 
 def create_indicator_table():
     """创建技术指标表"""
     logger.info("开始创建技术指标表...")
 
-    # 创建表
-    Base.metadata.create_all(bind=engine, tables=[DailyIndicator.__table__])
+    # 创建表（含增量计算状态表）
+    Base.metadata.create_all(bind=engine, tables=[DailyIndicator.__table__, DailyIndicatorState.__table__])
 
     logger.info("技术指标表创建完成")
 
@@ -45,12 +48,21 @@ def create_indicator_table():
 
     logger.info("索引创建完成")
 
+    # 已有的状态表：递推列升级为双精度（DOUBLE）
+    with engine.connect() as conn:
+        for column in STATE_DOUBLE_COLUMNS:
+            comment = DailyIndicatorState.__table__.c[column].comment
+            conn.execute(text(f"ALTER TABLE daily_indicator_state MODIFY {column} DOUBLE COMMENT '{comment}'"))
+        conn.commit()
+    logger.info("状态表递推列已为双精度")
+
 
 def drop_indicator_table():
     """删除技术指标表（谨慎使用）"""
     logger.warning("即将删除技术指标表...")
     with engine.connect() as conn:
         conn.execute(text("DROP TABLE IF EXISTS daily_indicator"))
+        conn.execute(text("DROP TABLE IF EXISTS daily_indicator_state"))
         conn.commit()
     logger.info("技术指标表已删除")
 
@@ -0,0 +1,52 @@
+"""
+数据库迁移脚本 - 创建每日信号表
+运行方式: python backend/scripts/create_signal_table.py
+"""
+import sys
+import os
+
+# 设置工作目录为 backend 目录
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+# 加载环境变量
+from dotenv import load_dotenv
+load_dotenv(os.path.join(backend_dir, '.env'))
+
+from loguru import logger
+from sqlalchemy import text
+from app.core.database import engine
+from app.models.base import Base
+from app.models.signal import DailySignal, DailySignalState
+
+
+def create_signal_table():
+    """创建每日信号表（含物化状态表）"""
+    logger.info("开始创建每日信号表...")
+    Base.metadata.create_all(bind=engine, tables=[DailySignal.__table__, DailySignalState.__table__])
+    logger.info("每日信号表创建完成")
+
+
+def drop_signal_table():
+    """删除每日信号表（谨慎使用）"""
+    logger.warning("即将删除每日信号表...")
+    with engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS daily_signal"))
+        conn.execute(text("DROP TABLE IF EXISTS daily_signal_state"))
+        conn.commit()
+    logger.info("每日信号表已删除")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='每日信号表管理')
+    parser.add_argument('--drop', action='store_true', help='删除表（谨慎使用）')
+
+    args = parser.parse_args()
+
+    if args.drop:
+        drop_signal_table()
+    else:
+        create_signal_table()
@@ -8,8 +8,8 @@ from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from loguru import logger
-from sqlalchemy import text
 
+from strategy.data_loader import load_indicator_frame, load_price_frame, PRICE_COLUMNS
 from strategy.signal_engine import SignalEngine, SignalStrategy
 
 
@@ -54,70 +54,220 @@ class BacktestConfig:
     max_hold_days: int = 20               # 最大持仓天数
     stop_loss_pct: float = -0.08          # 止损比例
     take_profit_pct: float = 0.15         # 止盈比例
+    execution: str = 'close'              # 成交模型名称（见 EXECUTION_MODELS）
+
+
+# ============== 成交模型 ==============
+
+@dataclass
+class ExecutionModel:
+    """
+    成交模型
+
+    entry:
+        'close' 信号当日收盘价买入；
+        'next_open' 次日开盘价买入，当日买入的持仓次日起才检查卖出（T+1）
+    exit:
+        'close' 按收盘价盈亏判断止损/止盈并以收盘价卖出；
+        'intrabar' 最低价触及止损价 / 最高价触及止盈价即成交（开盘已越过时以开盘价成交，
+        同一天都触及时按止损处理），达到最大持仓天数以收盘价卖出
+    price_limit: 涨停不买、跌停不卖（按 pct_chg 判断：收盘成交看收盘是否涨跌停，
+        开盘买入要求开盘即封涨停，盘中卖出要求一字跌停）
+    limit_pct: 涨跌停阈值（%），与选股器一致
+    """
+    entry: str = 'close'
+    exit: str = 'close'
+    price_limit: bool = False
+    limit_pct: float = 9.8
+
+    def __post_init__(self):
+        if self.entry not in ('close', 'next_open'):
+            raise ValueError(f"不支持的买入方式: {self.entry}，可选 close / next_open")
+        if self.exit not in ('close', 'intrabar'):
+            raise ValueError(f"不支持的卖出方式: {self.exit}，可选 close / intrabar")
+
+
+# 已注册的成交模型，BacktestConfig.execution 按名称引用
+EXECUTION_MODELS: Dict[str, ExecutionModel] = {
+    'close': ExecutionModel(),
+    'next_open': ExecutionModel(entry='next_open'),
+    'intrabar': ExecutionModel(exit='intrabar'),
+    'realistic': ExecutionModel(entry='next_open', exit='intrabar', price_limit=True),
+}
+
+
+def register_execution_model(name: str, model: ExecutionModel):
+    """注册成交模型"""
+    EXECUTION_MODELS[name] = model
+
+
+def get_execution_model(name: str) -> ExecutionModel:
+    """按名称获取成交模型"""
+    if name not in EXECUTION_MODELS:
+        raise ValueError(f"成交模型不存在: {name}，可选: {', '.join(EXECUTION_MODELS)}")
+    return EXECUTION_MODELS[name]
+
+
+def execution_bars(arrays: Dict[str, np.ndarray], model: ExecutionModel) -> Dict[str, np.ndarray]:
+    """
+    成交模型用到的 [n_dates, n_stocks] 数组，一次性向量化计算
+
+    Args:
+        arrays: 价格字段数组（至少含 close，open / high / low / pct_chg 缺失时以收盘价代替、不判断涨跌停）
+        model: 成交模型
+
+    Returns:
+        {'close', 'open', 'high', 'low': float64 价格,
+         'no_buy': 涨停不可买, 'no_sell_close': 收盘跌停不可卖, 'no_sell_intrabar': 一字跌停不可卖}
+    """
+    close = np.asarray(arrays['close']).astype(np.float64, copy=False)
+    bars = {'close': close}
+    for field in ('open', 'high', 'low'):
+        values = arrays.get(field)
+        if values is None:
+            bars[field] = close
+        else:
+            values = np.asarray(values).astype(np.float64, copy=False)
+            bars[field] = np.where(np.isnan(values), close, values)
+
+    no_trade = np.zeros(close.shape, dtype=bool)
+    pct_chg = arrays.get('pct_chg')
+    if not model.price_limit or pct_chg is None:
+        bars.update(no_buy=no_trade, no_sell_close=no_trade, no_sell_intrabar=no_trade)
+        return bars
+
+    pct_chg = np.asarray(pct_chg)
+    limit_up = pct_chg >= model.limit_pct
+    limit_down = pct_chg <= -model.limit_pct
+    if model.entry == 'next_open':
+        bars['no_buy'] = limit_up & (bars['open'] >= bars['high'])
+    else:
+        bars['no_buy'] = limit_up
+    bars['no_sell_close'] = limit_down
+    bars['no_sell_intrabar'] = limit_down & (bars['high'] <= bars['low'])
+    return bars
+
+
+class PriceIndex:
+    """
+    价格索引：价格数据按 [交易日, 股票] 展开为二维数组，逐日回测中按 (交易日, 股票) O(1) 取价
+
+    数组保持原列的浮点类型；同一 (交易日, 股票) 有多行时取第一行，与按行筛选后取 iloc[0] 一致。
+    """
+
+    def __init__(self, price_df: pd.DataFrame, fields: Optional[List[str]] = None):
+        fields = [col for col in (fields or PRICE_COLUMNS) if col in price_df.columns]
+        price_df = price_df[~price_df.duplicated(['trade_date', 'ts_code'])]
+
+        date_codes, dates = pd.factorize(price_df['trade_date'].astype(str), sort=True)
+        stock_codes, codes = pd.factorize(price_df['ts_code'].astype(str), sort=True)
+        self.dates: List[str] = list(dates)
+        self.codes: List[str] = list(codes)
+        self.date_pos: Dict[str, int] = {date: i for i, date in enumerate(self.dates)}
+        self.code_pos: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+
+        shape = (len(self.dates), len(self.codes))
+        self.present = np.zeros(shape, dtype=bool)   # 该交易日有价格行
+        self.present[date_codes, stock_codes] = True
+        self._arrays: Dict[str, np.ndarray] = {}
+        for field in fields:
+            values = price_df[field].to_numpy()
+            dtype = values.dtype if np.issubdtype(values.dtype, np.floating) else np.float64
+            array = np.full(shape, np.nan, dtype=dtype)
+            array[date_codes, stock_codes] = values
+            self._arrays[field] = array
+
+    def array(self, field: str) -> np.ndarray:
+        """字段的 [n_dates, n_stocks] 数组，缺失为 NaN"""
+        return self._arrays[field]
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """全部字段数组"""
+        return dict(self._arrays)
+
+    def get(self, trade_date: str, ts_code: str, field: str = 'close'):
+        """该交易日该股票的价格，无价格行时返回 None"""
+        i = self.date_pos.get(trade_date)
+        j = self.code_pos.get(ts_code)
+        if i is None or j is None or not self.present[i, j]:
+            return None
+        return self._arrays[field][i, j]
 
 
 class BacktestEngine:
     """回测引擎"""
 
-    def __init__(self, config: Optional[BacktestConfig] = None):
+    def __init__(
+        self,
+        config: Optional[BacktestConfig] = None,
+        use_cache: bool = False,
+        panel_store=None,
+        compact: bool = True,
+        pushdown: bool = False,
+        use_signal_table: bool = False,
+        vectorized: bool = False
+    ):
         self.config = config or BacktestConfig()
         self.signal_engine = SignalEngine()
+        self.use_cache = use_cache  # 优先从本地行情缓存加载数据
+        self.panel_store = panel_store  # 内存映射面板存储 (PanelStore)，优先级最高
+        self.compact = compact  # 指标列以 float32 加载
+        self.pushdown = pushdown  # 策略条件下推到 SQL，只读取候选信号行
+        self.use_signal_table = use_signal_table  # 优先读取 daily_signal 中的物化信号
+        self.vectorized = vectorized  # 使用数组化回测（strategy.vector_backtest），不逐日更新持仓对象
+        self.execution = get_execution_model(self.config.execution)  # 成交模型
 
         # 回测状态
         self.cash = self.config.initial_capital
         self.positions: Dict[str, Position] = {}
         self.trades: List[Trade] = []
         self.daily_values: List[Dict] = []
+        self._price_index: Optional[Tuple[pd.DataFrame, PriceIndex]] = None
+        self._bars: Optional[Dict[str, np.ndarray]] = None
 
     def load_data(
         self,
         db,
         start_date: str,
-        end_date: str
+        end_date: str,
+        indicator_columns: Optional[List[str]] = None,
+        sql_filter: Optional[Tuple[str, list]] = None,
+        lookback: int = 0
     ) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
-        加载回测数据
+        加载回测数据（面板存储 → 本地缓存 → 数据库）
 
         Args:
             db: 数据库会话
             start_date: 开始日期
             end_date: 结束日期
+            indicator_columns: 需要的指标列，None 表示全部
+            sql_filter: 指标数据的 SQL 筛选条件（见 SignalEngine.compile_sql_filter）
+            lookback: 指标数据每只股票额外向前读取的行数（时间序列条件需要回测开始前的历史，停牌日不计）
 
         Returns:
             (指标数据, 价格数据)
         """
-        # 加载指标数据
-        indicator_query = text("""
-            SELECT * FROM daily_indicator
-            WHERE trade_date >= :start_date
-              AND trade_date <= :end_date
-            ORDER BY ts_code, trade_date
-        """)
-        indicator_df = pd.read_sql(
-            indicator_query, db.bind,
-            params={'start_date': start_date, 'end_date': end_date}
+        bind = db.get_bind()
+        float_dtype = 'float32' if self.compact else None
+        indicator_df = load_indicator_frame(
+            bind, start_date, end_date, columns=indicator_columns, float_dtype=float_dtype,
+            use_cache=self.use_cache, panel_store=self.panel_store, sql_filter=sql_filter, lookback=lookback
         )
-        logger.info(f"加载指标数据: {len(indicator_df)} 条")
-
-        # 加载价格数据
-        price_query = text("""
-            SELECT ts_code, trade_date, open, high, low, close, vol, pct_chg
-            FROM daily_data
-            WHERE trade_date >= :start_date
-              AND trade_date <= :end_date
-            ORDER BY ts_code, trade_date
-        """)
-        price_df = pd.read_sql(
-            price_query, db.bind,
-            params={'start_date': start_date, 'end_date': end_date}
+        price_df = load_price_frame(
+            bind, start_date, end_date, use_cache=self.use_cache, panel_store=self.panel_store
         )
-        logger.info(f"加载价格数据: {len(price_df)} 条")
-
         return indicator_df, price_df
 
+    def price_index(self, price_df: pd.DataFrame) -> PriceIndex:
+        """价格数据的索引（同一价格数据只构建一次）"""
+        if self._price_index is None or self._price_index[0] is not price_df:
+            self._price_index = (price_df, PriceIndex(price_df))
+        return self._price_index[1]
+
     def get_trade_dates(self, price_df: pd.DataFrame) -> List[str]:
         """获取交易日列表"""
-        return sorted(price_df['trade_date'].unique().tolist())
+        return list(self.price_index(price_df).dates)
 
     def get_next_trade_date(self, trade_dates: List[str], current_date: str) -> Optional[str]:
         """获取下一个交易日"""
@@ -269,17 +419,32 @@ class BacktestEngine:
         trade_date: str
     ):
         """更新持仓市值"""
-        day_prices = price_df[price_df['trade_date'] == trade_date]
+        prices = self.price_index(price_df)
 
         for ts_code, position in self.positions.items():
-            stock_price = day_prices[day_prices['ts_code'] == ts_code]
-            if len(stock_price) > 0:
-                current_price = stock_price['close'].iloc[0]
+            current_price = prices.get(trade_date, ts_code)
+            if current_price is not None:
                 position.current_price = current_price
                 position.current_value = position.shares * current_price
                 position.profit = position.current_value - position.shares * position.buy_price
                 position.profit_pct = position.profit / (position.shares * position.buy_price)
 
+    def _bar(self, field: str, trade_date: str, ts_code: str) -> float:
+        """成交模型数组中该交易日该股票的值"""
+        prices = self._price_index[1]
+        return self._bars[field][prices.date_pos[trade_date], prices.code_pos[ts_code]]
+
+    def _intrabar_exit(self, position: Position, trade_date: str) -> Optional[Tuple[str, float]]:
+        """盘中止损/止盈：(触发类型, 成交价)，未触及返回 None"""
+        stop_price = position.buy_price * (1 + self.config.stop_loss_pct)
+        take_price = position.buy_price * (1 + self.config.take_profit_pct)
+        open_price = self._bar('open', trade_date, position.ts_code)
+        if self._bar('low', trade_date, position.ts_code) <= stop_price:
+            return 'stop', min(open_price, stop_price)
+        if self._bar('high', trade_date, position.ts_code) >= take_price:
+            return 'take', max(open_price, take_price)
+        return None
+
     def check_sell_signals(
         self,
         price_df: pd.DataFrame,
@@ -293,23 +458,36 @@ class BacktestEngine:
             需要卖出的股票代码列表
         """
         sell_codes = []
-        day_prices = price_df[price_df['trade_date'] == trade_date]
+        intrabar = self.execution.exit == 'intrabar'
+        prices = self.price_index(price_df)
 
         for ts_code, position in self.positions.items():
+            # 当日开盘买入的持仓次日才能卖出（T+1）
+            if position.buy_date == trade_date:
+                continue
+
             # 更新持仓天数
             position.hold_days += 1
 
-            # 止损
-            if position.profit_pct <= self.config.stop_loss_pct:
-                sell_codes.append(ts_code)
-                logger.debug(f"{ts_code} 触发止损: {position.profit_pct:.2%}")
-                continue
-
-            # 止盈
-            if position.profit_pct >= self.config.take_profit_pct:
-                sell_codes.append(ts_code)
-                logger.debug(f"{ts_code} 触发止盈: {position.profit_pct:.2%}")
-                continue
+            if intrabar and prices.get(trade_date, ts_code) is not None:
+                # 盘中最低/最高价触及止损/止盈价
+                hit = self._intrabar_exit(position, trade_date)
+                if hit is not None:
+                    sell_codes.append(ts_code)
+                    logger.debug(f"{ts_code} 盘中触发{'止损' if hit[0] == 'stop' else '止盈'}: {hit[1]:.2f}")
+                    continue
+            elif not intrabar:
+                # 止损
+                if position.profit_pct <= self.config.stop_loss_pct:
+                    sell_codes.append(ts_code)
+                    logger.debug(f"{ts_code} 触发止损: {position.profit_pct:.2%}")
+                    continue
+
+                # 止盈
+                if position.profit_pct >= self.config.take_profit_pct:
+                    sell_codes.append(ts_code)
+                    logger.debug(f"{ts_code} 触发止盈: {position.profit_pct:.2%}")
+                    continue
 
             # 最大持仓天数
             if position.hold_days >= self.config.max_hold_days:
@@ -319,13 +497,64 @@ class BacktestEngine:
 
         return sell_codes
 
+    def sell_price(self, ts_code: str, trade_date: str) -> Optional[float]:
+        """
+        卖出成交价：盘中止损/止盈为触发价（开盘已越过时为开盘价），其余为收盘价
+
+        Returns:
+            成交价，当日无价格或跌停不可卖时返回 None（持仓保留到下一交易日）
+        """
+        close = self._price_index[1].get(trade_date, ts_code)
+        if close is None:
+            return None
+        if self.execution.exit == 'intrabar':
+            hit = self._intrabar_exit(self.positions[ts_code], trade_date)
+            if hit is not None:
+                return None if self._bar('no_sell_intrabar', trade_date, ts_code) else hit[1]
+        return None if self._bar('no_sell_close', trade_date, ts_code) else close
+
+    def buy_ranked(
+        self,
+        ranking,
+        signal_date: str,
+        trade_date: str,
+        signal_codes: np.ndarray,
+        signal_labels: np.ndarray,
+        field: str = 'close'
+    ):
+        """
+        按信号日的排名买入（综合得分降序，排除已持仓、当日无价格和涨停不可买的股票）
+
+        Args:
+            ranking: 信号排名索引 (SignalRanking)
+            signal_date: 信号日期
+            trade_date: 成交日期
+            signal_codes / signal_labels: 信号数据各行的股票代码、信号类型
+            field: 成交价字段（close / open）
+        """
+        if len(self.positions) >= self.config.max_positions:
+            return
+
+        prices = self._price_index[1]
+        for row in ranking.iter_ranked(signal_date):
+            if len(self.positions) >= self.config.max_positions:
+                break
+
+            ts_code = signal_codes[row]
+            if ts_code in self.positions:
+                continue
+            if prices.get(trade_date, ts_code) is None or self._bar('no_buy', trade_date, ts_code):
+                continue
+            self.buy(ts_code, trade_date, self._bar(field, trade_date, ts_code), f"信号: {signal_labels[row]}")
+
     def run_backtest(
         self,
         db,
         start_date: str,
         end_date: str,
         strategy_names: Optional[List[str]] = None,
-        min_score: float = 0.5
+        min_score: float = 0.5,
+        data_context=None
     ) -> Dict:
         """
         运行回测
@@ -336,6 +565,8 @@ class BacktestEngine:
             end_date: 结束日期
             strategy_names: 策略名称列表
             min_score: 最小信号得分
+            data_context: 回测数据上下文 (MarketDataContext)，数据从上下文读取，
+                多次回测共用时只加载一次（此时 use_cache / panel_store / pushdown 不再生效）
 
         Returns:
             回测结果
@@ -347,12 +578,65 @@ class BacktestEngine:
         logger.info(f"初始资金: {self.config.initial_capital:,.2f}")
         logger.info(f"策略: {strategy_names or '全部'}")
 
-        # 加载数据
-        indicator_df, price_df = self.load_data(db, start_date, end_date)
+        # 物化信号完整且未过期时直接读取，只需加载价格数据
+        signal_df = None
+        if self.use_signal_table:
+            from strategy.signal_store import load_signal_frame
+            signal_df = load_signal_frame(db.get_bind(), start_date, end_date, strategy_names, self.signal_engine)
+            if signal_df is None:
+                logger.info("物化信号不完整或已过期，改为实时计算信号")
+
+        if signal_df is not None:
+            if data_context is not None:
+                price_df = data_context.price_frame(db, start_date, end_date)
+            else:
+                price_df = load_price_frame(
+                    db.get_bind(), start_date, end_date, use_cache=self.use_cache, panel_store=self.panel_store
+                )
+        elif data_context is not None:
+            # 数据上下文中的指标与价格数据（缺少的列或回看历史由上下文补充加载）
+            indicator_df, price_df = data_context.frames(
+                db, start_date, end_date, self.signal_engine.required_columns(strategy_names),
+                self.signal_engine.max_lookback(strategy_names)
+            )
 
-        # 检测信号
-        logger.info("检测信号...")
-        signal_df = self.signal_engine.detect_signals(indicator_df, strategy_names)
+            logger.info("检测信号...")
+            signal_df = self.signal_engine.detect_signals(indicator_df, strategy_names)
+        else:
+            # 加载数据（只读取所选策略用到的指标列）
+            indicator_columns = self.signal_engine.required_columns(strategy_names)
+            sql_filter = None
+            if self.pushdown:
+                # 只读取可能产生信号的行，回测只使用有信号的行，结果不变
+                sql_filter = self.signal_engine.compile_sql_filter(strategy_names)
+                if sql_filter is None:
+                    logger.info("所选策略无法下推到 SQL，改为全量读取指标数据")
+            # 时间序列条件（ts_rank / shift / 上穿下穿）需要回测开始前的历史
+            lookback = self.signal_engine.max_lookback(strategy_names)
+            indicator_df, price_df = self.load_data(db, start_date, end_date, indicator_columns, sql_filter,
+                                                    lookback)
+
+            # 检测信号
+            logger.info("检测信号...")
+            signal_df = self.signal_engine.detect_signals(indicator_df, strategy_names)
+
+        # 价格按 [交易日, 股票] 建立索引，逐日按代码直接取价（使用数据上下文时在多次回测间共用）
+        if data_context is not None:
+            self._price_index = (price_df, data_context.price_index(price_df))
+        prices = self.price_index(price_df)
+
+        if self.vectorized:
+            from strategy.vector_backtest import run_vector_backtest
+            logger.info(f"数组化回测，交易日数量: {len(prices.dates)}")
+            return run_vector_backtest(signal_df, prices, self.config, min_score)
+
+        # 每日信号排名索引：一次构建，逐日只取得分最高的候选股票（持仓数之外预留同等数量）
+        ranking = self.signal_engine.rank_signals(signal_df, k=2 * self.config.max_positions, min_score=min_score)
+        signal_codes = signal_df['ts_code'].to_numpy()
+        signal_labels = signal_df['signal_types'].to_numpy()
+
+        # 成交模型用到的开高低价与涨跌停标记
+        self._bars = execution_bars(prices.arrays(), self.execution)
 
         # 获取交易日列表
         trade_dates = self.get_trade_dates(price_df)
@@ -360,6 +644,10 @@ class BacktestEngine:
 
         # 逐日回测
         for i, trade_date in enumerate(trade_dates):
+            # 次日开盘买入：前一交易日的信号以今日开盘价成交
+            if self.execution.entry == 'next_open' and i > 0:
+                self.buy_ranked(ranking, trade_dates[i - 1], trade_date, signal_codes, signal_labels, 'open')
+
             # 更新持仓市值
             self.update_positions(price_df, trade_date)
 
@@ -378,39 +666,16 @@ class BacktestEngine:
 
             # 检查卖出信号
             sell_codes = self.check_sell_signals(price_df, trade_date, trade_dates)
-            day_prices = price_df[price_df['trade_date'] == trade_date]
 
             # 执行卖出
             for ts_code in sell_codes:
-                stock_price = day_prices[day_prices['ts_code'] == ts_code]
-                if len(stock_price) > 0:
-                    self.sell(ts_code, trade_date, stock_price['close'].iloc[0], "止损/止盈/到期")
-
-            # 检查买入信号
-            if len(self.positions) < self.config.max_positions:
-                day_signals = signal_df[signal_df['trade_date'] == trade_date]
-                day_signals = day_signals[day_signals['has_signal'] == True]
-                day_signals = day_signals[day_signals['total_score'] >= min_score]
-
-                # 排除已持仓股票
-                day_signals = day_signals[~day_signals['ts_code'].isin(self.positions.keys())]
-
-                # 按得分排序
-                day_signals = day_signals.sort_values('total_score', ascending=False)
-
-                # 买入
-                for _, row in day_signals.iterrows():
-                    if len(self.positions) >= self.config.max_positions:
-                        break
-
-                    ts_code = row['ts_code']
-                    stock_price = day_prices[day_prices['ts_code'] == ts_code]
-                    if len(stock_price) > 0:
-                        self.buy(
-                            ts_code, trade_date,
-                            stock_price['close'].iloc[0],
-                            f"信号: {row['signal_types']}"
-                        )
+                price = self.sell_price(ts_code, trade_date)
+                if price is not None:
+                    self.sell(ts_code, trade_date, price, "止损/止盈/到期")
+
+            # 检查买入信号（按综合得分降序，排除已持仓股票），收盘价成交
+            if self.execution.entry == 'close':
+                self.buy_ranked(ranking, trade_date, trade_date, signal_codes, signal_labels)
 
             # 进度显示
             if (i + 1) % 50 == 0:
@@ -418,11 +683,10 @@ class BacktestEngine:
 
         # 清算剩余持仓
         last_date = trade_dates[-1]
-        last_prices = price_df[price_df['trade_date'] == last_date]
         for ts_code in list(self.positions.keys()):
-            stock_price = last_prices[last_prices['ts_code'] == ts_code]
-            if len(stock_price) > 0:
-                self.sell(ts_code, last_date, stock_price['close'].iloc[0], "回测结束")
+            close = prices.get(last_date, ts_code)
+            if close is not None:
+                self.sell(ts_code, last_date, close, "回测结束")
 
         # 计算绩效
         performance = self.calculate_performance()
@@ -436,56 +700,7 @@ class BacktestEngine:
 
         values_df = pd.DataFrame(self.daily_values)
         trades_df = pd.DataFrame(self.trades) if self.trades else pd.DataFrame()
-
-        # 收益率序列
-        values_df['return'] = values_df['total_value'].pct_change()
-        values_df['cum_return'] = (1 + values_df['return']).cumprod() - 1
-
-        # 总收益率
-        total_return = (values_df['total_value'].iloc[-1] / self.config.initial_capital - 1)
-
-        # 年化收益率
-        days = len(values_df)
-        annual_return = (1 + total_return) ** (252 / days) - 1
-
-        # 最大回撤
-        cummax = values_df['total_value'].cummax()
-        drawdown = (values_df['total_value'] - cummax) / cummax
-        max_drawdown = drawdown.min()
-
-        # 夏普比率
-        if values_df['return'].std() > 0:
-            sharpe = values_df['return'].mean() / values_df['return'].std() * np.sqrt(252)
-        else:
-            sharpe = 0
-
-        # 交易统计
-        buy_trades = trades_df[trades_df['trade_type'] == 'buy'] if len(trades_df) > 0 else pd.DataFrame()
-        sell_trades = trades_df[trades_df['trade_type'] == 'sell'] if len(trades_df) > 0 else pd.DataFrame()
-
-        win_trades = sell_trades[sell_trades['profit'] > 0] if len(sell_trades) > 0 else pd.DataFrame()
-        lose_trades = sell_trades[sell_trades['profit'] <= 0] if len(sell_trades) > 0 else pd.DataFrame()
-
-        performance = {
-            'total_return': total_return,
-            'annual_return': annual_return,
-            'max_drawdown': max_drawdown,
-            'sharpe_ratio': sharpe,
-            'total_trades': len(trades_df),
-            'buy_count': len(buy_trades),
-            'sell_count': len(sell_trades),
-            'win_rate': len(win_trades) / len(sell_trades) if len(sell_trades) > 0 else 0,
-            'win_count': len(win_trades),
-            'lose_count': len(lose_trades),
-            'avg_profit': sell_trades['profit'].mean() if len(sell_trades) > 0 else 0,
-            'avg_profit_pct': sell_trades['profit_pct'].mean() if len(sell_trades) > 0 else 0,
-            'total_profit': sell_trades['profit'].sum() if len(sell_trades) > 0 else 0,
-            'final_value': values_df['total_value'].iloc[-1],
-            'daily_values': values_df,
-            'trades': trades_df
-        }
-
-        return performance
+        return calculate_performance(values_df, trades_df, self.config.initial_capital)
 
     def print_performance(self, performance: Dict):
         """打印绩效报告"""
@@ -537,18 +752,99 @@ class BacktestEngine:
         logger.info(f"结果已保存到: {output_dir}/")
 
 
+def calculate_performance(values_df: pd.DataFrame, trades_df: pd.DataFrame, initial_capital: float) -> Dict:
+    """
+    由每日市值与交易记录计算回测绩效（逐日循环与数组化回测共用）
+
+    Args:
+        values_df: 每日市值（trade_date, cash, position_value, total_value, position_count）
+        trades_df: 交易记录（字段同 Trade），无交易时为空 DataFrame
+        initial_capital: 初始资金
+    """
+    if len(values_df) == 0:
+        return {}
+
+    # 收益率序列
+    values_df['return'] = values_df['total_value'].pct_change()
+    values_df['cum_return'] = (1 + values_df['return']).cumprod() - 1
+
+    # 总收益率
+    total_return = (values_df['total_value'].iloc[-1] / initial_capital - 1)
+
+    # 年化收益率
+    days = len(values_df)
+    annual_return = (1 + total_return) ** (252 / days) - 1
+
+    # 最大回撤
+    cummax = values_df['total_value'].cummax()
+    drawdown = (values_df['total_value'] - cummax) / cummax
+    max_drawdown = drawdown.min()
+
+    # 夏普比率
+    if values_df['return'].std() > 0:
+        sharpe = values_df['return'].mean() / values_df['return'].std() * np.sqrt(252)
+    else:
+        sharpe = 0
+
+    # 交易统计
+    buy_trades = trades_df[trades_df['trade_type'] == 'buy'] if len(trades_df) > 0 else pd.DataFrame()
+    sell_trades = trades_df[trades_df['trade_type'] == 'sell'] if len(trades_df) > 0 else pd.DataFrame()
+
+    win_trades = sell_trades[sell_trades['profit'] > 0] if len(sell_trades) > 0 else pd.DataFrame()
+    lose_trades = sell_trades[sell_trades['profit'] <= 0] if len(sell_trades) > 0 else pd.DataFrame()
+
+    performance = {
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe,
+        'total_trades': len(trades_df),
+        'buy_count': len(buy_trades),
+        'sell_count': len(sell_trades),
+        'win_rate': len(win_trades) / len(sell_trades) if len(sell_trades) > 0 else 0,
+        'win_count': len(win_trades),
+        'lose_count': len(lose_trades),
+        'avg_profit': sell_trades['profit'].mean() if len(sell_trades) > 0 else 0,
+        'avg_profit_pct': sell_trades['profit_pct'].mean() if len(sell_trades) > 0 else 0,
+        'total_profit': sell_trades['profit'].sum() if len(sell_trades) > 0 else 0,
+        'final_value': values_df['total_value'].iloc[-1],
+        'daily_values': values_df,
+        'trades': trades_df
+    }
+
+    return performance
+
+
 def run_backtest(
     start_date: str = '20240101',
     end_date: str = '20260424',
     strategies: Optional[List[str]] = None,
-    config: Optional[BacktestConfig] = None
+    config: Optional[BacktestConfig] = None,
+    use_cache: bool = False,
+    use_panel_store: bool = False,
+    use_pushdown: bool = False,
+    use_signal_table: bool = False,
+    vectorized: bool = False,
+    data_context=None
 ):
-    """运行回测"""
+    """
+    运行回测
+
+    use_signal_table 为 True 时优先读取 daily_signal 中的物化信号；
+    vectorized 为 True 时使用数组化回测（结果相同，不逐日维护持仓对象）；
+    data_context 为 MarketDataContext 时从上下文读取数据，多次调用只加载一次。
+    """
     from app.core.database import get_db_context
 
+    panel_store = None
+    if use_panel_store:
+        from strategy.panel_store import PanelStore
+        panel_store = PanelStore()
+
     with get_db_context() as db:
-        engine = BacktestEngine(config)
-        performance = engine.run_backtest(db, start_date, end_date, strategies)
+        engine = BacktestEngine(config, use_cache=use_cache, panel_store=panel_store, pushdown=use_pushdown,
+                                use_signal_table=use_signal_table, vectorized=vectorized)
+        performance = engine.run_backtest(db, start_date, end_date, strategies, data_context=data_context)
         engine.print_performance(performance)
         engine.save_results(performance)
         return performance
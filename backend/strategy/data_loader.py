@@ -0,0 +1,600 @@
+"""
+日线数据批量读取
+用一条按 (ts_code, trade_date) 排序的查询读取整批股票或全表的 daily_data，
+通过非缓冲游标分块拉取（结果集留在服务端，内存只保留当前块），再按股票切分。
+另提供紧凑类型加载（按需选列、category 键、float32 指标），供回测、因子分析和信号检测共用。
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+
+DAILY_COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 'vol']
+
+# 每次从游标拉取的行数
+DEFAULT_CHUNKSIZE = 200_000
+
+# 流式读取期间客户端处理数据时服务端处于等待发送状态，放宽写超时避免连接被断开
+STREAM_NET_WRITE_TIMEOUT = 3600
+
+
+def iter_query_chunks(
+    bind,
+    sql: str,
+    params: tuple = (),
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    非缓冲游标执行原生 SQL（%s 占位符），按 chunksize 行分块返回 DataFrame
+
+    SQLAlchemy 的 mysqlconnector 方言总是缓冲整个结果集，这里直接使用 DBAPI 游标。
+    """
+    raw = bind.raw_connection()
+    exhausted = False
+    try:
+        cursor = raw.cursor(buffered=False)
+        cursor.execute(f"SET SESSION net_write_timeout = {STREAM_NET_WRITE_TIMEOUT}")
+        cursor.execute(sql, params)
+        columns = list(cursor.column_names)
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        exhausted = True
+        cursor.close()
+    finally:
+        if exhausted:
+            raw.close()
+        else:
+            # 结果集未读完时连接无法复用，直接废弃
+            raw.invalidate()
+
+
+def iter_daily_chunks(
+    bind,
+    ts_codes: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    columns: List[str] = DAILY_COLUMNS,
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    流式读取 daily_data，按 (ts_code, trade_date) 升序分块返回
+
+    Args:
+        bind: 数据库引擎
+        ts_codes: 股票代码列表，None 表示全表
+        start_date: 起始交易日期（含），None 表示全部历史
+        columns: 查询列
+        chunksize: 每块行数
+
+    Yields:
+        DataFrame 数据块（同一股票的行可能跨越相邻两块）
+    """
+    if ts_codes is not None and len(ts_codes) == 0:
+        return
+
+    conditions = []
+    params = []
+    if ts_codes is not None:
+        conditions.append(f"ts_code IN ({', '.join(['%s'] * len(ts_codes))})")
+        params.extend(ts_codes)
+    if start_date is not None:
+        conditions.append("trade_date >= %s")
+        params.append(start_date)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT {', '.join(columns)} FROM daily_data {where} ORDER BY ts_code, trade_date"
+
+    yield from iter_query_chunks(bind, sql, tuple(params), chunksize)
+
+
+def iter_daily_groups(
+    bind,
+    ts_codes: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    columns: List[str] = DAILY_COLUMNS,
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    流式读取 daily_data 并按股票切分，每只股票的数据完整后才返回
+
+    块末尾未结束的股票保留到下一块拼接，内存占用约为一块加一只股票的数据量。
+
+    Yields:
+        (ts_code, 该股票按日期升序的日线数据)
+    """
+    yield from _iter_key_groups(iter_daily_chunks(bind, ts_codes, start_date, columns, chunksize), 'ts_code')
+
+
+def _iter_key_groups(chunks: Iterator[pd.DataFrame], key: str) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """将按 key 有序的数据块切分为完整的分组，块末尾未结束的分组保留到下一块拼接"""
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        values = chunk[key].to_numpy()
+        # 最后一组可能在下一块继续，暂存
+        tail_start = np.flatnonzero(values != values[-1])
+        tail_start = tail_start[-1] + 1 if len(tail_start) else 0
+        carry = chunk.iloc[tail_start:]
+
+        for value, group in chunk.iloc[:tail_start].groupby(key, sort=False):
+            yield value, group.reset_index(drop=True)
+
+    if carry is not None and len(carry) > 0:
+        yield carry[key].iloc[0], carry.reset_index(drop=True)
+
+
+def iter_daily_batches(
+    bind,
+    batch_size: int,
+    ts_codes: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[List[Tuple[str, pd.DataFrame]]]:
+    """
+    流式读取 daily_data，每凑满 batch_size 只股票返回一批
+
+    Yields:
+        [(ts_code, 日线数据), ...]
+    """
+    batch = []
+    for item in iter_daily_groups(bind, ts_codes, start_date, chunksize=chunksize):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_daily_groups(
+    bind,
+    ts_codes: List[str],
+    start_date: Optional[str] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> Dict[str, pd.DataFrame]:
+    """一次查询读取一批股票的日线数据，返回 {ts_code: 日线数据}（无数据的股票不在结果中）"""
+    return dict(iter_daily_groups(bind, ts_codes, start_date, chunksize=chunksize))
+
+
+# ============== 紧凑类型加载（回测 / 因子分析 / 信号检测共用） ==============
+
+KEY_COLUMNS = ['ts_code', 'trade_date']
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'vol', 'pct_chg']
+
+# trade_date 的可选类型：category 与原始字符串可直接和 'YYYYMMDD' 字符串比较；
+# int32 / datetime64 更省内存，但调用方需用相同类型比较
+DATE_DTYPES = ('category', 'int32', 'datetime64', 'str')
+
+
+def compact_frame(
+    df: pd.DataFrame,
+    date_dtype: str = 'category',
+    float_dtype: Optional[str] = 'float32'
+) -> pd.DataFrame:
+    """
+    原地压缩 DataFrame 的列类型
+
+    Args:
+        df: 含 ts_code / trade_date 的长表
+        date_dtype: trade_date 目标类型，见 DATE_DTYPES
+        float_dtype: float64 列的目标类型，None 表示不转换
+
+    Returns:
+        压缩后的 DataFrame（与传入的是同一对象）
+    """
+    if date_dtype not in DATE_DTYPES:
+        raise ValueError(f"不支持的日期类型: {date_dtype}，可选 {DATE_DTYPES}")
+
+    if 'ts_code' in df.columns and not isinstance(df['ts_code'].dtype, pd.CategoricalDtype):
+        df['ts_code'] = df['ts_code'].astype('category')
+
+    if 'trade_date' in df.columns:
+        if date_dtype == 'category':
+            df['trade_date'] = df['trade_date'].astype('category')
+        elif date_dtype == 'int32':
+            df['trade_date'] = df['trade_date'].astype(np.int32)
+        elif date_dtype == 'datetime64':
+            df['trade_date'] = pd.to_datetime(df['trade_date'].astype(str), format='%Y%m%d')
+
+    if float_dtype is not None:
+        float_cols = df.select_dtypes(include='float64').columns
+        if len(float_cols) > 0:
+            df[float_cols] = df[float_cols].astype(float_dtype)
+
+    return df
+
+
+def memory_footprint(df: pd.DataFrame) -> float:
+    """DataFrame 占用内存 (MB)，包含字符串等对象的实际大小"""
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+def table_columns(table: str) -> List[str]:
+    """表的全部非主键列（以 ORM 模型为准）"""
+    from app.models.daily import DailyData
+    from app.models.indicator import DailyIndicator
+
+    model = {'daily_data': DailyData, 'daily_indicator': DailyIndicator}[table]
+    return [col.name for col in model.__table__.columns if col.name not in KEY_COLUMNS]
+
+
+def _resolve_columns(table: str, columns: Optional[List[str]]) -> List[str]:
+    """请求的列中表里存在的部分（去重、保持顺序），None 表示全部列"""
+    available = table_columns(table)
+    if columns is None:
+        return available
+    missing = [col for col in columns if col not in available]
+    if missing:
+        logger.warning(f"{table} 中不存在的列将被忽略: {missing}")
+    return [col for col in dict.fromkeys(columns) if col in available]
+
+
+def _load_table_frame(
+    bind,
+    table: str,
+    columns: Optional[List[str]],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    ts_codes: Optional[List[str]],
+    date_dtype: str,
+    float_dtype: Optional[str],
+    use_cache: bool,
+    panel_store,
+    chunksize: int,
+    sql_filter: Optional[Tuple[str, list]] = None
+) -> pd.DataFrame:
+    """按 面板存储 → 本地缓存 → 数据库 的顺序读取指定列，并压缩类型"""
+    columns = _resolve_columns(table, columns)
+
+    df = None
+    source = '数据库'
+
+    if panel_store is not None:
+        fields = [col for col in columns if col in panel_store.fields]
+        if len(fields) == len(columns):
+            df = panel_store.to_frame(fields, start_date, end_date, table=table, ts_codes=ts_codes)
+            source = '面板存储'
+        else:
+            logger.warning(f"面板存储缺少 {table} 的部分列，改为从其他来源加载")
+
+    if df is None and use_cache:
+        from strategy.market_cache import MarketCache
+
+        df = MarketCache().try_read(table, start_date, end_date, columns=columns, ts_codes=ts_codes)
+        source = '本地缓存'
+
+    if df is None:
+        source = '数据库'
+        if ts_codes is not None and len(ts_codes) == 0:
+            df = pd.DataFrame(columns=KEY_COLUMNS + columns)
+        else:
+            conditions = []
+            params = []
+            if start_date:
+                conditions.append("trade_date >= %s")
+                params.append(start_date)
+            if end_date:
+                conditions.append("trade_date <= %s")
+                params.append(end_date)
+            if ts_codes is not None:
+                conditions.append(f"ts_code IN ({', '.join(['%s'] * len(ts_codes))})")
+                params.extend(ts_codes)
+            if sql_filter is not None:
+                conditions.append(f"({sql_filter[0]})")
+                params.extend(sql_filter[1])
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            sql = f"SELECT {', '.join(KEY_COLUMNS + columns)} FROM {table} {where} ORDER BY ts_code, trade_date"
+
+            # 逐块压缩浮点列，峰值内存约为结果加一块
+            chunks = [
+                compact_frame(chunk, date_dtype='str', float_dtype=float_dtype)
+                for chunk in iter_query_chunks(bind, sql, tuple(params), chunksize)
+            ]
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=KEY_COLUMNS + columns)
+
+    if sql_filter is not None and source == '数据库':
+        source = '数据库 (条件下推)'
+    df = compact_frame(df, date_dtype=date_dtype, float_dtype=float_dtype)
+    logger.info(f"从{source}加载 {table}: {len(df)} 条, {len(columns)} 列, 内存 {memory_footprint(df):.1f} MB")
+    return df
+
+
+def load_indicator_frame(
+    bind,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    ts_codes: Optional[List[str]] = None,
+    date_dtype: str = 'category',
+    float_dtype: Optional[str] = 'float32',
+    use_cache: bool = False,
+    panel_store=None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    sql_filter: Optional[Tuple[str, list]] = None,
+    lookback: int = 0
+) -> pd.DataFrame:
+    """
+    加载 daily_indicator，只读取需要的列并压缩类型
+
+    ts_code 转为 category，trade_date 按 date_dtype 转换，指标列降为 float32，
+    全部列读取时内存约为 SELECT * 直接读取的 40%，按需选列时更少。
+
+    Args:
+        bind: 数据库引擎
+        start_date: 开始日期 (YYYYMMDD)，含
+        end_date: 结束日期 (YYYYMMDD)，含
+        columns: 指标列，None 表示全部（ts_code, trade_date 总会包含）
+        ts_codes: 股票代码列表，None 表示全部
+        date_dtype: trade_date 目标类型，见 DATE_DTYPES
+        float_dtype: 指标列目标类型，None 表示保持 float64
+        use_cache: 优先从本地行情缓存读取
+        panel_store: 内存映射面板存储 (PanelStore)，优先级最高
+        sql_filter: 附加的行筛选条件 (含 %s 占位符的 SQL, 参数列表)，只在从数据库读取时下推，
+            面板存储和本地缓存返回全部行
+        lookback: 另外读取区间内每只股票在 start_date 之前的最后 lookback 行（见 load_indicator_history），
+            供时间序列条件使用
+
+    Returns:
+        按 (ts_code, trade_date) 升序的长表
+    """
+    if not lookback or not start_date:
+        return _load_table_frame(bind, 'daily_indicator', columns, start_date, end_date, ts_codes,
+                                 date_dtype, float_dtype, use_cache, panel_store, chunksize, sql_filter)
+
+    df = _load_table_frame(bind, 'daily_indicator', columns, start_date, end_date, ts_codes,
+                           'str', float_dtype, use_cache, panel_store, chunksize, sql_filter)
+    history = load_indicator_history(
+        bind, start_date, lookback, columns=columns, ts_codes=list(df['ts_code'].unique()), date_dtype='str',
+        float_dtype=float_dtype, use_cache=use_cache, panel_store=panel_store, sql_filter=sql_filter
+    )
+    df = pd.concat([history, df], ignore_index=True).sort_values(KEY_COLUMNS, kind='stable', ignore_index=True)
+    return compact_frame(df, date_dtype=date_dtype, float_dtype=float_dtype)
+
+
+def load_price_frame(
+    bind,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    ts_codes: Optional[List[str]] = None,
+    date_dtype: str = 'category',
+    float_dtype: Optional[str] = None,
+    use_cache: bool = False,
+    panel_store=None,
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> pd.DataFrame:
+    """
+    加载 daily_data 价格数据，默认列为 PRICE_COLUMNS
+
+    价格默认保持 float64，避免成交金额、手续费等资金计算出现 float32 累计误差，
+    参数含义同 load_indicator_frame。
+    """
+    return _load_table_frame(bind, 'daily_data', columns or PRICE_COLUMNS, start_date, end_date, ts_codes,
+                             date_dtype, float_dtype, use_cache, panel_store, chunksize)
+
+
+def iter_indicator_days(
+    bind,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    float_dtype: Optional[str] = 'float32',
+    sql_filter: Optional[Tuple[str, list]] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    按交易日流式读取 daily_indicator，每个交易日的数据完整后返回
+
+    一条按 (trade_date, ts_code) 排序的查询（走 trade_date 索引），内存只保留
+    一块加一个交易日的数据，适合逐日生成信号。
+
+    Args:
+        bind: 数据库引擎
+        start_date: 开始日期 (YYYYMMDD)，含
+        end_date: 结束日期 (YYYYMMDD)，含
+        columns: 指标列，None 表示全部
+        float_dtype: 指标列目标类型，None 表示保持 float64
+        sql_filter: 附加的行筛选条件 (含 %s 占位符的 SQL, 参数列表)
+        chunksize: 每块行数
+
+    Yields:
+        (trade_date, 该交易日按 ts_code 升序的指标数据)
+    """
+    columns = _resolve_columns('daily_indicator', columns)
+
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append("trade_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("trade_date <= %s")
+        params.append(end_date)
+    if sql_filter is not None:
+        conditions.append(f"({sql_filter[0]})")
+        params.extend(sql_filter[1])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT {', '.join(KEY_COLUMNS + columns)} FROM daily_indicator {where} ORDER BY trade_date, ts_code"
+
+    chunks = iter_query_chunks(bind, sql, tuple(params), chunksize)
+    for trade_date, day_df in _iter_key_groups(chunks, 'trade_date'):
+        yield trade_date, compact_frame(day_df, date_dtype='str', float_dtype=float_dtype)
+
+
+# 为时间序列条件预读历史时，全市场按交易日读取的范围在回看行数之外多留的交易日数（覆盖短期停牌）；
+# 这段时间内仍不足回看行数的股票再单独读取
+LOOKBACK_EXTRA_DAYS = 20
+
+
+def lookback_start_date(bind, trade_date: str, days: int, table: str = 'daily_indicator') -> str:
+    """
+    trade_date 之前第 days 个交易日（历史不足时为最早交易日）
+
+    Args:
+        bind: 数据库引擎
+        trade_date: 交易日期 (YYYYMMDD)
+        days: 向前的交易日数
+        table: 以哪张表的交易日为准
+    """
+    if days <= 0:
+        return trade_date
+    sql = (f"SELECT DISTINCT trade_date FROM {table} WHERE trade_date < %s "
+           f"ORDER BY trade_date DESC LIMIT {int(days)}")
+    dates = [date for chunk in iter_query_chunks(bind, sql, (trade_date,)) for date in chunk['trade_date']]
+    return min(dates) if dates else trade_date
+
+
+def _rows_before(df: pd.DataFrame, trade_date: str) -> pd.DataFrame:
+    return df[df['trade_date'].astype(str) < trade_date]
+
+
+def load_indicator_history(
+    bind,
+    trade_date: str,
+    days: int,
+    columns: Optional[List[str]] = None,
+    ts_codes: Optional[List[str]] = None,
+    date_dtype: str = 'category',
+    float_dtype: Optional[str] = 'float32',
+    use_cache: bool = False,
+    panel_store=None,
+    sql_filter: Optional[Tuple[str, list]] = None
+) -> pd.DataFrame:
+    """
+    每只股票在 trade_date 之前的最后 days 行，用于为时间序列条件预读历史
+
+    回看按每只股票自身的行数计（与 shift / ts_rank 一致，停牌日不计）。先读取最近
+    days + LOOKBACK_EXTRA_DAYS 个交易日；ts_codes 中在这段时间内不足 days 行的股票
+    （停牌较久或上市不久）再按股票单独读取更早的历史，不会因个别股票把全市场的读取范围拉长。
+
+    Args:
+        bind: 数据库引擎
+        trade_date: 交易日期 (YYYYMMDD)，不含
+        days: 每只股票的行数
+        columns: 指标列，None 表示全部
+        ts_codes: 需要历史的股票，None 表示最近一段时间内出现过的全部股票（不补读更早的历史）
+        其余参数同 load_indicator_frame
+
+    Returns:
+        按 (ts_code, trade_date) 升序的长表
+    """
+    window_start = lookback_start_date(bind, trade_date, days + LOOKBACK_EXTRA_DAYS)
+    options = dict(columns=columns, date_dtype='str', float_dtype=float_dtype, use_cache=use_cache,
+                   panel_store=panel_store, sql_filter=sql_filter)
+    history = _rows_before(load_indicator_frame(bind, window_start, trade_date, **options), trade_date)
+
+    if ts_codes is not None:
+        history = history[history['ts_code'].isin(ts_codes)]
+        counts = history['ts_code'].value_counts()
+        short = [code for code in ts_codes if counts.get(code, 0) < days]
+        if short:
+            earlier = _stock_history(bind, trade_date, days, short, options)
+            history = history[~history['ts_code'].isin(short)]
+            if len(earlier):
+                history = pd.concat([history, earlier], ignore_index=True)
+
+    history = trailing_rows(history.sort_values(KEY_COLUMNS, kind='stable'), days).reset_index(drop=True)
+    return compact_frame(history, date_dtype=date_dtype, float_dtype=float_dtype)
+
+
+def _stock_history(bind, trade_date: str, days: int, ts_codes: List[str], options: dict) -> pd.DataFrame:
+    """指定股票在 trade_date 之前的最后 days 行（按股票读取，不限开始日期）"""
+    df = load_indicator_frame(bind, None, trade_date, ts_codes=ts_codes, **options)
+    return trailing_rows(_rows_before(df, trade_date), days)
+
+
+def iter_indicator_frames(
+    bind,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    lookback: int = 0,
+    columns: Optional[List[str]] = None,
+    float_dtype: Optional[str] = 'float32',
+    sql_filter: Optional[Tuple[str, list]] = None
+) -> Iterator[Tuple[str, pd.DataFrame, pd.DataFrame]]:
+    """
+    按交易日流式读取 daily_indicator，并附带每只股票之前的最后 lookback 行，适合逐日检测时间序列条件
+
+    开始日期之前的历史按 load_indicator_history 读取：先读最近一段时间，
+    股票第一次出现且历史不足时再单独补读；之后缓存每只股票最近 lookback 行。
+
+    Args:
+        bind: 数据库引擎
+        start_date: 开始日期 (YYYYMMDD)，含；None 表示从最早交易日开始（没有更早的历史）
+        end_date: 结束日期 (YYYYMMDD)，含
+        lookback: 每只股票附带的历史行数
+        columns: 指标列，None 表示全部
+        float_dtype: 指标列目标类型，None 表示保持 float64
+        sql_filter: 附加的行筛选条件 (含 %s 占位符的 SQL, 参数列表)
+
+    Yields:
+        (trade_date, 该交易日的指标数据, 历史行加当日数据，当日数据位于末尾)
+    """
+    days = iter_indicator_days(bind, start_date, end_date, columns=columns, float_dtype=float_dtype,
+                               sql_filter=sql_filter)
+    if not lookback:
+        for trade_date, day_df in days:
+            yield trade_date, day_df, day_df
+        return
+
+    history = None
+    resolved = None
+    options = dict(columns=columns, date_dtype='str', float_dtype=float_dtype, sql_filter=sql_filter)
+    if start_date:
+        history = load_indicator_history(bind, start_date, lookback, columns=columns, date_dtype='str',
+                                         float_dtype=float_dtype, sql_filter=sql_filter)
+        counts = history['ts_code'].value_counts()
+        resolved = set(counts.index[counts >= lookback])
+
+    for trade_date, day_df in days:
+        if resolved is not None:
+            new = [code for code in day_df['ts_code'] if code not in resolved]
+            if new:
+                resolved.update(new)
+                earlier = _stock_history(bind, start_date, lookback, new, options)
+                history = history[~history['ts_code'].isin(new)]
+                if len(earlier):
+                    history = pd.concat([history, earlier], ignore_index=True)
+        frame = day_df if history is None else pd.concat([history, day_df], ignore_index=True)
+        history = trailing_rows(frame, lookback)
+        yield trade_date, day_df, frame
+
+
+def frame_with_lookback(df: pd.DataFrame, start_date: str, end_date: str, days: int,
+                        dates: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    从已加载的数据中截取区间，并带上区间内每只股票在 start_date 之前的最后 days 行
+    （与 load_indicator_frame 的 lookback 相同）
+
+    Args:
+        df: 含 ts_code / trade_date 列、每只股票按 trade_date 升序的数据
+        start_date: 开始日期 (YYYYMMDD)，含
+        end_date: 结束日期 (YYYYMMDD)，含
+        days: 每只股票的行数
+        dates: 已转换为字符串的 trade_date 列（可选，避免重复转换）
+
+    Returns:
+        区间覆盖全部数据时返回 df 本身，否则为重新编号的子集
+    """
+    if dates is None:
+        dates = df['trade_date'].astype(str).to_numpy()
+    in_range = (dates >= start_date) & (dates <= end_date)
+    keep = in_range
+    if days > 0:
+        codes = df['ts_code'].to_numpy()
+        before = dates < start_date
+        # 每只股票开始日期之前的行倒数第几行（0 为最后一行）
+        from_end = pd.Series(before[::-1].astype(np.int64)).groupby(codes[::-1]).cumsum().to_numpy()[::-1] - 1
+        keep = in_range | (before & (from_end < days) & np.isin(codes, pd.unique(codes[in_range])))
+    if keep.all():
+        return df
+    return df[keep].reset_index(drop=True)
+
+
+def trailing_rows(df: pd.DataFrame, rows: int) -> pd.DataFrame:
+    """每只股票最后 rows 行（保持原有顺序），用于逐日检测时缓存各股票自身的历史"""
+    return df.groupby('ts_code', sort=False, observed=True).tail(rows)
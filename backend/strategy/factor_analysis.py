@@ -5,10 +5,11 @@
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Optional, Tuple
-from sqlalchemy import text
 from sqlalchemy.orm import Session
 from loguru import logger
 
+from strategy.data_loader import load_indicator_frame, load_price_frame
+
 
 class FactorAnalyzer:
     """因子分析器"""
@@ -54,49 +55,36 @@ class FactorAnalyzer:
         'atr14', 'dma_dif', 'dma_ama', 'vr'
     ]
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, use_cache: bool = False, panel_store=None, compact: bool = True):
         self.db = db
+        self.use_cache = use_cache  # 优先从本地行情缓存加载数据
+        self.panel_store = panel_store  # 内存映射面板存储 (PanelStore)，优先级最高
+        self.compact = compact  # 指标列以 float32 加载
 
     def load_indicator_data(
         self,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        ts_codes: Optional[List[str]] = None
+        ts_codes: Optional[List[str]] = None,
+        columns: Optional[List[str]] = None
     ) -> pd.DataFrame:
         """
-        从数据库加载指标数据
+        加载指标数据（面板存储 → 本地缓存 → 数据库）
 
         Args:
             start_date: 开始日期 (YYYYMMDD)
             end_date: 结束日期 (YYYYMMDD)
             ts_codes: 股票代码列表，None 表示全部
+            columns: 指标列，None 表示全部
 
         Returns:
-            DataFrame 包含所有指标数据
+            DataFrame 包含所需指标数据
         """
-        query = "SELECT * FROM daily_indicator WHERE 1=1"
-        params = {}
-
-        if start_date:
-            query += " AND trade_date >= :start_date"
-            params['start_date'] = start_date
-
-        if end_date:
-            query += " AND trade_date <= :end_date"
-            params['end_date'] = end_date
-
-        if ts_codes:
-            placeholders = ', '.join([f":code_{i}" for i in range(len(ts_codes))])
-            query += f" AND ts_code IN ({placeholders})"
-            for i, code in enumerate(ts_codes):
-                params[f'code_{i}'] = code
-
-        query += " ORDER BY ts_code, trade_date"
-
-        df = pd.read_sql(text(query), self.db.bind, params=params)
-        logger.info(f"加载指标数据: {len(df)} 条记录, {df['ts_code'].nunique()} 只股票")
-
-        return df
+        return load_indicator_frame(
+            self.db.get_bind(), start_date, end_date, columns=columns, ts_codes=ts_codes,
+            float_dtype='float32' if self.compact else None,
+            use_cache=self.use_cache, panel_store=self.panel_store
+        )
 
     def load_price_data(
         self,
@@ -104,25 +92,10 @@ class FactorAnalyzer:
         end_date: Optional[str] = None
     ) -> pd.DataFrame:
         """加载日线价格数据（用于计算未来收益）"""
-        query = """
-            SELECT ts_code, trade_date, close, high, low, open, vol, pct_chg
-            FROM daily_data
-            WHERE 1=1
-        """
-        params = {}
-
-        if start_date:
-            query += " AND trade_date >= :start_date"
-            params['start_date'] = start_date
-
-        if end_date:
-            query += " AND trade_date <= :end_date"
-            params['end_date'] = end_date
-
-        query += " ORDER BY ts_code, trade_date"
-
-        df = pd.read_sql(text(query), self.db.bind, params=params)
-        return df
+        return load_price_frame(
+            self.db.get_bind(), start_date, end_date,
+            use_cache=self.use_cache, panel_store=self.panel_store
+        )
 
     def calculate_future_returns(
         self,
@@ -143,15 +116,15 @@ class FactorAnalyzer:
 
         for period in periods:
             # 未来 N 日收益率
-            df[f'forward_ret_{period}d'] = df.groupby('ts_code')['close'].transform(
+            df[f'forward_ret_{period}d'] = df.groupby('ts_code', observed=True)['close'].transform(
                 lambda x: x.shift(-period) / x - 1
             )
             # 未来 N 日最大收益
-            df[f'max_ret_{period}d'] = df.groupby('ts_code')['high'].transform(
+            df[f'max_ret_{period}d'] = df.groupby('ts_code', observed=True)['high'].transform(
                 lambda x: x.rolling(-period, min_periods=1).max().shift(-period) / x - 1
             )
             # 未来 N 日最大亏损
-            df[f'min_ret_{period}d'] = df.groupby('ts_code')['low'].transform(
+            df[f'min_ret_{period}d'] = df.groupby('ts_code', observed=True)['low'].transform(
                 lambda x: x.rolling(-period, min_periods=1).min().shift(-period) / x - 1
             )
 
@@ -177,7 +150,7 @@ class FactorAnalyzer:
             IC 统计信息
         """
         # 按日期分组计算 IC
-        ic_series = factor_df.groupby('trade_date').apply(
+        ic_series = factor_df.groupby('trade_date', observed=True).apply(
             lambda x: x[[factor_col, return_col]].dropna().corr(method=method).iloc[0, 1]
         )
 
@@ -213,7 +186,7 @@ class FactorAnalyzer:
         df = factor_df.copy()
 
         # 按日期分组，每日进行分位数分组
-        df['factor_group'] = df.groupby('trade_date')[factor_col].transform(
+        df['factor_group'] = df.groupby('trade_date', observed=True)[factor_col].transform(
             lambda x: pd.qcut(x.rank(method='first'), n_groups, labels=False, duplicates='drop')
         )
 
@@ -259,7 +232,7 @@ class FactorAnalyzer:
 
         # 加载数据
         logger.info("加载指标数据...")
-        indicator_df = self.load_indicator_data(start_date, end_date)
+        indicator_df = self.load_indicator_data(start_date, end_date, columns=factors)
 
         logger.info("加载价格数据...")
         price_df = self.load_price_data(start_date, end_date)
@@ -16,8 +16,10 @@ from loguru import logger
 from datetime import datetime
 
 from app.core.database import get_db_context
-from strategy.signal_engine import SignalEngine, SignalStrategy, SignalType, FactorCondition
+from strategy.signal_engine import SignalEngine
+from strategy.strategy_store import load_strategies
 from strategy.backtest_engine import BacktestEngine, BacktestConfig
+from strategy.market_context import MarketDataContext
 
 
 def run_full_backtest():
@@ -28,24 +30,8 @@ def run_full_backtest():
 
     # 测试两个策略
     strategies_to_test = [
-        {
-            'name': 'oversold_reversal',
-            'conditions': [
-                FactorCondition('j_value', '<', -10),
-                FactorCondition('macd_hist', '>', 0),
-                FactorCondition('vol_ratio', '>', 1.0),
-            ],
-            'description': 'J<-10 + MACD金叉 + 放量'
-        },
-        {
-            'name': 'custom_j_rsi_vol',
-            'conditions': [
-                FactorCondition('j_value', '<', -10),
-                FactorCondition('rsi6', '<', 15),
-                FactorCondition('vol_ratio', '>', 1.0),
-            ],
-            'description': 'J<-10 + RSI<15 + 放量'
-        }
+        SignalEngine().get_strategy('oversold_reversal'),   # J<-10 + MACD金叉 + 放量
+        *load_strategies('short_term'),                     # J<-10 + RSI<15 + 放量
     ]
 
     # 回测配置
@@ -64,33 +50,28 @@ def run_full_backtest():
     start_date = '20240101'
     end_date = '20260424'
 
+    # 指标与价格数据只加载一次，各次回测共用
+    context = MarketDataContext(start_date, end_date)
+
     results = {}
 
     with get_db_context() as db:
         for strat in strategies_to_test:
-            logger.info(f"\n测试策略: {strat['name']}")
-            logger.info(f"条件: {strat['description']}")
-
-            # 创建策略
-            custom_strategy = SignalStrategy(
-                name=strat['name'],
-                signal_type=SignalType.CUSTOM,
-                conditions=strat['conditions'],
-                combine_mode='and',
-                description=strat['description']
-            )
+            logger.info(f"\n测试策略: {strat.name}")
+            logger.info(f"条件: {strat.description}")
 
             engine = BacktestEngine(config)
-            engine.signal_engine.register_strategy(custom_strategy)
+            engine.signal_engine.register_strategy(strat)
 
             # 运行回测
             performance = engine.run_backtest(
                 db, start_date, end_date,
-                strategy_names=[strat['name']],
-                min_score=0.3
+                strategy_names=[strat.name],
+                min_score=0.3,
+                data_context=context
             )
 
-            results[strat['name']] = {
+            results[strat.name] = {
                 'performance': performance,
                 'trades': performance.get('trades', pd.DataFrame()),
                 'daily_values': performance.get('daily_values', pd.DataFrame())
@@ -1,6 +1,7 @@
 """
-技术指标预计算服务 - 单进程批量版本
+技术指标预计算服务 - 批量版本
 从日线数据计算所有技术指标并存储到数据库
+支持单进程和多进程分片两种运行方式
 """
 import sys
 import os
@@ -17,31 +18,52 @@ load_dotenv(os.path.join(backend_dir, '.env'))
 import pandas as pd
 import numpy as np
 from loguru import logger
-from typing import Optional
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy import text
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sqlalchemy import text, create_engine, bindparam
+from sqlalchemy.orm import sessionmaker
 
+from app.core.config import get_settings
 from app.core.database import SessionLocal, engine
-from app.models.indicator import DailyIndicator
 from app.core.logging import setup_logging
+from strategy.indicator_kernels import ma_alignment, rolling_mean_deviation, rolling_max, rolling_min
+from strategy.indicator_panel import calculate_all_indicators_panel, extract_panel_states
+from strategy.indicator_registry import (INDICATORS, register_indicator, resolve_indicators,
+                                         indicator_output_columns, max_lookback)
+from strategy.indicator_writer import WRITE_METHODS, write_indicator_frame
+from strategy.data_loader import iter_daily_batches, load_daily_groups
 
 # 初始化日志配置
 setup_logging()
 
 
+# 均线周期
+MA_PERIODS = [5, 10, 20, 30, 60, 120, 250]
+
+# 递推类指标的平滑参数，与 calculate_kdj / calculate_macd 的默认参数保持一致
+KDJ_ALPHA = 1 / 3
+MACD_FAST_ALPHA = 2 / (12 + 1)
+MACD_SLOW_ALPHA = 2 / (26 + 1)
+MACD_SIGNAL_ALPHA = 2 / (9 + 1)
+
+
 # ============== 技术指标计算函数 ==============
 
-def calculate_ma(df: pd.DataFrame, periods: list = [5, 10, 20, 30, 60, 120, 250]) -> pd.DataFrame:
+@register_indicator('ma', outputs=[f'ma{n}' for n in MA_PERIODS], lookback=250)
+def calculate_ma(df: pd.DataFrame, periods: list = MA_PERIODS) -> pd.DataFrame:
     """计算均线"""
     for n in periods:
         df[f'ma{n}'] = df['close'].rolling(window=n, min_periods=n).mean()
     return df
 
 
+@register_indicator('kdj', outputs=['k_value', 'd_value', 'j_value'], inputs=['high', 'low', 'close'],
+                    lookback=9)
 def calculate_kdj(df: pd.DataFrame, n: int = 9, m1: int = 3, m2: int = 3) -> pd.DataFrame:
     """计算KDJ指标"""
-    low_n = df['low'].rolling(window=n, min_periods=n).min()
-    high_n = df['high'].rolling(window=n, min_periods=n).max()
+    low_n = pd.Series(rolling_min(df['low'].to_numpy(), n), index=df.index)
+    high_n = pd.Series(rolling_max(df['high'].to_numpy(), n), index=df.index)
 
     rsv = (df['close'] - low_n) / (high_n - low_n) * 100
     rsv = rsv.fillna(50)
@@ -53,6 +75,7 @@ def calculate_kdj(df: pd.DataFrame, n: int = 9, m1: int = 3, m2: int = 3) -> pd.
     return df
 
 
+@register_indicator('rsi', outputs=['rsi6', 'rsi12', 'rsi24'], lookback=25)
 def calculate_rsi(df: pd.DataFrame, periods: list = [6, 12, 24]) -> pd.DataFrame:
     """计算RSI指标"""
     for n in periods:
@@ -76,6 +99,7 @@ def calculate_rsi(df: pd.DataFrame, periods: list = [6, 12, 24]) -> pd.DataFrame
     return df
 
 
+@register_indicator('macd', outputs=['macd_dif', 'macd_dea', 'macd_hist'], lookback=26)
 def calculate_macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
     """计算MACD指标"""
     ema_fast = df['close'].ewm(span=fast, adjust=False).mean()
@@ -88,6 +112,8 @@ def calculate_macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int
     return df
 
 
+@register_indicator('boll', outputs=['boll_upper', 'boll_mid', 'boll_lower', 'boll_width', 'boll_position'],
+                    lookback=20)
 def calculate_boll(df: pd.DataFrame, n: int = 20, k: float = 2) -> pd.DataFrame:
     """计算布林带"""
     df['boll_mid'] = df['close'].rolling(window=n, min_periods=n).mean()
@@ -106,21 +132,23 @@ def calculate_boll(df: pd.DataFrame, n: int = 20, k: float = 2) -> pd.DataFrame:
     return df
 
 
+@register_indicator('cci', outputs=['cci'], inputs=['high', 'low', 'close'], lookback=14)
 def calculate_cci(df: pd.DataFrame, n: int = 14) -> pd.DataFrame:
     """计算CCI指标"""
     tp = (df['high'] + df['low'] + df['close']) / 3
     ma = tp.rolling(window=n, min_periods=n).mean()
-    md = tp.rolling(window=n, min_periods=n).apply(lambda x: np.abs(x - x.mean()).mean())
+    md = rolling_mean_deviation(tp.to_numpy(), n)
     # 处理除零：当 md == 0 时，cci 设为 0
     df['cci'] = np.where(md == 0, 0, (tp - ma) / (0.015 * md))
     return df
 
 
+@register_indicator('wr', outputs=['wr10', 'wr14'], inputs=['high', 'low', 'close'], lookback=14)
 def calculate_wr(df: pd.DataFrame, periods: list = [10, 14]) -> pd.DataFrame:
     """计算威廉指标"""
     for n in periods:
-        high_n = df['high'].rolling(window=n, min_periods=n).max()
-        low_n = df['low'].rolling(window=n, min_periods=n).min()
+        high_n = rolling_max(df['high'].to_numpy(), n)
+        low_n = rolling_min(df['low'].to_numpy(), n)
         # 处理除零：当 high_n == low_n 时，wr 设为 50
         high_low_range = high_n - low_n
         df[f'wr{n}'] = np.where(high_low_range == 0, 50,
@@ -128,6 +156,7 @@ def calculate_wr(df: pd.DataFrame, periods: list = [10, 14]) -> pd.DataFrame:
     return df
 
 
+@register_indicator('obv', outputs=['obv', 'obv_ma5', 'obv_ma10'], inputs=['close', 'vol'], lookback=10)
 def calculate_obv(df: pd.DataFrame) -> pd.DataFrame:
     """计算OBV指标"""
     direction = np.where(df['close'] > df['close'].shift(1), 1, -1)
@@ -138,28 +167,29 @@ def calculate_obv(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+@register_indicator('ma_deviation', outputs=[f'ma{n}_deviation' for n in MA_PERIODS] + ['ma_alignment'],
+                    depends_on=['ma'])
 def calculate_ma_deviation(df: pd.DataFrame) -> pd.DataFrame:
     """计算均线偏离度"""
-    for n in [5, 10, 20, 30, 60, 120, 250]:
+    for n in MA_PERIODS:
         if f'ma{n}' in df.columns:
             # 处理除零：当 ma == 0 时，deviation 设为 0
             df[f'ma{n}_deviation'] = np.where(df[f'ma{n}'] == 0, 0,
                                                (df['close'] - df[f'ma{n}']) / df[f'ma{n}'])
 
-    def check_ma_alignment(row):
-        mas = [row.get(f'ma{n}', np.nan) for n in [5, 10, 20, 30, 60]]
-        if any(np.isnan(mas)):
-            return 0
-        if all(mas[i] > mas[i+1] for i in range(len(mas)-1)):
-            return 1
-        if all(mas[i] < mas[i+1] for i in range(len(mas)-1)):
-            return -1
-        return 0
-
-    df['ma_alignment'] = df.apply(check_ma_alignment, axis=1)
+    # 均线排列：缺少的均线按缺失值处理（结果为 0）
+    mas = np.column_stack([
+        df[f'ma{n}'].to_numpy(dtype=float) if f'ma{n}' in df.columns else np.full(len(df), np.nan)
+        for n in [5, 10, 20, 30, 60]
+    ])
+    df['ma_alignment'] = ma_alignment(mas)
     return df
 
 
+@register_indicator('price_factors', outputs=[
+    'consecutive_down', 'consecutive_up', 'drawdown_20d', 'drawdown_60d', 'rebound_20d', 'rebound_60d',
+    'amplitude', 'pct_change', 'pct_change_5d', 'pct_change_10d', 'pct_change_20d'
+], inputs=['high', 'low', 'close'], lookback=61)
 def calculate_price_factors(df: pd.DataFrame) -> pd.DataFrame:
     """计算价格形态因子"""
     # 连续下跌天数
@@ -175,22 +205,22 @@ def calculate_price_factors(df: pd.DataFrame) -> pd.DataFrame:
     ).cumsum()
 
     # 距20日高点回撤
-    df['high_20d'] = df['high'].rolling(window=20, min_periods=1).max()
+    df['high_20d'] = rolling_max(df['high'].to_numpy(), 20, min_periods=1)
     df['drawdown_20d'] = np.where(df['high_20d'] == 0, 0,
                                    (df['close'] - df['high_20d']) / df['high_20d'])
 
     # 距60日高点回撤
-    df['high_60d'] = df['high'].rolling(window=60, min_periods=1).max()
+    df['high_60d'] = rolling_max(df['high'].to_numpy(), 60, min_periods=1)
     df['drawdown_60d'] = np.where(df['high_60d'] == 0, 0,
                                    (df['close'] - df['high_60d']) / df['high_60d'])
 
     # 距20日低点反弹
-    df['low_20d'] = df['low'].rolling(window=20, min_periods=1).min()
+    df['low_20d'] = rolling_min(df['low'].to_numpy(), 20, min_periods=1)
     df['rebound_20d'] = np.where(df['low_20d'] == 0, 0,
                                   (df['close'] - df['low_20d']) / df['low_20d'])
 
     # 距60日低点反弹
-    df['low_60d'] = df['low'].rolling(window=60, min_periods=1).min()
+    df['low_60d'] = rolling_min(df['low'].to_numpy(), 60, min_periods=1)
     df['rebound_60d'] = np.where(df['low_60d'] == 0, 0,
                                   (df['close'] - df['low_60d']) / df['low_60d'])
 
@@ -208,6 +238,8 @@ def calculate_price_factors(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+@register_indicator('volume', outputs=['vol_ma5', 'vol_ma10', 'vol_ma20', 'vol_ratio', 'vol_ratio_10'],
+                    inputs=['vol'], lookback=20)
 def calculate_volume_factors(df: pd.DataFrame) -> pd.DataFrame:
     """计算成交量因子"""
     df['vol_ma5'] = df['vol'].rolling(window=5, min_periods=5).mean()
@@ -221,6 +253,7 @@ def calculate_volume_factors(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+@register_indicator('atr', outputs=['atr14'], inputs=['high', 'low', 'close'], lookback=15)
 def calculate_atr(df: pd.DataFrame, n: int = 14) -> pd.DataFrame:
     """计算ATR (真实波动幅度)"""
     high = df['high']
@@ -237,6 +270,7 @@ def calculate_atr(df: pd.DataFrame, n: int = 14) -> pd.DataFrame:
     return df
 
 
+@register_indicator('dma', outputs=['dma_dif', 'dma_ama'], lookback=59)
 def calculate_dma(df: pd.DataFrame) -> pd.DataFrame:
     """计算DMA (平行线差指标)"""
     ma10 = df['close'].rolling(window=10, min_periods=10).mean()
@@ -248,6 +282,7 @@ def calculate_dma(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+@register_indicator('vr', outputs=['vr'], inputs=['close', 'vol'], lookback=27)
 def calculate_vr(df: pd.DataFrame, n: int = 26) -> pd.DataFrame:
     """计算VR (成交量比率)"""
     close = df['close']
@@ -272,162 +307,633 @@ def calculate_vr(df: pd.DataFrame, n: int = 26) -> pd.DataFrame:
     return df
 
 
+def calculate_indicators(df: pd.DataFrame, names: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    按注册表计算指定指标（自动补齐依赖的指标）
+
+    Args:
+        df: 单只股票按日期升序的日线数据
+        names: 指标名称或输出列名，None 表示全部
+
+    Returns:
+        添加了指标列的 DataFrame
+    """
+    defs, _ = resolve_indicators(names)
+    missing = sorted({col for defn in defs for col in defn.inputs} - set(df.columns))
+    if missing:
+        raise ValueError(f"日线数据缺少指标计算所需的列: {missing}")
+
+    for defn in defs:
+        df = defn.func(df)
+    return df
+
+
 def calculate_all_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """计算所有技术指标"""
-    df = calculate_ma(df)
-    df = calculate_kdj(df)
-    df = calculate_rsi(df)
-    df = calculate_macd(df)
-    df = calculate_boll(df)
-    df = calculate_cci(df)
-    df = calculate_wr(df)
-    df = calculate_obv(df)
-    df = calculate_ma_deviation(df)
-    df = calculate_price_factors(df)
-    df = calculate_volume_factors(df)
-    df = calculate_atr(df)
-    df = calculate_dma(df)
-    df = calculate_vr(df)
-    return df
+    return calculate_indicators(df)
+
+
+# daily_indicator 表中由本模块写入的指标列（由注册表生成）
+INDICATOR_COLUMNS = ['ts_code', 'trade_date'] + indicator_output_columns()
+
+# 增量计算的回看K线数量：覆盖最长的滚动窗口 (MA250)
+INCREMENTAL_LOOKBACK = max_lookback()
+
+# 增量计算批量预加载的自然日跨度（约 330 个交易日）；停牌较久导致回看不足的股票单独查询
+INCREMENTAL_PRELOAD_DAYS = INCREMENTAL_LOOKBACK * 2
+
+
+def selected_indicator_columns(names: Optional[List[str]] = None) -> List[str]:
+    """写入 daily_indicator 的列：names 为空时为全部指标列，否则为主键加所选指标列"""
+    if names is None:
+        return INDICATOR_COLUMNS
+    _, selected = resolve_indicators(names)
+    return ['ts_code', 'trade_date'] + selected
+
 
+# ============== 增量计算状态 ==============
 
-def run_indicator_calculation(batch_size: int = 100):
+def extract_indicator_state(df: pd.DataFrame) -> dict:
     """
-    运行指标预计算 - 单进程批量版本
+    从完整计算结果中提取最后一个交易日的递推状态
 
     Args:
-        batch_size: 每批处理的股票数量
+        df: 已经过 calculate_all_indicators 的单只股票数据
+
+    Returns:
+        可写入 daily_indicator_state 的状态字典
     """
-    logger.info("=" * 60)
-    logger.info("技术指标预计算 (单进程批量版本)")
-    logger.info("=" * 60)
+    last = df.iloc[-1]
+    ema_fast = df['close'].ewm(span=12, adjust=False).mean().iloc[-1]
+    ema_slow = df['close'].ewm(span=26, adjust=False).mean().iloc[-1]
 
-    start_time = datetime.now()
+    return {
+        'ts_code': last['ts_code'],
+        'trade_date': last['trade_date'],
+        'k_value': float(last['k_value']),
+        'd_value': float(last['d_value']),
+        'ema_fast': float(ema_fast),
+        'ema_slow': float(ema_slow),
+        'macd_dea': float(last['macd_dea']),
+        'obv': float(last['obv']),
+        'consecutive_down': int(last['consecutive_down']),
+        'consecutive_up': int(last['consecutive_up']),
+    }
 
-    # 1. 获取所有股票代码
-    db = SessionLocal()
-    result = db.execute(text("SELECT DISTINCT ts_code FROM daily_data ORDER BY ts_code"))
-    stock_codes = [row[0] for row in result.fetchall()]
-    db.close()
 
-    total_stocks = len(stock_codes)
-    logger.info(f"待处理股票数: {total_stocks}")
+def save_indicator_state(db, state: dict):
+    """写入/更新单只股票的增量计算状态（不提交事务）"""
+    db.execute(text("""
+        INSERT INTO daily_indicator_state
+        (ts_code, trade_date, k_value, d_value, ema_fast, ema_slow, macd_dea,
+         obv, consecutive_down, consecutive_up)
+        VALUES (:ts_code, :trade_date, :k_value, :d_value, :ema_fast, :ema_slow, :macd_dea,
+                :obv, :consecutive_down, :consecutive_up)
+        ON DUPLICATE KEY UPDATE
+            trade_date=VALUES(trade_date), k_value=VALUES(k_value), d_value=VALUES(d_value),
+            ema_fast=VALUES(ema_fast), ema_slow=VALUES(ema_slow), macd_dea=VALUES(macd_dea),
+            obv=VALUES(obv), consecutive_down=VALUES(consecutive_down),
+            consecutive_up=VALUES(consecutive_up)
+    """), state)
 
-    # 2. 批量处理
-    success_count = 0
-    error_count = 0
-    skipped_count = 0
-    total_records = 0
 
-    for batch_start in range(0, total_stocks, batch_size):
-        batch_end = min(batch_start + batch_size, total_stocks)
-        batch_codes = stock_codes[batch_start:batch_end]
+def calculate_incremental_indicators(window_df: pd.DataFrame, state: dict) -> Tuple[pd.DataFrame, dict]:
+    """
+    基于回看窗口和上一交易日状态，计算新增交易日的指标
 
-        db = SessionLocal()
+    滚动窗口类指标直接在窗口上计算（窗口覆盖最长回看期，结果与全量计算一致）；
+    KDJ/MACD 的 EMA、OBV 累计值和连续涨跌天数从状态递推，不依赖窗口之前的历史。
 
-        for ts_code in batch_codes:
+    Args:
+        window_df: 按日期升序的日线数据，包含状态日期及之前最多
+                   INCREMENTAL_LOOKBACK 根K线和之后的所有新K线
+        state: daily_indicator_state 中该股票的状态
+
+    Returns:
+        (新增交易日的指标数据, 更新后的状态)
+    """
+    df = calculate_all_indicators(window_df.reset_index(drop=True))
+    new_idx = np.flatnonzero((df['trade_date'] > state['trade_date']).to_numpy())
+
+    close = df['close'].to_numpy(dtype=float)
+
+    # KDJ：RSV 与 calculate_kdj 相同，K/D 从状态递推
+    low_n = rolling_min(df['low'].to_numpy(), 9)
+    high_n = rolling_max(df['high'].to_numpy(), 9)
+    rsv = ((df['close'] - low_n) / (high_n - low_n) * 100).fillna(50).to_numpy()
+
+    k_value, d_value = state['k_value'], state['d_value']
+    ema_fast, ema_slow, dea = state['ema_fast'], state['ema_slow'], state['macd_dea']
+    consecutive_down, consecutive_up = state['consecutive_down'], state['consecutive_up']
+
+    k_col = df.columns.get_loc('k_value')
+    d_col = df.columns.get_loc('d_value')
+    j_col = df.columns.get_loc('j_value')
+    dif_col = df.columns.get_loc('macd_dif')
+    dea_col = df.columns.get_loc('macd_dea')
+    hist_col = df.columns.get_loc('macd_hist')
+    down_col = df.columns.get_loc('consecutive_down')
+    up_col = df.columns.get_loc('consecutive_up')
+
+    for i in new_idx:
+        k_value = (1 - KDJ_ALPHA) * k_value + KDJ_ALPHA * rsv[i]
+        d_value = (1 - KDJ_ALPHA) * d_value + KDJ_ALPHA * k_value
+        df.iat[i, k_col] = k_value
+        df.iat[i, d_col] = d_value
+        df.iat[i, j_col] = 3 * k_value - 2 * d_value
+
+        ema_fast = (1 - MACD_FAST_ALPHA) * ema_fast + MACD_FAST_ALPHA * close[i]
+        ema_slow = (1 - MACD_SLOW_ALPHA) * ema_slow + MACD_SLOW_ALPHA * close[i]
+        dif = ema_fast - ema_slow
+        dea = (1 - MACD_SIGNAL_ALPHA) * dea + MACD_SIGNAL_ALPHA * dif
+        df.iat[i, dif_col] = dif
+        df.iat[i, dea_col] = dea
+        df.iat[i, hist_col] = 2 * (dif - dea)
+
+        consecutive_down = consecutive_down + 1 if close[i] < close[i - 1] else 0
+        consecutive_up = consecutive_up + 1 if close[i] > close[i - 1] else 0
+        df.iat[i, down_col] = consecutive_down
+        df.iat[i, up_col] = consecutive_up
+
+    # OBV：窗口内的增量与全量一致，以状态日的 OBV 为锚点平移整段序列
+    direction = np.where(df['close'] > df['close'].shift(1), 1, -1)
+    direction[0] = 0
+    obv_flow = np.cumsum(df['vol'].to_numpy(dtype=float) * direction)
+    anchor = new_idx[0] - 1
+    df['obv'] = state['obv'] + obv_flow - obv_flow[anchor]
+    df['obv_ma5'] = df['obv'].rolling(window=5, min_periods=5).mean()
+    df['obv_ma10'] = df['obv'].rolling(window=10, min_periods=10).mean()
+
+    new_df = df.iloc[new_idx]
+    last = new_df.iloc[-1]
+    new_state = {
+        'ts_code': state['ts_code'],
+        'trade_date': last['trade_date'],
+        'k_value': float(k_value),
+        'd_value': float(d_value),
+        'ema_fast': float(ema_fast),
+        'ema_slow': float(ema_slow),
+        'macd_dea': float(dea),
+        'obv': float(last['obv']),
+        'consecutive_down': int(consecutive_down),
+        'consecutive_up': int(consecutive_up),
+    }
+
+    return new_df, new_state
+
+
+def _query_incremental_window(db, ts_code: str, state_date: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """单独查询一只股票状态日期前的回看K线与之后的新K线（均按日期升序）"""
+    tail_df = pd.read_sql(text("""
+        SELECT ts_code, trade_date, open, high, low, close, vol
+        FROM daily_data
+        WHERE ts_code = :ts_code AND trade_date <= :trade_date
+        ORDER BY trade_date DESC
+        LIMIT :lookback
+    """), db.bind, params={'ts_code': ts_code, 'trade_date': state_date, 'lookback': INCREMENTAL_LOOKBACK})
+    new_df = pd.read_sql(text("""
+        SELECT ts_code, trade_date, open, high, low, close, vol
+        FROM daily_data
+        WHERE ts_code = :ts_code AND trade_date > :trade_date
+        ORDER BY trade_date ASC
+    """), db.bind, params={'ts_code': ts_code, 'trade_date': state_date})
+    return tail_df.iloc[::-1].reset_index(drop=True), new_df
+
+
+def update_stock_incremental(db, state: dict, write_method: str = 'upsert',
+                             daily_df: Optional[pd.DataFrame] = None) -> Tuple[str, int, float]:
+    """
+    增量更新单只股票：只计算并写入状态日期之后的新交易日
+
+    Args:
+        db: 数据库会话
+        state: 该股票的增量计算状态
+        write_method: 写入方式，见 indicator_writer.WRITE_METHODS
+        daily_df: 预加载的日线数据（按日期升序），状态日期前不足 INCREMENTAL_LOOKBACK
+            根K线时改为单独查询；为空时单独查询
+
+    Returns:
+        (状态 'success' / 'skipped', 写入记录数, 写入耗时秒数)
+    """
+    ts_code = state['ts_code']
+    if daily_df is not None:
+        is_new = daily_df['trade_date'] > state['trade_date']
+        tail_df = daily_df[~is_new].tail(INCREMENTAL_LOOKBACK)
+        new_df = daily_df[is_new]
+        if len(tail_df) < INCREMENTAL_LOOKBACK:
+            daily_df = None
+
+    if daily_df is None:
+        tail_df, new_df = _query_incremental_window(db, ts_code, state['trade_date'])
+
+    if len(new_df) == 0:
+        return 'skipped', 0, 0.0
+
+    # 状态与日线不一致（如历史数据被修正），回退到全量计算
+    if len(tail_df) == 0 or tail_df['trade_date'].iloc[-1] != state['trade_date']:
+        logger.warning(f"{ts_code} 增量状态与日线数据不一致，改为全量计算")
+        return calculate_and_save_stock(db, ts_code, write_method)
+
+    window_df = pd.concat([tail_df, new_df], ignore_index=True)
+    indicator_df, new_state = calculate_incremental_indicators(window_df, state)
+
+    try:
+        written = write_indicator_frame(db, indicator_df, INDICATOR_COLUMNS, method=write_method)
+        save_indicator_state(db, new_state)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return 'success', written['rows'], written['seconds']
+
+
+def calculate_and_save_stock(db, ts_code: str, write_method: str = 'orm',
+                             daily_df: Optional[pd.DataFrame] = None,
+                             indicators: Optional[List[str]] = None) -> Tuple[str, int, float]:
+    """
+    计算单只股票的全部指标并写入数据库
+
+    Args:
+        db: 数据库会话
+        ts_code: 股票代码
+        write_method: 写入方式，见 indicator_writer.WRITE_METHODS
+        daily_df: 预加载的全部日线数据（按日期升序），为空时单独查询
+        indicators: 只计算并更新所选指标（指标名或指标列名），不删除旧数据、不更新增量状态，
+            需使用 upsert 写入；None 表示全部指标
+
+    Returns:
+        (状态 'success' / 'skipped', 写入记录数, 写入耗时秒数)
+    """
+    if daily_df is None:
+        query = text("""
+            SELECT ts_code, trade_date, open, high, low, close, vol
+            FROM daily_data
+            WHERE ts_code = :ts_code
+            ORDER BY trade_date ASC
+        """)
+        df = pd.read_sql(query, db.bind, params={'ts_code': ts_code})
+    else:
+        df = daily_df
+
+    if len(df) < 60:
+        return 'skipped', 0, 0.0
+
+    if indicators is not None:
+        df = calculate_indicators(df, indicators)
+        try:
+            written = write_indicator_frame(db, df, selected_indicator_columns(indicators), method=write_method)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return 'success', written['rows'], written['seconds']
+
+    # 计算所有指标
+    df = calculate_all_indicators(df)
+
+    try:
+        # 删除旧数据后写入
+        db.execute(text("DELETE FROM daily_indicator WHERE ts_code = :ts_code"), {'ts_code': ts_code})
+        written = write_indicator_frame(db, df, INDICATOR_COLUMNS, method=write_method)
+        save_indicator_state(db, extract_indicator_state(df))
+        db.commit()
+    except Exception as insert_error:
+        db.rollback()
+        raise insert_error
+
+    return 'success', written['rows'], written['seconds']
+
+
+def calculate_and_save_batch(db, ts_codes: List[str], write_method: str = 'orm',
+                             daily_df: Optional[pd.DataFrame] = None,
+                             indicators: Optional[List[str]] = None) -> Dict:
+    """
+    面板模式：一次查询一批股票的日线数据，向量化计算全部指标后写入数据库
+
+    Args:
+        db: 数据库会话
+        ts_codes: 股票代码列表
+        write_method: 写入方式，见 indicator_writer.WRITE_METHODS
+        daily_df: 预加载的这批股票日线数据（按 ts_code, trade_date 升序），为空时查询
+        indicators: 只更新所选指标列（面板仍计算全部指标），不删除旧数据、不更新增量状态；
+            None 表示全部指标
+
+    Returns:
+        批次统计 {'success', 'skipped', 'total_records', 'write_seconds'}
+    """
+    if daily_df is None:
+        query = text("""
+            SELECT ts_code, trade_date, open, high, low, close, vol
+            FROM daily_data
+            WHERE ts_code IN :ts_codes
+            ORDER BY ts_code, trade_date ASC
+        """).bindparams(bindparam('ts_codes', expanding=True))
+        df = pd.read_sql(query, db.bind, params={'ts_codes': list(ts_codes)})
+    else:
+        df = daily_df
+
+    # 与单股票版本一致：历史不足60天的股票跳过
+    counts = df.groupby('ts_code').size()
+    valid_codes = counts[counts >= 60].index
+    df = df[df['ts_code'].isin(valid_codes)]
+    stats = {'success': len(valid_codes), 'skipped': len(ts_codes) - len(valid_codes),
+             'total_records': 0, 'write_seconds': 0.0}
+    if len(df) == 0:
+        return stats
+
+    df = calculate_all_indicators_panel(df)
+
+    if indicators is not None:
+        try:
+            written = write_indicator_frame(db, df, selected_indicator_columns(indicators), method=write_method)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        stats['total_records'] = written['rows']
+        stats['write_seconds'] = written['seconds']
+        return stats
+
+    try:
+        db.execute(
+            text("DELETE FROM daily_indicator WHERE ts_code IN :ts_codes").bindparams(
+                bindparam('ts_codes', expanding=True)),
+            {'ts_codes': list(valid_codes)}
+        )
+        written = write_indicator_frame(db, df, INDICATOR_COLUMNS, method=write_method)
+        for state in extract_panel_states(df):
+            save_indicator_state(db, state)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    stats['total_records'] = written['rows']
+    stats['write_seconds'] = written['seconds']
+    return stats
+
+
+# ============== 多进程分片 ==============
+
+# 每个 worker 进程独立持有的会话工厂（由 _init_worker 初始化）
+_worker_session_factory = None
+
+
+def _init_worker():
+    """进程池初始化：每个 worker 创建独立的数据库引擎"""
+    global _worker_session_factory
+
+    # fork 模式下子进程会继承父进程连接池中的连接，这里丢弃但不关闭，避免影响父进程
+    engine.dispose(close=False)
+
+    settings = get_settings()
+    worker_engine = create_engine(
+        settings.DATABASE_URL,
+        pool_size=1,
+        max_overflow=0,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+    )
+    _worker_session_factory = sessionmaker(bind=worker_engine, autoflush=False, autocommit=False)
+
+
+def _process_shard(ts_codes: List[str], panel: bool = False, write_method: str = 'orm',
+                   indicators: Optional[List[str]] = None) -> Dict:
+    """
+    worker 进程：处理一个股票分片
+
+    Args:
+        ts_codes: 分片内的股票代码列表
+        panel: 是否使用面板模式整片计算
+        write_method: 写入方式
+        indicators: 只更新所选指标，None 表示全部
+
+    Returns:
+        分片统计结果（含失败股票明细）
+    """
+    stats = {'success': 0, 'skipped': 0, 'error': 0, 'total_records': 0, 'write_seconds': 0.0,
+             'stocks': len(ts_codes), 'failed': []}
+
+    db = _worker_session_factory()
+    try:
+        if panel:
             try:
-                # 获取该股票的所有日线数据
-                query = text("""
-                    SELECT ts_code, trade_date, open, high, low, close, vol
-                    FROM daily_data
-                    WHERE ts_code = :ts_code
-                    ORDER BY trade_date ASC
-                """)
-                df = pd.read_sql(query, db.bind, params={'ts_code': ts_code})
-
-                if len(df) < 60:
-                    skipped_count += 1
-                    continue
+                stats.update(calculate_and_save_batch(db, ts_codes, write_method, indicators=indicators))
+            except Exception as e:
+                db.rollback()
+                stats['error'] += len(ts_codes)
+                stats['failed'].extend((ts_code, str(e)) for ts_code in ts_codes)
+            return stats
 
-                # 计算所有指标
-                df = calculate_all_indicators(df)
-
-                # 删除旧数据
-                db.execute(text("DELETE FROM daily_indicator WHERE ts_code = :ts_code"), {'ts_code': ts_code})
-
-                # 准备插入数据
-                indicator_columns = [
-                    'ts_code', 'trade_date',
-                    'k_value', 'd_value', 'j_value',
-                    'rsi6', 'rsi12', 'rsi24',
-                    'macd_dif', 'macd_dea', 'macd_hist',
-                    'boll_upper', 'boll_mid', 'boll_lower', 'boll_width', 'boll_position',
-                    'ma5', 'ma10', 'ma20', 'ma30', 'ma60', 'ma120', 'ma250',
-                    'ma5_deviation', 'ma10_deviation', 'ma20_deviation', 'ma30_deviation', 'ma60_deviation', 'ma120_deviation', 'ma250_deviation',
-                    'ma_alignment',
-                    'cci', 'wr10', 'wr14',
-                    'obv', 'obv_ma5', 'obv_ma10',
-                    'vol_ma5', 'vol_ma10', 'vol_ma20', 'vol_ratio', 'vol_ratio_10',
-                    'consecutive_down', 'consecutive_up',
-                    'drawdown_20d', 'drawdown_60d', 'rebound_20d', 'rebound_60d',
-                    'amplitude', 'pct_change', 'pct_change_5d', 'pct_change_10d', 'pct_change_20d',
-                    'atr14', 'dma_dif', 'dma_ama', 'vr'
-                ]
-
-                available_columns = [col for col in indicator_columns if col in df.columns]
-                df_insert = df[available_columns].copy()
-
-                # 正确处理 NaN 值：使用 replace 方法
-                df_insert = df_insert.replace({np.nan: None})
-
-                records = df_insert.to_dict('records')
-                if records:
-                    try:
-                        db.bulk_insert_mappings(DailyIndicator, records)
-                        db.commit()
-                        total_records += len(records)
-                    except Exception as insert_error:
-                        db.rollback()
-                        raise insert_error
+        # 整个分片一次查询读取
+        daily = load_daily_groups(db.get_bind(), ts_codes)
+        for ts_code in ts_codes:
+            try:
+                status, count, write_seconds = calculate_and_save_stock(
+                    db, ts_code, write_method, daily_df=daily.pop(ts_code, None), indicators=indicators
+                )
+                stats[status] += 1
+                stats['total_records'] += count
+                stats['write_seconds'] += write_seconds
+            except Exception as e:
+                db.rollback()
+                stats['error'] += 1
+                stats['failed'].append((ts_code, str(e)))
+    finally:
+        db.close()
 
-                success_count += 1
+    return stats
+
+
+def _run_sharded(stock_codes: List[str], batch_size: int, max_workers: int, start_time: datetime,
+                 panel: bool = False, write_method: str = 'orm', indicators: Optional[List[str]] = None) -> Dict:
+    """将股票列表按 batch_size 分片，分发到进程池并汇总进度"""
+    total_stocks = len(stock_codes)
+    shards = [stock_codes[i:i + batch_size] for i in range(0, total_stocks, batch_size)]
+    logger.info(f"并行模式: {max_workers} 个进程, {len(shards)} 个分片")
+
+    totals = {'success': 0, 'skipped': 0, 'error': 0, 'total_records': 0, 'write_seconds': 0.0, 'failed': []}
+    done_stocks = 0
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(_process_shard, shard, panel, write_method, indicators): shard for shard in shards}
 
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                # worker 进程异常退出，整个分片记为失败
+                stats = {'success': 0, 'skipped': 0, 'error': len(shard), 'total_records': 0, 'write_seconds': 0.0,
+                         'stocks': len(shard), 'failed': [(code, f"worker 异常: {e}") for code in shard]}
+
+            for key in ('success', 'skipped', 'error', 'total_records', 'write_seconds'):
+                totals[key] += stats[key]
+            totals['failed'].extend(stats['failed'])
+            for ts_code, message in stats['failed']:
+                logger.error(f"处理失败: {ts_code} - {message}")
+
+            # 汇总进度日志
+            done_stocks += stats['stocks']
+            elapsed = (datetime.now() - start_time).total_seconds()
+            speed = done_stocks / elapsed if elapsed > 0 else 0
+            remaining = (total_stocks - done_stocks) / speed if speed > 0 else 0
+            logger.info(
+                f"进度: {done_stocks}/{total_stocks} ({done_stocks*100/total_stocks:.1f}%) | "
+                f"成功: {totals['success']} | 跳过: {totals['skipped']} | 错误: {totals['error']} | "
+                f"速度: {speed:.1f}股/秒 | 剩余: {remaining:.0f}秒"
+            )
+
+    return totals
+
+
+def _run_serial(stock_codes: List[str], batch_size: int, start_time: datetime, panel: bool = False,
+                write_method: str = 'orm', indicators: Optional[List[str]] = None) -> Dict:
+    """单进程逐批处理：一条查询流式读取全表日线，每凑满 batch_size 只股票处理一批"""
+    total_stocks = len(stock_codes)
+    totals = {'success': 0, 'skipped': 0, 'error': 0, 'total_records': 0, 'write_seconds': 0.0, 'failed': []}
+    done_stocks = 0
+
+    for batch in iter_daily_batches(engine, batch_size):
+        batch_codes = [ts_code for ts_code, _ in batch]
+
+        db = SessionLocal()
+
+        if panel:
+            try:
+                batch_df = pd.concat([daily_df for _, daily_df in batch], ignore_index=True)
+                stats = calculate_and_save_batch(db, batch_codes, write_method, daily_df=batch_df,
+                                                 indicators=indicators)
+                for key in ('success', 'skipped', 'total_records', 'write_seconds'):
+                    totals[key] += stats[key]
             except Exception as e:
                 db.rollback()
-                error_count += 1
-                logger.error(f"处理失败: {ts_code} - {e}")
+                totals['error'] += len(batch_codes)
+                totals['failed'].extend((ts_code, str(e)) for ts_code in batch_codes)
+                logger.error(f"批次处理失败: {batch_codes[0]} ~ {batch_codes[-1]} - {e}")
+        else:
+            for ts_code, daily_df in batch:
+                try:
+                    status, count, write_seconds = calculate_and_save_stock(db, ts_code, write_method, daily_df,
+                                                                            indicators=indicators)
+                    totals[status] += 1
+                    totals['total_records'] += count
+                    totals['write_seconds'] += write_seconds
+                except Exception as e:
+                    db.rollback()
+                    totals['error'] += 1
+                    totals['failed'].append((ts_code, str(e)))
+                    logger.error(f"处理失败: {ts_code} - {e}")
 
         db.close()
 
         # 进度日志
+        done_stocks += len(batch)
         elapsed = (datetime.now() - start_time).total_seconds()
-        speed = batch_end / elapsed if elapsed > 0 else 0
-        remaining = (total_stocks - batch_end) / speed if speed > 0 else 0
+        speed = done_stocks / elapsed if elapsed > 0 else 0
+        remaining = (total_stocks - done_stocks) / speed if speed > 0 else 0
         logger.info(
-            f"进度: {batch_end}/{total_stocks} ({batch_end*100/total_stocks:.1f}%) | "
-            f"成功: {success_count} | 跳过: {skipped_count} | 错误: {error_count} | "
+            f"进度: {done_stocks}/{total_stocks} ({done_stocks*100/total_stocks:.1f}%) | "
+            f"成功: {totals['success']} | 跳过: {totals['skipped']} | 错误: {totals['error']} | "
             f"速度: {speed:.1f}股/秒 | 剩余: {remaining:.0f}秒"
         )
 
+    return totals
+
+
+def _log_write_speed(rows: int, seconds: float):
+    """输出写入耗时与速度（多进程时为各进程写入耗时之和）"""
+    speed = rows / seconds if seconds > 0 else 0
+    logger.info(f"写入耗时: {seconds:.1f}秒, 写入速度: {speed:.0f}行/秒")
+
+
+def run_indicator_calculation(batch_size: int = 100, max_workers: int = 1, panel: bool = False,
+                              write_method: str = 'orm', indicators: Optional[List[str]] = None):
+    """
+    运行指标预计算
+
+    Args:
+        batch_size: 每批处理的股票数量（并行模式下即每个分片的股票数量）
+        max_workers: 并行进程数，1 表示单进程
+        panel: 面板模式，每批股票一次查询并向量化计算
+        write_method: 写入方式 'orm' / 'upsert' / 'infile'，见 indicator_writer
+        indicators: 只重算所选指标（指标名或指标列名，如 ['kdj', 'rsi', 'vol_ratio']），
+            只更新这些列；None 表示全部指标
+    """
+    if indicators is not None:
+        # 校验指标名称，未知名称直接报错
+        selected = selected_indicator_columns(indicators)[2:]
+        if write_method != 'upsert':
+            # orm 插入会主键冲突，infile 的 REPLACE 会清空未选择的列
+            logger.warning(f"部分指标重算只能使用 upsert 写入，忽略写入方式 {write_method}")
+            write_method = 'upsert'
+
+    mode = f"{max_workers}进程并行" if max_workers > 1 else "单进程"
+    if panel:
+        mode += "面板"
+    logger.info("=" * 60)
+    logger.info(f"技术指标预计算 ({mode}批量版本, 写入方式: {write_method})")
+    if indicators is not None:
+        logger.info(f"只更新指标列 ({len(selected)}): {', '.join(selected)}")
+    logger.info("=" * 60)
+
+    start_time = datetime.now()
+
+    # 1. 获取所有股票代码
+    db = SessionLocal()
+    result = db.execute(text("SELECT DISTINCT ts_code FROM daily_data ORDER BY ts_code"))
+    stock_codes = [row[0] for row in result.fetchall()]
+    db.close()
+
+    total_stocks = len(stock_codes)
+    logger.info(f"待处理股票数: {total_stocks}")
+
+    # 2. 批量处理
+    if max_workers > 1 and total_stocks > 0:
+        totals = _run_sharded(stock_codes, batch_size, max_workers, start_time, panel, write_method, indicators)
+    else:
+        totals = _run_serial(stock_codes, batch_size, start_time, panel, write_method, indicators)
+
     # 3. 统计结果
     elapsed = (datetime.now() - start_time).total_seconds()
     logger.info("-" * 60)
     logger.info("计算完成!")
     logger.info(f"总耗时: {elapsed:.1f}秒")
-    logger.info(f"成功: {success_count}, 跳过: {skipped_count}, 错误: {error_count}")
-    logger.info(f"总记录数: {total_records}")
+    logger.info(f"成功: {totals['success']}, 跳过: {totals['skipped']}, 错误: {totals['error']}")
+    logger.info(f"总记录数: {totals['total_records']}")
+    _log_write_speed(totals['total_records'], totals['write_seconds'])
+    if totals['failed']:
+        failed_codes = [code for code, _ in totals['failed']]
+        logger.warning(f"失败股票 ({len(failed_codes)}): {', '.join(failed_codes[:50])}"
+                       + (" ..." if len(failed_codes) > 50 else ""))
     logger.info("=" * 60)
 
     return {
-        'success': success_count,
-        'skipped': skipped_count,
-        'error': error_count,
-        'total_records': total_records,
+        'success': totals['success'],
+        'skipped': totals['skipped'],
+        'error': totals['error'],
+        'total_records': totals['total_records'],
+        'failed_codes': [code for code, _ in totals['failed']],
+        'write_seconds': totals['write_seconds'],
         'elapsed_seconds': elapsed
     }
 
 
-def run_incremental_calculation(days: int = 30, batch_size: int = 100):
+def run_incremental_calculation(days: int = 30, batch_size: int = 100, write_method: str = 'upsert'):
     """
-    增量计算 - 只更新最近N天有新数据的股票
+    增量计算 - 只计算并写入各股票上次计算之后的新交易日
+
+    递推类指标从 daily_indicator_state 中的状态续算，滚动类指标只回看
+    INCREMENTAL_LOOKBACK 根K线；没有状态的股票（新股或首次运行）走全量计算。
 
     Args:
         days: 检查最近N天的数据更新
         batch_size: 每批处理的股票数量
+        write_method: 写入方式 'orm' / 'upsert' / 'infile'，见 indicator_writer
     """
     logger.info("=" * 60)
-    logger.info(f"技术指标增量计算 (最近{days}天)")
+    logger.info(f"技术指标增量计算 (最近{days}天, 写入方式: {write_method})")
     logger.info("=" * 60)
 
     start_time = datetime.now()
@@ -435,15 +941,26 @@ def run_incremental_calculation(days: int = 30, batch_size: int = 100):
     # 计算检查的起始日期
     check_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
 
-    # 1. 获取最近N天有新日线数据的股票
+    # 1. 获取最近N天有未计算日线数据的股票及其状态
     db = SessionLocal()
     result = db.execute(text("""
-        SELECT DISTINCT ts_code
-        FROM daily_data
-        WHERE trade_date >= :check_date
-        ORDER BY ts_code
+        SELECT DISTINCT d.ts_code
+        FROM daily_data d
+        LEFT JOIN daily_indicator_state s ON s.ts_code = d.ts_code
+        WHERE d.trade_date >= :check_date
+          AND (s.trade_date IS NULL OR d.trade_date > s.trade_date)
+        ORDER BY d.ts_code
     """), {'check_date': check_date})
     stock_codes = [row[0] for row in result.fetchall()]
+
+    states = {}
+    if stock_codes:
+        result = db.execute(text("""
+            SELECT ts_code, trade_date, k_value, d_value, ema_fast, ema_slow, macd_dea,
+                   obv, consecutive_down, consecutive_up
+            FROM daily_indicator_state
+        """))
+        states = {row._mapping['ts_code']: dict(row._mapping) for row in result.fetchall()}
     db.close()
 
     total_stocks = len(stock_codes)
@@ -451,74 +968,48 @@ def run_incremental_calculation(days: int = 30, batch_size: int = 100):
 
     if total_stocks == 0:
         logger.info("没有需要更新的股票")
-        return {'success': 0, 'skipped': 0, 'error': 0, 'total_records': 0, 'elapsed_seconds': 0}
+        return {'success': 0, 'skipped': 0, 'error': 0, 'total_records': 0, 'write_seconds': 0, 'elapsed_seconds': 0}
 
     # 2. 批量处理
     success_count = 0
     error_count = 0
     skipped_count = 0
+    full_count = 0
     total_records = 0
+    write_seconds = 0.0
 
     for batch_start in range(0, total_stocks, batch_size):
         batch_end = min(batch_start + batch_size, total_stocks)
         batch_codes = stock_codes[batch_start:batch_end]
 
+        # 一次查询预加载本批有状态股票的近期日线
+        batch_states = [states[ts_code] for ts_code in batch_codes if ts_code in states]
+        daily = {}
+        if batch_states:
+            earliest = min(state['trade_date'] for state in batch_states)
+            since = (datetime.strptime(earliest, '%Y%m%d') - timedelta(days=INCREMENTAL_PRELOAD_DAYS)).strftime('%Y%m%d')
+            daily = load_daily_groups(engine, [state['ts_code'] for state in batch_states], start_date=since)
+
         db = SessionLocal()
 
         for ts_code in batch_codes:
             try:
-                # 获取该股票的所有日线数据（需要全部数据来计算指标）
-                query = text("""
-                    SELECT ts_code, trade_date, open, high, low, close, vol
-                    FROM daily_data
-                    WHERE ts_code = :ts_code
-                    ORDER BY trade_date ASC
-                """)
-                df = pd.read_sql(query, db.bind, params={'ts_code': ts_code})
-
-                if len(df) < 60:
+                state = states.get(ts_code)
+                if state is None:
+                    # 无状态：全量计算并建立状态
+                    status, count, seconds = calculate_and_save_stock(db, ts_code, write_method)
+                    full_count += 1
+                else:
+                    status, count, seconds = update_stock_incremental(
+                        db, state, write_method, daily_df=daily.get(ts_code)
+                    )
+
+                if status == 'skipped':
                     skipped_count += 1
                     continue
 
-                # 计算所有指标
-                df = calculate_all_indicators(df)
-
-                # 只删除并重新插入该股票的指标数据
-                db.execute(text("DELETE FROM daily_indicator WHERE ts_code = :ts_code"), {'ts_code': ts_code})
-
-                # 准备插入数据
-                indicator_columns = [
-                    'ts_code', 'trade_date',
-                    'k_value', 'd_value', 'j_value',
-                    'rsi6', 'rsi12', 'rsi24',
-                    'macd_dif', 'macd_dea', 'macd_hist',
-                    'boll_upper', 'boll_mid', 'boll_lower', 'boll_width', 'boll_position',
-                    'ma5', 'ma10', 'ma20', 'ma30', 'ma60', 'ma120', 'ma250',
-                    'ma5_deviation', 'ma10_deviation', 'ma20_deviation', 'ma30_deviation', 'ma60_deviation', 'ma120_deviation', 'ma250_deviation',
-                    'ma_alignment',
-                    'cci', 'wr10', 'wr14',
-                    'obv', 'obv_ma5', 'obv_ma10',
-                    'vol_ma5', 'vol_ma10', 'vol_ma20', 'vol_ratio', 'vol_ratio_10',
-                    'consecutive_down', 'consecutive_up',
-                    'drawdown_20d', 'drawdown_60d', 'rebound_20d', 'rebound_60d',
-                    'amplitude', 'pct_change', 'pct_change_5d', 'pct_change_10d', 'pct_change_20d',
-                    'atr14', 'dma_dif', 'dma_ama', 'vr'
-                ]
-
-                available_columns = [col for col in indicator_columns if col in df.columns]
-                df_insert = df[available_columns].copy()
-                df_insert = df_insert.replace({np.nan: None})
-
-                records = df_insert.to_dict('records')
-                if records:
-                    try:
-                        db.bulk_insert_mappings(DailyIndicator, records)
-                        db.commit()
-                        total_records += len(records)
-                    except Exception as insert_error:
-                        db.rollback()
-                        raise insert_error
-
+                total_records += count
+                write_seconds += seconds
                 success_count += 1
 
             except Exception as e:
@@ -543,8 +1034,9 @@ def run_incremental_calculation(days: int = 30, batch_size: int = 100):
     logger.info("-" * 60)
     logger.info("增量计算完成!")
     logger.info(f"总耗时: {elapsed:.1f}秒")
-    logger.info(f"成功: {success_count}, 跳过: {skipped_count}, 错误: {error_count}")
+    logger.info(f"成功: {success_count} (其中全量: {full_count}), 跳过: {skipped_count}, 错误: {error_count}")
     logger.info(f"总记录数: {total_records}")
+    _log_write_speed(total_records, write_seconds)
     logger.info("=" * 60)
 
     return {
@@ -552,6 +1044,7 @@ def run_incremental_calculation(days: int = 30, batch_size: int = 100):
         'skipped': skipped_count,
         'error': error_count,
         'total_records': total_records,
+        'write_seconds': write_seconds,
         'elapsed_seconds': elapsed
     }
 
@@ -563,10 +1056,23 @@ if __name__ == "__main__":
     parser.add_argument('--incremental', action='store_true', help='增量更新模式')
     parser.add_argument('--days', type=int, default=30, help='增量更新检查天数')
     parser.add_argument('--batch-size', type=int, default=50, help='每批处理的股票数量')
+    parser.add_argument('--workers', type=int, default=1, help='全量计算的并行进程数 (1=单进程)')
+    parser.add_argument('--panel', action='store_true', help='全量计算使用面板模式（整批向量化）')
+    parser.add_argument('--write-method', choices=WRITE_METHODS, default=None,
+                        help='写入方式 (默认: 全量 orm, 增量 upsert)')
+    parser.add_argument('--only', type=str, default=None,
+                        help='只重算并更新指定指标，逗号分隔的指标名或指标列名，如 kdj,rsi,vol_ratio '
+                             f"(可选指标: {','.join(INDICATORS)})")
 
     args = parser.parse_args()
+    only = [name.strip() for name in args.only.split(',') if name.strip()] if args.only else None
+    if only is not None and args.incremental:
+        parser.error('--only 只用于全量重算，不能与 --incremental 同时使用')
 
     if args.incremental:
-        run_incremental_calculation(days=args.days, batch_size=args.batch_size)
+        run_incremental_calculation(days=args.days, batch_size=args.batch_size,
+                                    write_method=args.write_method or 'upsert')
     else:
-        run_indicator_calculation(batch_size=args.batch_size)
+        run_indicator_calculation(batch_size=args.batch_size, max_workers=args.workers, panel=args.panel,
+                                  write_method=args.write_method or ('upsert' if only else 'orm'),
+                                  indicators=only)
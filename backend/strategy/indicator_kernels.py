@@ -0,0 +1,86 @@
+"""
+技术指标向量化计算核
+替代 indicator_calc 中逐行 apply / rolling().apply 的热点，单股票和面板计算共用
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def ma_alignment(mas: np.ndarray) -> np.ndarray:
+    """
+    均线排列状态
+
+    Args:
+        mas: 二维数组，每列一条均线，按周期由短到长排列
+
+    Returns:
+        1=多头排列（短均线依次在上），-1=空头排列，0=其他或存在缺失值
+    """
+    mas = np.asarray(mas, dtype=float)
+    valid = ~np.isnan(mas).any(axis=1)
+    bullish = (mas[:, :-1] > mas[:, 1:]).all(axis=1)
+    bearish = (mas[:, :-1] < mas[:, 1:]).all(axis=1)
+    return np.where(valid & bullish, 1, np.where(valid & bearish, -1, 0))
+
+
+def rolling_mean_deviation(values: np.ndarray, n: int, chunk_size: int = 1_000_000) -> np.ndarray:
+    """
+    滚动平均绝对偏差 mean(|x - mean(x)|)，窗口不足 n 或含缺失值时为 NaN
+
+    基于步长视图，不复制窗口数据；长序列按 chunk_size 分块以限制临时内存。
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) < n:
+        return out
+
+    windows = sliding_window_view(values, n)
+    for start in range(0, len(windows), chunk_size):
+        block = windows[start:start + chunk_size]
+        mean = block.mean(axis=1, keepdims=True)
+        out[n - 1 + start:n - 1 + start + len(block)] = np.abs(block - mean).mean(axis=1)
+    return out
+
+
+def _rolling_extreme(values: np.ndarray, n: int, min_periods: int, accumulate, combine, fill: float) -> np.ndarray:
+    """van Herk / Gil-Werman 滚动极值：按 n 分块，块内前缀/后缀极值各扫一遍"""
+    if min_periods not in (1, n):
+        raise ValueError(f"min_periods 只支持 1 或窗口长度 {n}")
+
+    values = np.asarray(values, dtype=float)
+    size = len(values)
+    out = np.full(size, np.nan)
+    if size == 0:
+        return out
+
+    pad = (-size) % n
+    blocks = np.concatenate([values, np.full(pad, fill)]).reshape(-1, n)
+    prefix = accumulate(blocks, axis=1).ravel()[:size]
+    suffix = accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()[:size]
+
+    if size >= n:
+        out[n - 1:] = combine(suffix[:size - n + 1], prefix[n - 1:])
+    if min_periods == 1:
+        head = min(n - 1, size)
+        out[:head] = accumulate(values[:head])
+    return out
+
+
+def rolling_max(values: np.ndarray, n: int, min_periods: int = None) -> np.ndarray:
+    """
+    滚动最大值，与 pandas rolling(n, min_periods).max() 结果相同
+
+    min_periods=n 时窗口含缺失值即为 NaN；min_periods=1 时忽略缺失值。
+    """
+    min_periods = n if min_periods is None else min_periods
+    if min_periods == n:
+        return _rolling_extreme(values, n, n, np.maximum.accumulate, np.maximum, -np.inf)
+    return _rolling_extreme(values, n, 1, np.fmax.accumulate, np.fmax, np.nan)
+
+
+def rolling_min(values: np.ndarray, n: int, min_periods: int = None) -> np.ndarray:
+    """滚动最小值，与 pandas rolling(n, min_periods).min() 结果相同"""
+    min_periods = n if min_periods is None else min_periods
+    if min_periods == n:
+        return _rolling_extreme(values, n, n, np.minimum.accumulate, np.minimum, np.inf)
+    return _rolling_extreme(values, n, 1, np.fmin.accumulate, np.fmin, np.nan)
@@ -0,0 +1,261 @@
+"""
+技术指标面板计算 - 全市场向量化版本
+输入按 (ts_code, trade_date) 排序的长表，一次性计算所有股票的全部指标，
+结果与逐只股票调用 calculate_all_indicators 一致（浮点误差范围内）
+
+实现方式：整列滚动/移位后，按"股票内位置"屏蔽跨越股票边界的窗口；
+EMA 和累计和这类递推指标使用 groupby 的单遍 Cython 实现
+"""
+import pandas as pd
+import numpy as np
+from typing import List
+
+from strategy.indicator_kernels import ma_alignment, rolling_mean_deviation, rolling_max, rolling_min
+
+
+# ============== 边界处理工具 ==============
+
+def group_positions(codes: np.ndarray) -> np.ndarray:
+    """每行在所属股票内的序号（从 0 开始），要求同一股票的行连续"""
+    n = len(codes)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.empty(n, dtype=bool)
+    starts[0] = True
+    starts[1:] = codes[1:] != codes[:-1]
+    idx = np.arange(n)
+    return idx - np.maximum.accumulate(np.where(starts, idx, 0))
+
+
+def _shift(values: np.ndarray, k: int, pos: np.ndarray) -> np.ndarray:
+    """股票内向后移位 k 行，股票开头不足 k 行的位置为 NaN"""
+    out = np.full(len(values), np.nan)
+    if k < len(values):
+        out[k:] = values[:len(values) - k]
+    out[pos < k] = np.nan
+    return out
+
+
+# 滚动极值使用分块前缀/后缀算法，其余统计使用 pandas 滚动窗口
+_EXTREME_KERNELS = {'max': rolling_max, 'min': rolling_min}
+
+
+def _rolling(values: np.ndarray, n: int, pos: np.ndarray, how: str, **kwargs) -> np.ndarray:
+    """股票内滚动统计 (min_periods=n)，跨越股票边界的窗口置为 NaN"""
+    if how in _EXTREME_KERNELS:
+        out = _EXTREME_KERNELS[how](values, n)
+    else:
+        out = getattr(pd.Series(values).rolling(window=n, min_periods=n), how)(**kwargs).to_numpy()
+    out[pos < n - 1] = np.nan
+    return out
+
+
+def _rolling_extreme(values: np.ndarray, n: int, pos: np.ndarray, group_ids: np.ndarray, how: str) -> np.ndarray:
+    """股票内滚动最大/最小值 (min_periods=1)，股票开头不足 n 行时取累计极值"""
+    out = _EXTREME_KERNELS[how](values, n, min_periods=1)
+    head = pos < n - 1
+    if head.any():
+        cum = getattr(pd.Series(values).groupby(group_ids, sort=False), f'cum{how}')().to_numpy()
+        out[head] = cum[head]
+    return out
+
+
+def _ewm(values: np.ndarray, group_ids: np.ndarray, **kwargs) -> np.ndarray:
+    """股票内 EMA (adjust=False)，每只股票从首行重新开始递推"""
+    result = pd.Series(values).groupby(group_ids, sort=False).ewm(adjust=False, **kwargs).mean()
+    return result.droplevel(0).sort_index().to_numpy()
+
+
+def _run_length(flags: np.ndarray) -> np.ndarray:
+    """连续为 True 的计数，遇 False 归零"""
+    count = np.cumsum(flags)
+    last_reset = np.maximum.accumulate(np.where(flags, 0, count))
+    return count - last_reset
+
+
+def _safe_ratio(num: np.ndarray, den: np.ndarray, fill: float) -> np.ndarray:
+    """num / den，den == 0 时取 fill（与 np.where 写法的单股票版本一致）"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den == 0, fill, num / den)
+
+
+# ============== 面板计算 ==============
+
+def calculate_all_indicators_panel(
+    df: pd.DataFrame,
+    ma_periods: List[int] = [5, 10, 20, 30, 60, 120, 250]
+) -> pd.DataFrame:
+    """
+    全市场面板计算所有技术指标
+
+    Args:
+        df: 长表日线数据，需包含 ts_code, trade_date, open, high, low, close, vol，
+            且按 (ts_code, trade_date) 升序排列
+        ma_periods: 均线周期
+
+    Returns:
+        添加了全部指标列的 DataFrame（另含 ema_fast/ema_slow 供提取增量状态）
+    """
+    df = df.reset_index(drop=True).copy()
+
+    codes = df['ts_code'].to_numpy()
+    group_ids = pd.factorize(codes)[0]
+    pos = group_positions(codes)
+
+    close = df['close'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    vol = df['vol'].to_numpy(dtype=float)
+    prev_close = _shift(close, 1, pos)
+
+    columns = {}
+
+    # ---- MA ----
+    for n in ma_periods:
+        columns[f'ma{n}'] = _rolling(close, n, pos, 'mean')
+
+    # ---- KDJ ----
+    low_9 = _rolling(low, 9, pos, 'min')
+    high_9 = _rolling(high, 9, pos, 'max')
+    rsv = ((pd.Series(close) - low_9) / (pd.Series(high_9) - low_9) * 100).fillna(50).to_numpy()
+    k_value = _ewm(rsv, group_ids, alpha=1 / 3)
+    d_value = _ewm(k_value, group_ids, alpha=1 / 3)
+    columns['k_value'] = k_value
+    columns['d_value'] = d_value
+    columns['j_value'] = 3 * k_value - 2 * d_value
+
+    # ---- RSI ----
+    delta = close - prev_close
+    with np.errstate(invalid='ignore'):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+    for n in [6, 12, 24]:
+        avg_gain = _rolling(gain, n, pos, 'mean')
+        avg_loss = _rolling(loss, n, pos, 'mean')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.where(avg_loss == 0, np.where(avg_gain == 0, 1, 1e10), avg_gain / avg_loss)
+        columns[f'rsi{n}'] = np.clip(100 - (100 / (1 + rs)), 0, 100)
+
+    # ---- MACD ----
+    ema_fast = _ewm(close, group_ids, span=12)
+    ema_slow = _ewm(close, group_ids, span=26)
+    macd_dif = ema_fast - ema_slow
+    macd_dea = _ewm(macd_dif, group_ids, span=9)
+    columns['ema_fast'] = ema_fast
+    columns['ema_slow'] = ema_slow
+    columns['macd_dif'] = macd_dif
+    columns['macd_dea'] = macd_dea
+    columns['macd_hist'] = 2 * (macd_dif - macd_dea)
+
+    # ---- BOLL ----
+    boll_mid = _rolling(close, 20, pos, 'mean')
+    boll_std = _rolling(close, 20, pos, 'std', ddof=0)
+    boll_upper = boll_mid + 2 * boll_std
+    boll_lower = boll_mid - 2 * boll_std
+    columns['boll_mid'] = boll_mid
+    columns['boll_upper'] = boll_upper
+    columns['boll_lower'] = boll_lower
+    columns['boll_position'] = _safe_ratio(close - boll_lower, boll_upper - boll_lower, 0.5)
+    columns['boll_width'] = _safe_ratio(boll_upper - boll_lower, boll_mid, 0)
+
+    # ---- CCI ----
+    tp = (high + low + close) / 3
+    tp_ma = _rolling(tp, 14, pos, 'mean')
+    mean_dev = rolling_mean_deviation(tp, 14)
+    mean_dev[pos < 13] = np.nan
+    columns['cci'] = _safe_ratio(tp - tp_ma, 0.015 * mean_dev, 0)
+
+    # ---- WR ----
+    for n in [10, 14]:
+        high_n = _rolling(high, n, pos, 'max')
+        low_n = _rolling(low, n, pos, 'min')
+        high_low_range = high_n - low_n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns[f'wr{n}'] = np.where(high_low_range == 0, 50, (high_n - close) / high_low_range * 100)
+
+    # ---- OBV ----
+    with np.errstate(invalid='ignore'):
+        direction = np.where(close > prev_close, 1, -1)
+    direction[pos == 0] = 0
+    obv = pd.Series(vol * direction).groupby(group_ids, sort=False).cumsum().to_numpy()
+    columns['obv'] = obv
+    columns['obv_ma5'] = _rolling(obv, 5, pos, 'mean')
+    columns['obv_ma10'] = _rolling(obv, 10, pos, 'mean')
+
+    # ---- 均线偏离度与排列 ----
+    for n in ma_periods:
+        ma = columns[f'ma{n}']
+        columns[f'ma{n}_deviation'] = _safe_ratio(close - ma, ma, 0)
+
+    columns['ma_alignment'] = ma_alignment(np.column_stack([columns[f'ma{n}'] for n in [5, 10, 20, 30, 60]]))
+
+    # ---- 价格形态 ----
+    with np.errstate(invalid='ignore'):
+        down = close < prev_close
+        up = close > prev_close
+    columns['down_days'] = down.astype(int)
+    columns['consecutive_down'] = _run_length(down)
+    columns['up_days'] = up.astype(int)
+    columns['consecutive_up'] = _run_length(up)
+
+    for n in [20, 60]:
+        high_n = _rolling_extreme(high, n, pos, group_ids, 'max')
+        low_n = _rolling_extreme(low, n, pos, group_ids, 'min')
+        columns[f'high_{n}d'] = high_n
+        columns[f'drawdown_{n}d'] = _safe_ratio(close - high_n, high_n, 0)
+        columns[f'low_{n}d'] = low_n
+        columns[f'rebound_{n}d'] = _safe_ratio(close - low_n, low_n, 0)
+
+    columns['amplitude'] = _safe_ratio(high - low, prev_close, 0)
+    columns['pct_change'] = close / prev_close - 1
+    for n in [5, 10, 20]:
+        columns[f'pct_change_{n}d'] = close / _shift(close, n, pos) - 1
+
+    # ---- 成交量 ----
+    vol_ma5 = _rolling(vol, 5, pos, 'mean')
+    vol_ma10 = _rolling(vol, 10, pos, 'mean')
+    columns['vol_ma5'] = vol_ma5
+    columns['vol_ma10'] = vol_ma10
+    columns['vol_ma20'] = _rolling(vol, 20, pos, 'mean')
+    columns['vol_ratio'] = _safe_ratio(vol, vol_ma5, 0)
+    columns['vol_ratio_10'] = _safe_ratio(vol, vol_ma10, 0)
+
+    # ---- ATR ----
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    columns['atr14'] = _rolling(tr, 14, pos, 'mean')
+
+    # ---- DMA ----
+    dma_dif = _rolling(close, 10, pos, 'mean') - _rolling(close, 50, pos, 'mean')
+    columns['dma_dif'] = dma_dif
+    columns['dma_ama'] = _rolling(dma_dif, 10, pos, 'mean')
+
+    # ---- VR ----
+    with np.errstate(invalid='ignore'):
+        up_sum = _rolling(np.where(close > prev_close, vol, 0.0), 26, pos, 'sum')
+        down_sum = _rolling(np.where(close < prev_close, vol, 0.0), 26, pos, 'sum')
+        equal_sum = _rolling(np.where(close == prev_close, vol, 0.0), 26, pos, 'sum')
+    denominator = down_sum + equal_sum / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns['vr'] = np.where(denominator == 0, 100, (up_sum + equal_sum / 2) / denominator * 100)
+
+    return pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1)
+
+
+def extract_panel_states(df: pd.DataFrame) -> List[dict]:
+    """从面板计算结果中提取每只股票最后一个交易日的增量计算状态"""
+    last = df.groupby('ts_code', sort=False).tail(1)
+    return [
+        {
+            'ts_code': row.ts_code,
+            'trade_date': row.trade_date,
+            'k_value': float(row.k_value),
+            'd_value': float(row.d_value),
+            'ema_fast': float(row.ema_fast),
+            'ema_slow': float(row.ema_slow),
+            'macd_dea': float(row.macd_dea),
+            'obv': float(row.obv),
+            'consecutive_down': int(row.consecutive_down),
+            'consecutive_up': int(row.consecutive_up),
+        }
+        for row in last.itertuples(index=False)
+    ]
@@ -0,0 +1,129 @@
+"""
+技术指标注册表
+每个指标声明计算函数、输入列、输出列、回看K线数和依赖的其他指标，
+由依赖解析器确定计算顺序，支持只计算部分指标：
+
+    @register_indicator('boll', outputs=['boll_upper', ...], inputs=['close'], lookback=20)
+    def calculate_boll(df): ...
+
+指标在 indicator_calc 中注册（导入该模块后注册表才完整）。
+新增指标只需注册计算函数并在 DailyIndicator 模型/数据表中加列，写入逻辑无需修改。
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+
+@dataclass
+class IndicatorDef:
+    """指标定义"""
+    name: str                                   # 指标名称，如 'kdj'
+    func: Callable[[pd.DataFrame], pd.DataFrame]  # 计算函数，在传入的 DataFrame 上添加输出列
+    outputs: List[str]                          # 写入 daily_indicator 的输出列
+    inputs: List[str] = field(default_factory=lambda: ['close'])  # 需要的日线列
+    lookback: int = 0                           # 滚动窗口所需的回看K线数（递推部分由增量状态接续）
+    depends_on: List[str] = field(default_factory=list)  # 依赖的其他指标（需先计算）
+    description: str = ""
+
+
+# 注册顺序即全量计算顺序
+INDICATORS: Dict[str, IndicatorDef] = {}
+
+# 输出列 -> 所属指标
+_OUTPUT_OWNERS: Dict[str, str] = {}
+
+
+def register_indicator(
+    name: str,
+    outputs: List[str],
+    inputs: Optional[List[str]] = None,
+    lookback: int = 0,
+    depends_on: Optional[List[str]] = None,
+    description: str = ""
+):
+    """注册指标计算函数的装饰器，返回原函数"""
+    def decorator(func: Callable[[pd.DataFrame], pd.DataFrame]):
+        if name in INDICATORS:
+            raise ValueError(f"指标 {name} 重复注册")
+        for col in outputs:
+            if col in _OUTPUT_OWNERS:
+                raise ValueError(f"输出列 {col} 已由指标 {_OUTPUT_OWNERS[col]} 注册")
+
+        INDICATORS[name] = IndicatorDef(
+            name=name,
+            func=func,
+            outputs=list(outputs),
+            inputs=list(inputs) if inputs is not None else ['close'],
+            lookback=lookback,
+            depends_on=list(depends_on or []),
+            description=description or (func.__doc__ or '').strip(),
+        )
+        for col in outputs:
+            _OUTPUT_OWNERS[col] = name
+        return func
+
+    return decorator
+
+
+def resolve_indicators(names: Optional[List[str]] = None) -> Tuple[List[IndicatorDef], List[str]]:
+    """
+    解析需要计算的指标及其依赖
+
+    Args:
+        names: 指标名称或输出列名（可混用，如 ['kdj', 'rsi', 'vol_ratio']），None 表示全部
+
+    Returns:
+        (按依赖排好序的指标定义列表, 所选的输出列)
+        依赖的指标会参与计算，但其输出列只有被显式选择时才包含在所选输出列中
+    """
+    if names is None:
+        defs = list(INDICATORS.values())
+        return defs, [col for defn in defs for col in defn.outputs]
+
+    targets = []
+    selected = []
+    for token in names:
+        if token in INDICATORS:
+            targets.append(token)
+            selected.extend(INDICATORS[token].outputs)
+        elif token in _OUTPUT_OWNERS:
+            targets.append(_OUTPUT_OWNERS[token])
+            selected.append(token)
+        else:
+            raise ValueError(f"未知指标或指标列: {token}")
+
+    ordered: List[str] = []
+    visiting = set()
+
+    def visit(name: str):
+        if name in ordered:
+            return
+        if name in visiting:
+            raise ValueError(f"指标依赖存在循环: {name}")
+        if name not in INDICATORS:
+            raise ValueError(f"依赖的指标未注册: {name}")
+        visiting.add(name)
+        for dep in INDICATORS[name].depends_on:
+            visit(dep)
+        visiting.discard(name)
+        ordered.append(name)
+
+    # 按注册顺序遍历，保证结果与全量计算的顺序一致
+    target_set = set(targets)
+    for name in INDICATORS:
+        if name in target_set:
+            visit(name)
+
+    return [INDICATORS[name] for name in ordered], list(dict.fromkeys(selected))
+
+
+def indicator_output_columns() -> List[str]:
+    """全部已注册指标的输出列（按注册顺序）"""
+    return [col for defn in INDICATORS.values() for col in defn.outputs]
+
+
+def max_lookback(defs: Optional[List[IndicatorDef]] = None) -> int:
+    """指标集合所需的最长回看K线数"""
+    defs = list(INDICATORS.values()) if defs is None else defs
+    return max((defn.lookback for defn in defs), default=0)
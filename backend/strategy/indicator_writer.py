@@ -0,0 +1,136 @@
+"""
+指标批量写入
+将计算好的指标 DataFrame 写入 daily_indicator，支持三种方式：
+- orm: bulk_insert_mappings（逐行构造字典，兼容性最好）
+- upsert: 多行 INSERT ... ON DUPLICATE KEY UPDATE，按批拼接参数直接交给驱动
+- infile: 生成 TSV 临时文件后 LOAD DATA LOCAL INFILE（需服务端开启 local_infile）
+"""
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from sqlalchemy import create_engine, text
+
+from app.core.config import get_settings
+from app.models.indicator import DailyIndicator
+
+WRITE_METHODS = ('orm', 'upsert', 'infile')
+
+# 主键列，upsert 时不更新
+KEY_COLUMNS = ('ts_code', 'trade_date')
+
+# LOAD DATA 专用引擎（需要 allow_local_infile，按需创建）
+_infile_engine = None
+
+
+def _get_infile_engine():
+    """获取允许 LOCAL INFILE 的数据库引擎"""
+    global _infile_engine
+    if _infile_engine is None:
+        settings = get_settings()
+        _infile_engine = create_engine(
+            settings.DATABASE_URL,
+            pool_size=1,
+            max_overflow=0,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            connect_args={'allow_local_infile': True},
+        )
+    return _infile_engine
+
+
+def _write_orm(db, df: pd.DataFrame):
+    """bulk_insert_mappings 写入（要求目标行不存在）"""
+    records = df.replace({np.nan: None}).to_dict('records')
+    db.bulk_insert_mappings(DailyIndicator, records)
+
+
+def _write_upsert(db, df: pd.DataFrame, columns: List[str], batch_rows: int):
+    """多行 INSERT ... ON DUPLICATE KEY UPDATE，按 batch_rows 分批"""
+    update_clause = ', '.join(f"{col}=VALUES({col})" for col in columns if col not in KEY_COLUMNS)
+    row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+
+    # 转为 Python 原生对象，NaN 替换为 None
+    values = df.astype(object).where(pd.notna(df), None)
+    rows = list(values.itertuples(index=False, name=None))
+
+    conn = db.connection()
+    for start in range(0, len(rows), batch_rows):
+        batch = rows[start:start + batch_rows]
+        sql = (
+            f"INSERT INTO daily_indicator ({', '.join(columns)}) VALUES "
+            + ', '.join([row_placeholder] * len(batch))
+            + f" ON DUPLICATE KEY UPDATE {update_clause}"
+        )
+        conn.exec_driver_sql(sql, tuple(value for row in batch for value in row))
+
+
+def _write_infile(db, df: pd.DataFrame, columns: List[str]):
+    """
+    TSV 缓冲 + LOAD DATA LOCAL INFILE ... REPLACE
+
+    使用独立连接执行，先提交会话中已有的修改（如 DELETE）以免锁冲突。
+    REPLACE 会覆盖整行，未写入的列恢复为默认值。
+    """
+    db.commit()
+
+    fd, path = tempfile.mkstemp(suffix='.tsv')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            df.to_csv(f, sep='\t', header=False, index=False, na_rep='\\N', lineterminator='\n')
+
+        load_sql = (
+            f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' "
+            f"REPLACE INTO TABLE daily_indicator "
+            f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' "
+            f"({', '.join(columns)})"
+        )
+        with _get_infile_engine().begin() as conn:
+            conn.execute(text(load_sql))
+    finally:
+        os.remove(path)
+
+
+def write_indicator_frame(
+    db,
+    df: pd.DataFrame,
+    columns: List[str],
+    method: str = 'orm',
+    batch_rows: int = 1000
+) -> Dict:
+    """
+    将指标数据写入 daily_indicator（orm/upsert 不提交事务，infile 自行提交）
+
+    Args:
+        db: 数据库会话
+        df: 指标数据
+        columns: 要写入的列（需包含 ts_code, trade_date）
+        method: 写入方式 'orm' / 'upsert' / 'infile'
+        batch_rows: upsert 每条语句的行数
+
+    Returns:
+        {'rows': 写入行数, 'seconds': 耗时, 'rows_per_sec': 写入速度}
+    """
+    if method not in WRITE_METHODS:
+        raise ValueError(f"不支持的写入方式: {method}，可选: {', '.join(WRITE_METHODS)}")
+
+    columns = [col for col in columns if col in df.columns]
+    frame = df[columns]
+
+    start = time.perf_counter()
+    if len(frame) > 0:
+        if method == 'orm':
+            _write_orm(db, frame)
+        elif method == 'upsert':
+            _write_upsert(db, frame, columns, batch_rows)
+        else:
+            _write_infile(db, frame, columns)
+    seconds = time.perf_counter() - start
+
+    return {
+        'rows': len(frame),
+        'seconds': seconds,
+        'rows_per_sec': len(frame) / seconds if seconds > 0 else 0,
+    }
@@ -0,0 +1,149 @@
+"""
+指标计算核等价性校验与性能对比
+对比 indicator_kernels 中的向量化实现与原先逐行 apply / rolling().apply 实现
+运行方式: python strategy/kernel_benchmark.py --days 5000 --repeat 3
+"""
+import sys
+import os
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+os.chdir(backend_dir)
+
+import time
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict
+
+from strategy.indicator_kernels import ma_alignment, rolling_mean_deviation, rolling_max, rolling_min
+
+
+# ============== 原实现（作为基准） ==============
+
+def reference_ma_alignment(df: pd.DataFrame) -> np.ndarray:
+    """原 calculate_ma_deviation 中的逐行均线排列判断"""
+    def check_ma_alignment(row):
+        mas = [row.get(f'ma{n}', np.nan) for n in [5, 10, 20, 30, 60]]
+        if any(np.isnan(mas)):
+            return 0
+        if all(mas[i] > mas[i+1] for i in range(len(mas)-1)):
+            return 1
+        if all(mas[i] < mas[i+1] for i in range(len(mas)-1)):
+            return -1
+        return 0
+
+    return df.apply(check_ma_alignment, axis=1).to_numpy()
+
+
+def reference_mean_deviation(tp: pd.Series, n: int) -> np.ndarray:
+    """原 calculate_cci 中的 rolling().apply 平均绝对偏差"""
+    return tp.rolling(window=n, min_periods=n).apply(lambda x: np.abs(x - x.mean()).mean()).to_numpy()
+
+
+# ============== 测试数据 ==============
+
+def make_price_frame(days: int, seed: int = 42) -> pd.DataFrame:
+    """生成单只股票的随机K线，含平盘段和缺失值"""
+    rng = np.random.default_rng(seed)
+    close = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, days))), 2)
+    close[100:110] = close[100]
+    high = np.round(close * (1 + rng.uniform(0, 0.03, days)), 2)
+    low = np.round(close * (1 - rng.uniform(0, 0.03, days)), 2)
+    high[300] = np.nan
+    low[301] = np.nan
+
+    df = pd.DataFrame({'close': close, 'high': high, 'low': low})
+    for n in [5, 10, 20, 30, 60]:
+        df[f'ma{n}'] = df['close'].rolling(window=n, min_periods=n).mean()
+    return df
+
+
+# ============== 校验与计时 ==============
+
+def verify_kernels(df: pd.DataFrame):
+    """逐项校验向量化实现与原实现结果一致，不一致时抛出 AssertionError"""
+    mas = df[[f'ma{n}' for n in [5, 10, 20, 30, 60]]].to_numpy()
+    np.testing.assert_array_equal(ma_alignment(mas), reference_ma_alignment(df))
+
+    tp = (df['high'] + df['low'] + df['close']) / 3
+    np.testing.assert_allclose(
+        rolling_mean_deviation(tp.to_numpy(), 14), reference_mean_deviation(tp, 14), rtol=1e-10, atol=1e-12
+    )
+
+    for n in [9, 10, 14, 20, 60]:
+        np.testing.assert_array_equal(rolling_max(df['high'].to_numpy(), n),
+                                      df['high'].rolling(window=n, min_periods=n).max().to_numpy())
+        np.testing.assert_array_equal(rolling_min(df['low'].to_numpy(), n),
+                                      df['low'].rolling(window=n, min_periods=n).min().to_numpy())
+    for n in [20, 60]:
+        np.testing.assert_array_equal(rolling_max(df['high'].to_numpy(), n, min_periods=1),
+                                      df['high'].rolling(window=n, min_periods=1).max().to_numpy())
+        np.testing.assert_array_equal(rolling_min(df['low'].to_numpy(), n, min_periods=1),
+                                      df['low'].rolling(window=n, min_periods=1).min().to_numpy())
+
+    # 短序列边界
+    short = df.head(7)
+    np.testing.assert_array_equal(rolling_max(short['high'].to_numpy(), 9),
+                                  short['high'].rolling(window=9, min_periods=9).max().to_numpy())
+    np.testing.assert_array_equal(rolling_max(short['high'].to_numpy(), 20, min_periods=1),
+                                  short['high'].rolling(window=20, min_periods=1).max().to_numpy())
+
+
+def _best_time(func: Callable, repeat: int) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(days: int = 5000, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    对比原实现与向量化实现的耗时
+
+    Returns:
+        {项目: {'before': 秒, 'after': 秒, 'speedup': 倍数}}
+    """
+    df = make_price_frame(days)
+    verify_kernels(df)
+
+    tp = (df['high'] + df['low'] + df['close']) / 3
+    mas = df[[f'ma{n}' for n in [5, 10, 20, 30, 60]]].to_numpy()
+    high = df['high'].to_numpy()
+
+    cases = {
+        'ma_alignment': (lambda: reference_ma_alignment(df), lambda: ma_alignment(mas)),
+        'cci_mean_deviation': (lambda: reference_mean_deviation(tp, 14),
+                               lambda: rolling_mean_deviation(tp.to_numpy(), 14)),
+        'rolling_max_60': (lambda: df['high'].rolling(window=60, min_periods=60).max(),
+                           lambda: rolling_max(high, 60)),
+    }
+
+    results = {}
+    for name, (before, after) in cases.items():
+        t_before = _best_time(before, repeat)
+        t_after = _best_time(after, repeat)
+        results[name] = {
+            'before': t_before,
+            'after': t_after,
+            'speedup': t_before / t_after if t_after > 0 else float('inf'),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='指标计算核校验与性能对比')
+    parser.add_argument('--days', type=int, default=5000, help='测试序列长度')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数')
+    args = parser.parse_args()
+
+    results = run_benchmark(days=args.days, repeat=args.repeat)
+
+    print("等价性校验通过")
+    print(f"\n{'项目':<24}{'原实现(ms)':>14}{'向量化(ms)':>14}{'加速比':>10}")
+    print("-" * 62)
+    for name, r in results.items():
+        print(f"{name:<24}{r['before']*1000:>14.2f}{r['after']*1000:>14.2f}{r['speedup']:>9.1f}x")
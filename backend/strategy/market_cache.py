@@ -0,0 +1,327 @@
+"""
+行情数据本地列式缓存
+将 daily_data / daily_indicator 按月分区镜像为 Parquet 文件，供回测、因子分析、信号检测等
+批量读取场景代替 MySQL 大范围扫描：
+
+    {MARKET_CACHE_DIR}/{表名}/{YYYYMM}.parquet
+    {MARKET_CACHE_DIR}/{表名}/manifest.json
+
+读取时只打开日期范围涉及的月份分区，支持列裁剪和股票过滤；
+增量刷新重写缓存中最后一个月份及之后的分区，全量刷新重建整张表。
+运行方式（backend 目录下）: python -m strategy.market_cache --full
+"""
+import os
+import json
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+from loguru import logger
+
+from app.core.config import get_settings
+from strategy.data_loader import iter_query_chunks
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 支持缓存的表
+CACHE_TABLES = ('daily_data', 'daily_indicator')
+
+KEY_COLUMNS = ['ts_code', 'trade_date']
+
+MANIFEST_FILE = 'manifest.json'
+
+# 全量重建时各月份缓冲的总行数上限，超过后写出一批行组
+REBUILD_FLUSH_ROWS = 1_000_000
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """数值列统一为 float64（整型列含缺失值时 read_sql 同样返回 float），保证各分区 schema 一致"""
+    for col in df.columns:
+        if col in KEY_COLUMNS:
+            continue
+        if pd.api.types.is_numeric_dtype(df[col]) or df[col].isna().all():
+            df[col] = df[col].astype('float64')
+    return df
+
+
+def _month_of(trade_dates: pd.Series) -> pd.Series:
+    """交易日期 (YYYYMMDD) 所属月份 (YYYYMM)"""
+    return trade_dates.str[:6]
+
+
+class MarketCache:
+    """按月分区的 Parquet 行情缓存"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        cache_dir = cache_dir or get_settings().MARKET_CACHE_DIR
+        if not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(BACKEND_DIR, cache_dir)
+        self.cache_dir = cache_dir
+
+    # ============== 目录与清单 ==============
+
+    def _table_dir(self, table: str) -> str:
+        if table not in CACHE_TABLES:
+            raise ValueError(f"不支持缓存的表: {table}，可选: {', '.join(CACHE_TABLES)}")
+        return os.path.join(self.cache_dir, table)
+
+    def _partition_path(self, table: str, month: str) -> str:
+        return os.path.join(self._table_dir(table), f"{month}.parquet")
+
+    def load_manifest(self, table: str) -> Optional[Dict]:
+        """读取表的缓存清单，未建立缓存时返回 None"""
+        path = os.path.join(self._table_dir(table), MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self, table: str, manifest: Dict):
+        partitions = manifest['partitions']
+        manifest['rows'] = sum(p['rows'] for p in partitions.values())
+        manifest['min_date'] = min((p['min_date'] for p in partitions.values()), default=None)
+        manifest['max_date'] = max((p['max_date'] for p in partitions.values()), default=None)
+        manifest['refreshed_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        path = os.path.join(self._table_dir(table), MANIFEST_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def has_table(self, table: str) -> bool:
+        """表是否已建立缓存"""
+        return self.load_manifest(table) is not None
+
+    # ============== 读取 ==============
+
+    def read(
+        self,
+        table: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        ts_codes: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        从缓存读取数据，结果按 (ts_code, trade_date) 升序
+
+        Args:
+            table: 表名
+            start_date: 开始日期 (YYYYMMDD)，含
+            end_date: 结束日期 (YYYYMMDD)，含
+            columns: 读取的列，None 表示全部（ts_code, trade_date 总会包含）
+            ts_codes: 股票代码列表，None 表示全部
+        """
+        manifest = self.load_manifest(table)
+        if manifest is None:
+            raise FileNotFoundError(f"{table} 未建立本地缓存，请先运行 python -m strategy.market_cache --full")
+
+        if columns is not None:
+            columns = KEY_COLUMNS + [col for col in columns if col not in KEY_COLUMNS]
+
+        # 分区裁剪
+        months = sorted(manifest['partitions'])
+        if start_date:
+            months = [m for m in months if m >= start_date[:6]]
+        if end_date:
+            months = [m for m in months if m <= end_date[:6]]
+
+        # 行组裁剪
+        filters = []
+        if start_date:
+            filters.append(('trade_date', '>=', start_date))
+        if end_date:
+            filters.append(('trade_date', '<=', end_date))
+        if ts_codes:
+            filters.append(('ts_code', 'in', list(ts_codes)))
+
+        tables = [
+            pq.read_table(self._partition_path(table, month), columns=columns, filters=filters or None)
+            for month in months
+        ]
+        if not tables:
+            return pd.DataFrame(columns=columns or manifest['columns'])
+
+        df = pa.concat_tables(tables).to_pandas()
+        return df.sort_values(KEY_COLUMNS, kind='stable').reset_index(drop=True)
+
+    def try_read(
+        self,
+        table: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        ts_codes: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """从缓存读取，未建立缓存时返回 None 由调用方回退到数据库"""
+        manifest = self.load_manifest(table)
+        if manifest is None:
+            logger.warning(f"{table} 未建立本地缓存，改为从数据库加载")
+            return None
+
+        df = self.read(table, start_date, end_date, columns, ts_codes)
+        logger.info(f"从本地缓存加载 {table}: {len(df)} 条 (缓存截至 {manifest['max_date']})")
+        return df
+
+    # ============== 刷新 ==============
+
+    def _write_partition(self, table: str, month: str, df: pd.DataFrame) -> Dict:
+        """写入单个月份分区（先写临时文件再替换）"""
+        path = self._partition_path(table, month)
+        tmp_path = path + '.tmp'
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+        os.replace(tmp_path, path)
+        return {'rows': len(df), 'min_date': df['trade_date'].min(), 'max_date': df['trade_date'].max()}
+
+    def refresh(self, bind, table: str, since: Optional[str] = None, full: bool = False) -> Dict:
+        """
+        刷新缓存
+
+        Args:
+            bind: 数据库引擎
+            table: 表名
+            since: 从该日期所在月份开始重写，默认为缓存中最后一个月份
+            full: 全量重建
+
+        Returns:
+            {'table', 'mode', 'months', 'rows'}
+        """
+        manifest = self.load_manifest(table)
+        if full or manifest is None:
+            return self._rebuild(bind, table)
+
+        since_month = (since or manifest['max_date'] or '000000')[:6]
+        sql = f"SELECT * FROM {table} WHERE trade_date >= %s ORDER BY ts_code, trade_date"
+        frames = [_normalize(chunk) for chunk in iter_query_chunks(bind, sql, (since_month + '01',))]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=manifest['columns'])
+
+        if list(df.columns) != manifest['columns']:
+            logger.warning(f"{table} 表结构与缓存不一致，改为全量重建")
+            return self._rebuild(bind, table)
+
+        # 重写 since 月份及之后的分区，数据库中已不存在的月份一并删除
+        rewritten = {}
+        for month, part in df.groupby(_month_of(df['trade_date']), sort=True):
+            rewritten[month] = self._write_partition(table, month, part.reset_index(drop=True))
+
+        partitions = manifest['partitions']
+        for month in [m for m in partitions if m >= since_month and m not in rewritten]:
+            del partitions[month]
+            os.remove(self._partition_path(table, month))
+        partitions.update(rewritten)
+
+        self._save_manifest(table, manifest)
+        logger.info(f"{table} 缓存增量刷新完成: {len(rewritten)} 个月份, {len(df)} 条")
+        return {'table': table, 'mode': 'incremental', 'months': len(rewritten), 'rows': len(df)}
+
+    def _rebuild(self, bind, table: str) -> Dict:
+        """
+        全量重建：流式读取整张表，按月份缓冲后分批写出行组
+
+        写入临时目录，完成后整体替换旧缓存，重建过程中读取方仍使用旧缓存。
+        """
+        table_dir = self._table_dir(table)
+        build_dir = table_dir + '.building'
+        shutil.rmtree(build_dir, ignore_errors=True)
+        os.makedirs(build_dir)
+
+        writers = {}
+        buffers = defaultdict(list)
+        partitions = {}
+        columns = None
+        buffered = 0
+
+        def flush():
+            for month, parts in buffers.items():
+                df = pd.concat(parts, ignore_index=True)
+                arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+                if month not in writers:
+                    writers[month] = pq.ParquetWriter(os.path.join(build_dir, f"{month}.parquet"), arrow_table.schema)
+                    partitions[month] = {'rows': 0, 'min_date': df['trade_date'].min(), 'max_date': df['trade_date'].max()}
+                writers[month].write_table(arrow_table)
+                stats = partitions[month]
+                stats['rows'] += len(df)
+                stats['min_date'] = min(stats['min_date'], df['trade_date'].min())
+                stats['max_date'] = max(stats['max_date'], df['trade_date'].max())
+            buffers.clear()
+
+        try:
+            sql = f"SELECT * FROM {table} ORDER BY ts_code, trade_date"
+            for chunk in iter_query_chunks(bind, sql):
+                chunk = _normalize(chunk)
+                columns = list(chunk.columns)
+                for month, part in chunk.groupby(_month_of(chunk['trade_date']), sort=False):
+                    buffers[month].append(part)
+                buffered += len(chunk)
+                if buffered >= REBUILD_FLUSH_ROWS:
+                    flush()
+                    buffered = 0
+            flush()
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        # 替换旧缓存
+        old_dir = table_dir + '.old'
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(table_dir):
+            os.replace(table_dir, old_dir)
+        os.replace(build_dir, table_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        manifest = {'table': table, 'columns': columns or [], 'partitions': partitions}
+        self._save_manifest(table, manifest)
+        logger.info(f"{table} 缓存全量重建完成: {len(partitions)} 个月份, {manifest['rows']} 条")
+        return {'table': table, 'mode': 'full', 'months': len(partitions), 'rows': manifest['rows']}
+
+
+def refresh_market_cache(
+    tables: List[str] = CACHE_TABLES,
+    full: bool = False,
+    since: Optional[str] = None,
+    skip_missing: bool = False
+) -> List[Dict]:
+    """
+    刷新本地行情缓存
+
+    Args:
+        tables: 要刷新的表
+        full: 全量重建
+        since: 增量刷新的起始日期，默认从缓存中最后一个月份开始
+        skip_missing: 跳过尚未建立缓存的表（定时任务使用，首次建立需手动全量运行）
+
+    Returns:
+        各表刷新结果
+    """
+    from app.core.database import engine
+
+    cache = MarketCache()
+    results = []
+    for table in tables:
+        if skip_missing and not cache.has_table(table):
+            logger.info(f"{table} 未建立本地缓存，跳过刷新")
+            continue
+        results.append(cache.refresh(engine, table, since=since, full=full))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from app.core.logging import setup_logging
+
+    load_dotenv(os.path.join(BACKEND_DIR, '.env'))
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description='刷新本地行情列式缓存')
+    parser.add_argument('--tables', nargs='+', choices=CACHE_TABLES, default=list(CACHE_TABLES), help='要刷新的表')
+    parser.add_argument('--full', action='store_true', help='全量重建')
+    parser.add_argument('--since', type=str, default=None, help='增量刷新起始日期 (YYYYMMDD)')
+    args = parser.parse_args()
+
+    for result in refresh_market_cache(args.tables, full=args.full, since=args.since):
+        print(f"{result['table']}: {result['mode']}, {result['months']} 个月份, {result['rows']} 条")
@@ -0,0 +1,322 @@
+"""
+回测数据上下文
+同一回测区间的指标与价格数据只加载一次，传给多个 BacktestEngine.run_backtest 复用，重复回测不再访问数据库：
+
+    context = MarketDataContext('20240101', '20260424')
+    for config in configs:
+        BacktestEngine(config).run_backtest(db, '20240101', '20260424', names, data_context=context)
+
+指标列按回测需要加载，后续回测用到新的列时只补充读取缺少的列；回看历史不足时重新加载。
+可选磁盘缓存按 (区间, 回看, 列) 保存为 Parquet，下次运行直接读取：
+
+    {MARKET_CONTEXT_DIR}/{键}/indicators.parquet
+    {MARKET_CONTEXT_DIR}/{键}/prices.parquet
+    {MARKET_CONTEXT_DIR}/{键}/meta.json
+
+磁盘缓存不随数据库更新失效，区间内数据更新后需删除对应目录（或 clear_disk_cache）。
+"""
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.core.config import get_settings
+from strategy.data_loader import (
+    KEY_COLUMNS, compact_frame, frame_with_lookback, load_indicator_frame, load_price_frame, memory_footprint
+)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+META_FILE = 'meta.json'
+
+
+def _resolve_dir(cache_dir: Optional[str]) -> str:
+    cache_dir = cache_dir or get_settings().MARKET_CONTEXT_DIR
+    if not os.path.isabs(cache_dir):
+        cache_dir = os.path.join(BACKEND_DIR, cache_dir)
+    return cache_dir
+
+
+def _date_strings(df: pd.DataFrame) -> np.ndarray:
+    """trade_date 列的字符串数组"""
+    return df['trade_date'].astype(str).to_numpy()
+
+
+class MarketDataContext:
+    """
+    回测数据上下文：缓存一个区间的指标数据（含回看历史）与价格数据
+
+    frames / price_frame 返回的数据按请求的 (区间, 回看) 缓存，相同请求返回同一对象，
+    信号引擎的条件掩码缓存与价格索引在多次回测间复用。数据帧只读，调用方不应原地修改。
+    """
+
+    def __init__(
+        self,
+        start_date: str,
+        end_date: str,
+        columns: Optional[List[str]] = None,
+        lookback: int = 0,
+        use_cache: bool = False,
+        panel_store=None,
+        compact: bool = True,
+        disk_cache: bool = False,
+        cache_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            columns: 预先加载的指标列，None 表示按回测需要加载
+            lookback: 预先加载的回看行数（每只股票在开始日期之前的行数，停牌日不计）
+            use_cache: 优先从本地行情缓存加载
+            panel_store: 内存映射面板存储 (PanelStore)，优先级最高
+            compact: 指标列以 float32 加载
+            disk_cache: 加载结果保存到磁盘，下次按 (区间, 回看, 列) 直接读取
+            cache_dir: 磁盘缓存目录，默认 MARKET_CONTEXT_DIR
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        self.use_cache = use_cache
+        self.panel_store = panel_store
+        self.float_dtype = 'float32' if compact else None
+        self.disk_cache = disk_cache
+        self.cache_dir = _resolve_dir(cache_dir)
+
+        self._columns: Optional[List[str]] = list(dict.fromkeys(columns)) if columns is not None else []
+        self.lookback = lookback
+        self.indicator_df: Optional[pd.DataFrame] = None
+        self.price_df: Optional[pd.DataFrame] = None
+        self._indicator_dates: Optional[np.ndarray] = None
+        self._trade_dates: Optional[np.ndarray] = None
+        self._frozen = False
+        self._views: Dict[tuple, pd.DataFrame] = {}
+        self._price_index = None
+
+    @classmethod
+    def from_frames(cls, indicator_df: pd.DataFrame, price_df: pd.DataFrame,
+                    start_date: Optional[str] = None, end_date: Optional[str] = None) -> 'MarketDataContext':
+        """
+        由已加载的数据创建上下文（不访问数据库），区间默认为价格数据的日期范围，
+        开始日期之前的指标数据作为回看历史
+        """
+        price_dates = _date_strings(price_df)
+        start_date = start_date or (price_dates.min() if len(price_dates) else '')
+        end_date = end_date or (price_dates.max() if len(price_dates) else '')
+        context = cls(start_date, end_date, columns=None)
+        context._set_frames(indicator_df, price_df)
+        context.lookback = int(np.searchsorted(context._trade_dates, start_date))
+        context._frozen = True
+        return context
+
+    # ============== 加载 ==============
+
+    @property
+    def columns(self) -> Optional[List[str]]:
+        """已加载的指标列，None 表示全部"""
+        return self._columns
+
+    def _set_frames(self, indicator_df: pd.DataFrame, price_df: pd.DataFrame):
+        self.indicator_df = indicator_df
+        self.price_df = price_df
+        self._indicator_dates = _date_strings(indicator_df)
+        self._trade_dates = np.unique(self._indicator_dates)
+        self._views.clear()
+        self._price_index = None
+
+    def _cache_key(self) -> str:
+        columns = '*' if self._columns is None else ','.join(sorted(self._columns))
+        raw = f"{self.start_date}|{self.end_date}|rows{self.lookback}|{self.float_dtype}|{columns}"
+        return hashlib.md5(raw.encode('utf-8')).hexdigest()[:16]
+
+    def _read_disk(self) -> bool:
+        path = os.path.join(self.cache_dir, self._cache_key())
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            return False
+        indicator_df = compact_frame(pd.read_parquet(os.path.join(path, 'indicators.parquet')),
+                                     float_dtype=self.float_dtype)
+        price_df = compact_frame(pd.read_parquet(os.path.join(path, 'prices.parquet')), float_dtype=None)
+        self._set_frames(indicator_df, price_df)
+        logger.info(f"从磁盘缓存加载回测数据: {path}")
+        return True
+
+    def _write_disk(self):
+        path = os.path.join(self.cache_dir, self._cache_key())
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        self.indicator_df.to_parquet(os.path.join(tmp_path, 'indicators.parquet'), index=False)
+        self.price_df.to_parquet(os.path.join(tmp_path, 'prices.parquet'), index=False)
+        meta = {
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'lookback': self.lookback,
+            'columns': self._columns,
+            'float_dtype': self.float_dtype,
+            'rows': len(self.indicator_df),
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    def _load(self, db, columns: Optional[List[str]]):
+        """从数据库加载指定指标列（回看 self.lookback）"""
+        return load_indicator_frame(
+            db.get_bind(), self.start_date, self.end_date, columns=columns, float_dtype=self.float_dtype,
+            use_cache=self.use_cache, panel_store=self.panel_store, lookback=self.lookback
+        )
+
+    def load(self, db) -> 'MarketDataContext':
+        """按当前的列与回看加载全部数据（磁盘缓存 → 数据库）"""
+        if self.disk_cache and self._read_disk():
+            return self
+        if db is None:
+            raise ValueError("数据上下文需要数据库会话加载数据")
+
+        indicator_df = self._load(db, self._columns)
+        price_df = self.price_df
+        if price_df is None:
+            price_df = load_price_frame(db.get_bind(), self.start_date, self.end_date,
+                                        use_cache=self.use_cache, panel_store=self.panel_store)
+        self._set_frames(indicator_df, price_df)
+        logger.info(f"回测数据上下文已加载: {self.start_date} ~ {self.end_date}, 回看 {self.lookback} 行, "
+                    f"指标 {len(indicator_df)} 条, 内存 "
+                    f"{memory_footprint(indicator_df) + memory_footprint(price_df):.1f} MB")
+        if self.disk_cache:
+            self._write_disk()
+        return self
+
+    def _add_columns(self, db, columns: List[str]):
+        """补充读取缺少的指标列，与已加载数据按行对齐合并（键不一致时整体重新加载）"""
+        if self.disk_cache and self._read_disk():
+            return
+        if db is None:
+            raise ValueError("数据上下文需要数据库会话加载数据")
+
+        extra_df = self._load(db, columns)
+        indicator_df = self.indicator_df
+        aligned = len(extra_df) == len(indicator_df) and all(
+            np.array_equal(extra_df[key].astype(str).to_numpy(), indicator_df[key].astype(str).to_numpy())
+            for key in KEY_COLUMNS
+        )
+        if not aligned:
+            logger.warning("补充读取的指标数据与已加载数据不一致，重新加载")
+            self.load(db)
+            return
+
+        extra = [col for col in extra_df.columns if col not in indicator_df.columns]
+        self._set_frames(pd.concat([indicator_df, extra_df[extra]], axis=1), self.price_df)
+        logger.info(f"回测数据上下文补充指标列: {extra}")
+        if self.disk_cache:
+            self._write_disk()
+
+    def ensure(self, db, columns: Optional[List[str]] = None, lookback: int = 0):
+        """
+        确保已加载所需的指标列与回看历史
+
+        Args:
+            db: 数据库会话（数据已满足时可为 None）
+            columns: 需要的指标列，None 表示全部
+            lookback: 需要的回看行数（每只股票在上下文开始日期之前的行数）
+        """
+        if self._frozen:
+            return
+        if lookback > self.lookback:
+            self.lookback = lookback
+            self._columns = None if columns is None or self._columns is None else \
+                list(dict.fromkeys(self._columns + columns))
+            self.load(db)
+            return
+
+        if self.indicator_df is None:
+            if columns is None:
+                self._columns = None
+            elif self._columns is not None:
+                self._columns = list(dict.fromkeys(self._columns + columns))
+            self.load(db)
+            return
+
+        if self._columns is None:
+            return
+        if columns is None:
+            self._columns = None
+            self.load(db)
+            return
+
+        missing = [col for col in columns if col not in self._columns]
+        if missing:
+            self._columns = self._columns + missing
+            self._add_columns(db, missing)
+
+    # ============== 读取 ==============
+
+    def _check_range(self, start_date: str, end_date: str):
+        if start_date < self.start_date or end_date > self.end_date:
+            raise ValueError(f"回测区间 {start_date} ~ {end_date} 超出数据上下文范围 "
+                             f"{self.start_date} ~ {self.end_date}")
+
+    def price_frame(self, db, start_date: str, end_date: str) -> pd.DataFrame:
+        """区间内的价格数据"""
+        self._check_range(start_date, end_date)
+        if self.price_df is None:
+            if db is None:
+                raise ValueError("数据上下文需要数据库会话加载数据")
+            self.price_df = load_price_frame(db.get_bind(), self.start_date, self.end_date,
+                                             use_cache=self.use_cache, panel_store=self.panel_store)
+        key = ('price', start_date, end_date)
+        if key not in self._views:
+            dates = _date_strings(self.price_df)
+            if len(dates) == 0 or (start_date <= dates.min() and end_date >= dates.max()):
+                self._views[key] = self.price_df
+            else:
+                self._views[key] = self.price_df[(dates >= start_date) & (dates <= end_date)].reset_index(drop=True)
+        return self._views[key]
+
+    def frames(
+        self,
+        db,
+        start_date: str,
+        end_date: str,
+        columns: Optional[List[str]] = None,
+        lookback: int = 0
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        区间内的指标数据（含每只股票开始日期之前的 lookback 行）与价格数据，不足时从数据库补充加载
+
+        返回的指标数据可能包含多余的列，与 BacktestEngine.load_data 的结果行一致。
+
+        Args:
+            db: 数据库会话（数据已满足时可为 None）
+            start_date: 开始日期，须在上下文区间内
+            end_date: 结束日期，须在上下文区间内
+            columns: 需要的指标列，None 表示全部
+            lookback: 指标数据每只股票额外向前读取的行数
+        """
+        self._check_range(start_date, end_date)
+        # 上下文开始日期之前每只股票已有 self.lookback 行，之后的任意开始日期之前也至少有这么多行；
+        # 开始日期晚于上下文且没有数据库会话时只能使用已加载的历史
+        self.ensure(db, columns, lookback if start_date == self.start_date or db is not None else 0)
+        key = ('indicator', start_date, end_date, lookback)
+        if key not in self._views:
+            self._views[key] = frame_with_lookback(self.indicator_df, start_date, end_date, lookback,
+                                                   self._indicator_dates)
+        return self._views[key], self.price_frame(db, start_date, end_date)
+
+    def price_index(self, price_df: pd.DataFrame):
+        """价格数据的索引（同一价格数据只构建一次，多个回测引擎共用）"""
+        from strategy.backtest_engine import PriceIndex
+
+        if self._price_index is None or self._price_index[0] is not price_df:
+            self._price_index = (price_df, PriceIndex(price_df))
+        return self._price_index[1]
+
+    def clear_disk_cache(self):
+        """删除当前 (区间, 回看, 列) 对应的磁盘缓存"""
+        shutil.rmtree(os.path.join(self.cache_dir, self._cache_key()), ignore_errors=True)
@@ -0,0 +1,266 @@
+"""
+内存映射面板存储
+将 daily_data 的 OHLCV 与 daily_indicator 全部指标列保存为 [n_dates, n_stocks] 的 .npy 数组，
+index.json 记录交易日、股票代码与数组位置的对应关系：
+
+    {PANEL_STORE_DIR}/index.json
+    {PANEL_STORE_DIR}/{字段}.npy
+    {PANEL_STORE_DIR}/_valid_{表名}.npy     # 该表在 (日期, 股票) 上是否有数据
+
+读取时以 mmap_mode='r' 打开，不复制数据，多个进程共享同一份页缓存。
+运行方式（backend 目录下）: python -m strategy.panel_store
+"""
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional
+from loguru import logger
+
+from app.core.config import get_settings
+from strategy.data_loader import iter_query_chunks
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INDEX_FILE = 'index.json'
+
+KEY_COLUMNS = ['ts_code', 'trade_date']
+
+# 价格字段
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'vol', 'pct_chg']
+
+# 各来源表写入的字段，None 表示全部非主键列
+SOURCE_TABLES = {
+    'daily_data': PRICE_FIELDS,
+    'daily_indicator': None,
+}
+
+# 整型字段（缺失值为 0，需结合有效性掩码使用），其余为 float32（缺失值为 NaN）
+INT_FIELDS = {'vol'}
+
+
+def _resolve_dir(store_dir: Optional[str]) -> str:
+    store_dir = store_dir or get_settings().PANEL_STORE_DIR
+    if not os.path.isabs(store_dir):
+        store_dir = os.path.join(BACKEND_DIR, store_dir)
+    return store_dir
+
+
+def _mask_file(table: str) -> str:
+    return f"_valid_{table}.npy"
+
+
+# ============== 构建 ==============
+
+def build_panel_store(bind, store_dir: Optional[str] = None, start_date: Optional[str] = None) -> Dict:
+    """
+    从数据库构建面板存储（写入临时目录，完成后整体替换）
+
+    Args:
+        bind: 数据库引擎
+        store_dir: 存储目录，默认 PANEL_STORE_DIR
+        start_date: 起始交易日期，None 表示全部历史
+
+    Returns:
+        {'dates', 'stocks', 'fields'}
+    """
+    store_dir = _resolve_dir(store_dir)
+    build_dir = store_dir + '.building'
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+
+    where = "WHERE trade_date >= %s" if start_date else ""
+    params = (start_date,) if start_date else ()
+
+    # 1. 坐标轴：以 daily_data 的交易日和股票为准
+    dates, codes = [], set()
+    for chunk in iter_query_chunks(bind, f"SELECT DISTINCT trade_date FROM daily_data {where}", params):
+        dates.extend(chunk['trade_date'])
+    for chunk in iter_query_chunks(bind, f"SELECT DISTINCT ts_code FROM daily_data {where}", params):
+        codes.update(chunk['ts_code'])
+    if not dates:
+        raise ValueError("daily_data 没有数据，无法构建面板存储")
+    dates = np.array(sorted(dates))
+    codes = np.array(sorted(codes))
+    shape = (len(dates), len(codes))
+    logger.info(f"面板尺寸: {shape[0]} 个交易日 x {shape[1]} 只股票")
+
+    # 2. 逐表流式读取并写入数组
+    arrays = {}
+    fields = {}
+    for table, columns in SOURCE_TABLES.items():
+        select = ', '.join(KEY_COLUMNS + columns) if columns else '*'
+        sql = f"SELECT {select} FROM {table} {where} ORDER BY ts_code, trade_date"
+        valid = np.lib.format.open_memmap(os.path.join(build_dir, _mask_file(table)), mode='w+',
+                                          dtype=bool, shape=shape)
+        rows_written = 0
+
+        for chunk in iter_query_chunks(bind, sql, params):
+            # 定位数组坐标，丢弃不在坐标轴上的行
+            date_values = chunk['trade_date'].to_numpy(dtype=dates.dtype)
+            code_values = chunk['ts_code'].to_numpy(dtype=codes.dtype)
+            row = np.minimum(np.searchsorted(dates, date_values), len(dates) - 1)
+            col = np.minimum(np.searchsorted(codes, code_values), len(codes) - 1)
+            keep = (dates[row] == date_values) & (codes[col] == code_values)
+            row, col = row[keep], col[keep]
+            valid[row, col] = True
+            rows_written += len(row)
+
+            for name in chunk.columns:
+                if name in KEY_COLUMNS:
+                    continue
+                if name in fields and fields[name]['table'] != table:
+                    # 与先写入的表字段重名，保留先写入的
+                    continue
+                if name not in arrays:
+                    dtype = np.int64 if name in INT_FIELDS else np.float32
+                    arrays[name] = np.lib.format.open_memmap(os.path.join(build_dir, f"{name}.npy"), mode='w+',
+                                                             dtype=dtype, shape=shape)
+                    if dtype == np.float32:
+                        arrays[name][:] = np.nan
+                    fields[name] = {'dtype': np.dtype(dtype).name, 'table': table}
+
+                values = pd.to_numeric(chunk[name], errors='coerce')[keep]
+                if name in INT_FIELDS:
+                    arrays[name][row, col] = values.fillna(0).to_numpy(dtype=np.int64)
+                else:
+                    arrays[name][row, col] = values.to_numpy(dtype=np.float32)
+
+        valid.flush()
+        del valid
+        logger.info(f"{table}: 写入 {rows_written} 条")
+
+    for array in arrays.values():
+        array.flush()
+    arrays.clear()
+
+    index = {
+        'dates': dates.tolist(),
+        'codes': codes.tolist(),
+        'shape': list(shape),
+        'fields': fields,
+        'masks': {table: _mask_file(table) for table in SOURCE_TABLES},
+        'built_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(os.path.join(build_dir, INDEX_FILE), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+
+    # 替换旧存储（已打开的内存映射仍指向旧文件，不受影响）
+    old_dir = store_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(store_dir):
+        os.replace(store_dir, old_dir)
+    os.replace(build_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info(f"面板存储构建完成: {store_dir}, {len(fields)} 个字段")
+    return {'dates': shape[0], 'stocks': shape[1], 'fields': len(fields)}
+
+
+# ============== 读取 ==============
+
+class PanelStore:
+    """只读内存映射面板，数组形状为 [n_dates, n_stocks]，日期与股票代码均升序"""
+
+    def __init__(self, store_dir: Optional[str] = None):
+        self.store_dir = _resolve_dir(store_dir)
+        index_path = os.path.join(self.store_dir, INDEX_FILE)
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"面板存储不存在: {self.store_dir}，请先运行 python -m strategy.panel_store")
+
+        with open(index_path, 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+
+        self.dates = np.array(self.index['dates'])
+        self.codes = np.array(self.index['codes'])
+        self.fields = self.index['fields']
+        self.date_pos = {date: i for i, date in enumerate(self.index['dates'])}
+        self.code_pos = {code: i for i, code in enumerate(self.index['codes'])}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    @property
+    def shape(self):
+        return tuple(self.index['shape'])
+
+    def _load(self, name: str, file: str) -> np.ndarray:
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.store_dir, file), mmap_mode='r')
+        return self._arrays[name]
+
+    def array(self, field: str) -> np.ndarray:
+        """字段的 [n_dates, n_stocks] 只读数组"""
+        if field not in self.fields:
+            raise KeyError(f"面板存储中没有字段: {field}")
+        return self._load(field, f"{field}.npy")
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.array(field)
+
+    def valid(self, table: str = 'daily_data') -> np.ndarray:
+        """表在 (日期, 股票) 上是否有数据的布尔数组"""
+        return self._load(_mask_file(table), self.index['masks'][table])
+
+    def table_fields(self, table: str) -> List[str]:
+        """来源于指定表的字段"""
+        return [name for name, meta in self.fields.items() if meta['table'] == table]
+
+    def date_slice(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> slice:
+        """日期范围（含两端）对应的行切片"""
+        start = np.searchsorted(self.dates, start_date, side='left') if start_date else 0
+        stop = np.searchsorted(self.dates, end_date, side='right') if end_date else len(self.dates)
+        return slice(int(start), int(stop))
+
+    def to_frame(
+        self,
+        fields: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        table: str = 'daily_data',
+        ts_codes: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        转为 (ts_code, trade_date) 升序的长表，只包含指定表有数据的行
+
+        Args:
+            fields: 字段列表
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            table: 以哪张表的有效性掩码筛选行
+            ts_codes: 股票代码列表，None 表示全部
+        """
+        rows = self.date_slice(start_date, end_date)
+        if ts_codes is None:
+            cols = np.arange(len(self.codes))
+        else:
+            cols = np.array(sorted(self.code_pos[code] for code in ts_codes if code in self.code_pos), dtype=np.int64)
+
+        mask = self.valid(table)[rows][:, cols]
+        # 转置后按股票优先取非零位置，结果即按 (ts_code, trade_date) 排序
+        stock_idx, date_idx = np.nonzero(mask.T)
+        row_idx = rows.start + date_idx
+        col_idx = cols[stock_idx]
+
+        data = {'ts_code': self.codes[col_idx], 'trade_date': self.dates[row_idx]}
+        for field in fields:
+            data[field] = self.array(field)[row_idx, col_idx]
+        return pd.DataFrame(data)
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from app.core.logging import setup_logging
+
+    load_dotenv(os.path.join(BACKEND_DIR, '.env'))
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description='构建内存映射面板存储')
+    parser.add_argument('--start-date', type=str, default=None, help='起始交易日期 (YYYYMMDD)')
+    parser.add_argument('--store-dir', type=str, default=None, help='存储目录')
+    args = parser.parse_args()
+
+    from app.core.database import engine
+    result = build_panel_store(engine, store_dir=args.store_dir, start_date=args.start_date)
+    print(f"交易日: {result['dates']}, 股票: {result['stocks']}, 字段: {result['fields']}")
@@ -21,6 +21,7 @@ from datetime import datetime
 from app.core.database import get_db_context
 from strategy.signal_engine import SignalEngine
 from strategy.backtest_engine import BacktestEngine, BacktestConfig
+from strategy.market_context import MarketDataContext
 
 
 def run_quick_optimization():
@@ -77,6 +78,9 @@ def run_quick_optimization():
     start_date = '20240101'
     end_date = '20260424'
 
+    # 指标与价格数据只加载一次，各次回测共用
+    context = MarketDataContext(start_date, end_date)
+
     results = []
 
     with get_db_context() as db:
@@ -89,7 +93,8 @@ def run_quick_optimization():
                 performance = engine.run_backtest(
                     db, start_date, end_date,
                     strategy_names=strategies,
-                    min_score=0.3
+                    min_score=0.3,
+                    data_context=context
                 )
 
                 if performance and performance.get('total_trades', 0) > 0:
@@ -2,14 +2,23 @@
 信号引擎
 定义多种信号策略模板，支持灵活组合因子条件
 """
+import hashlib
+import importlib
+import json
+import weakref
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Optional, Callable, Any
+from typing import List, Dict, Optional, Callable, Any, Tuple, Collection, Iterator
 from dataclasses import dataclass, field
 from enum import Enum
 from loguru import logger
 
 
+# SQL 下推时阈值的相对容差：daily_indicator 为单精度 FLOAT，放宽阈值保证数据库筛出的
+# 候选行是精确结果的超集，精确判断仍在 Python 中完成
+SQL_FILTER_TOLERANCE = 1e-6
+
+
 class SignalType(Enum):
     """信号类型"""
     OVERSOLD = "oversold"      # 超跌信号
@@ -19,16 +28,149 @@ class SignalType(Enum):
     CUSTOM = "custom"         # 自定义信号
 
 
+# 比较操作符
+COMPARE_OPERATORS = ('<', '<=', '>', '>=', '==', 'between')
+
+# 上穿/下穿操作符：当日满足且前一交易日不满足
+CROSS_OPERATORS = ('cross_above', 'cross_below')
+
+# 条件取值方式
+CONDITION_KINDS = ('value', 'cs_rank', 'ts_rank', 'shift')
+
+# 条件掩码缓存中保存数据帧排序信息的键
+_FRAME_INDEX_KEY = ('__frame_index__',)
+
+
+def _compare(values: np.ndarray, operator: str, value, value_max=None) -> np.ndarray:
+    """按操作符比较（NaN 为 False），value 可以是数组"""
+    with np.errstate(invalid='ignore'):
+        if operator == '<':
+            return values < value
+        elif operator == '<=':
+            return values <= value
+        elif operator == '>':
+            return values > value
+        elif operator == '>=':
+            return values >= value
+        elif operator == '==':
+            return values == value
+        elif operator == 'between':
+            return (values >= value) & (values <= value_max)
+    return np.zeros(len(values), dtype=bool)
+
+
+class _FrameIndex:
+    """
+    数据帧按 (ts_code, trade_date) 排序后的位置与分组，供横截面/时间序列条件使用
+
+    数据帧已按 (ts_code, trade_date) 升序时（load_indicator_frame 的结果）不做重排。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        if 'ts_code' not in df.columns or 'trade_date' not in df.columns:
+            raise ValueError("横截面/时间序列条件需要 ts_code 与 trade_date 列")
+
+        stock = pd.factorize(df['ts_code'], sort=True)[0]
+        date = pd.factorize(df['trade_date'], sort=True)[0]
+        order = np.lexsort((date, stock))
+        self.order = None if np.array_equal(order, np.arange(len(order))) else order
+        self.stock = stock if self.order is None else stock[order]
+        self.date = date if self.order is None else date[order]
+
+    def to_sorted(self, values: np.ndarray) -> np.ndarray:
+        return values if self.order is None else values[self.order]
+
+    def from_sorted(self, values: np.ndarray) -> np.ndarray:
+        if self.order is None:
+            return values
+        result = np.empty_like(values)
+        result[self.order] = values
+        return result
+
+    def shift(self, values: np.ndarray, lag: int) -> np.ndarray:
+        """同一股票 lag 个交易日前的值（排序后数组，不足时为 NaN）"""
+        result = np.full(len(values), np.nan)
+        if 0 < lag < len(values):
+            result[lag:] = values[:-lag]
+            result[lag:][self.stock[lag:] != self.stock[:-lag]] = np.nan
+        return result
+
+    def cs_rank(self, values: np.ndarray) -> np.ndarray:
+        """当日全市场百分位排名 (0, 1]，NaN 不参与排名"""
+        return pd.Series(values).groupby(self.date).rank(pct=True).to_numpy()
+
+    def ts_rank(self, values: np.ndarray, window: int) -> np.ndarray:
+        """在自身最近 window 个交易日（含当日）中的百分位排名 (0, 1]，不足 window 天为 NaN"""
+        ranked = (pd.Series(values).groupby(self.stock, sort=False)
+                  .rolling(window, min_periods=window).rank(pct=True))
+        return ranked.droplevel(0).sort_index().to_numpy()
+
+
+def _frame_index(df: pd.DataFrame, cache: Optional[Dict[tuple, Any]]) -> _FrameIndex:
+    if cache is None:
+        return _FrameIndex(df)
+    index = cache.get(_FRAME_INDEX_KEY)
+    if index is None:
+        index = cache[_FRAME_INDEX_KEY] = _FrameIndex(df)
+    return index
+
+
+def _plain(value: Any) -> Any:
+    """NumPy 标量转为 Python 原生类型，便于 JSON 序列化"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _hash_value(value: Any) -> Any:
+    """哈希时数值统一为 float（-10 与 -10.0 视为相同定义）"""
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def _func_path(func: Callable) -> str:
+    """函数的导入路径 module:qualname"""
+    if isinstance(func, VectorScore):
+        func = func.func
+    qualname = getattr(func, '__qualname__', '')
+    if not qualname or '<' in qualname:
+        raise ValueError(f"评分函数 {func!r} 不是模块级函数，无法序列化")
+    return f"{func.__module__}:{qualname}"
+
+
+def _import_func(path: str) -> Callable:
+    """按 module:qualname 导入函数（或 VectorScore）"""
+    module_name, _, qualname = path.partition(':')
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
 @dataclass
 class FactorCondition:
-    """因子条件"""
+    """
+    因子条件
+
+    kind 决定与阈值比较的取值：
+    - value: 当日值
+    - cs_rank: 当日全市场百分位排名 (0, 1]，如 ('j_value', '<=', 0.05, kind='cs_rank') 为全市场最低 5%
+    - ts_rank: 在自身最近 window 个交易日中的百分位排名，如 ('vol_ratio', '>', 0.9, kind='ts_rank', window=60)
+    - shift: lag 个交易日前的值
+
+    value 为字符串时表示与同一行的另一列比较；operator 为 cross_above / cross_below 时
+    表示当日满足而前一交易日不满足（上穿/下穿阈值或另一列），如 ('macd_hist', 'cross_above', 0)。
+    除 value 外的取值方式、列间比较和上穿/下穿需要 ts_code、trade_date 列，只支持整列计算。
+    """
     factor: str                    # 因子名称
-    operator: str                  # 操作符: '<', '>', '<=', '>=', '==', 'between'
-    value: Any                     # 阈值
+    operator: str                  # 操作符: '<', '>', '<=', '>=', '==', 'between', 'cross_above', 'cross_below'
+    value: Any                     # 阈值（数值或列名）
     value_max: Optional[float] = None  # between 操作符的上限
+    kind: str = 'value'            # 取值方式: 'value', 'cs_rank', 'ts_rank', 'shift'
+    lag: int = 1                   # shift 的滞后交易日数
+    window: int = 60               # ts_rank 的窗口交易日数（含当日）
 
     def check(self, factor_value: float) -> bool:
-        """检查条件是否满足"""
+        """检查条件是否满足（只适用于当日值与常量比较）"""
         if pd.isna(factor_value):
             return False
 
@@ -46,6 +188,206 @@ class FactorCondition:
             return self.value <= factor_value <= self.value_max
         return False
 
+    @property
+    def key(self) -> tuple:
+        """条件标识：标识相同的条件在同一数据上结果相同"""
+        key = (self.factor, self.operator, self.value, self.value_max if self.operator == 'between' else None)
+        if self.kind == 'value':
+            return key
+        return key + (self.kind, self.lag if self.kind == 'shift' else None,
+                      self.window if self.kind == 'ts_rank' else None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典（只写出非默认的取值方式参数）"""
+        data = {'factor': self.factor, 'operator': self.operator, 'value': _plain(self.value)}
+        if self.value_max is not None:
+            data['value_max'] = _plain(self.value_max)
+        if self.kind != 'value':
+            data['kind'] = self.kind
+        if self.kind == 'shift':
+            data['lag'] = self.lag
+        if self.kind == 'ts_rank':
+            data['window'] = self.window
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FactorCondition':
+        """由字典创建，格式见 to_dict"""
+        operator = data['operator']
+        kind = data.get('kind', 'value')
+        if operator not in COMPARE_OPERATORS + CROSS_OPERATORS:
+            raise ValueError(f"不支持的操作符: {operator}")
+        if kind not in CONDITION_KINDS:
+            raise ValueError(f"不支持的条件取值方式: {kind}")
+        return cls(
+            factor=data['factor'],
+            operator=operator,
+            value=data['value'],
+            value_max=data.get('value_max'),
+            kind=kind,
+            lag=int(data.get('lag', 1)),
+            window=int(data.get('window', 60)),
+        )
+
+    @property
+    def needs_frame(self) -> bool:
+        """是否依赖其他行（同日其他股票或同一股票的历史）或其他列，不能逐行判断"""
+        return self.kind != 'value' or self.operator in CROSS_OPERATORS or isinstance(self.value, str)
+
+    @property
+    def lookback(self) -> int:
+        """需要的同一股票历史行数（不含当日，停牌日不计）"""
+        lookback = {'shift': self.lag, 'ts_rank': self.window - 1}.get(self.kind, 0)
+        if self.operator in CROSS_OPERATORS:
+            lookback += 1
+        return lookback
+
+    def to_sql(self, columns: Collection[str]) -> Optional[Tuple[str, list]]:
+        """
+        编译为 SQL 条件（%s 占位符），阈值按 SQL_FILTER_TOLERANCE 放宽
+
+        Args:
+            columns: 表中存在的列，不存在的因子编译为 FALSE（与 check 的缺失列语义一致）
+
+        Returns:
+            (SQL 条件, 参数列表)，阈值不是数值或条件依赖其他行时返回 None 表示无法下推
+        """
+        if self.factor not in columns:
+            return 'FALSE', []
+        if self.needs_frame:
+            # 按行筛选会丢掉排名与历史所需的行
+            return None
+        if self.operator not in COMPARE_OPERATORS:
+            return 'FALSE', []
+        if not isinstance(self.value, (int, float, np.number)):
+            return None
+
+        value = float(self.value)
+        tol = SQL_FILTER_TOLERANCE * max(1.0, abs(value))
+        if self.operator in ('<', '<='):
+            return f"{self.factor} <= %s", [value + tol]
+        elif self.operator in ('>', '>='):
+            return f"{self.factor} >= %s", [value - tol]
+        elif self.operator == '==':
+            return f"{self.factor} BETWEEN %s AND %s", [value - tol, value + tol]
+
+        if not isinstance(self.value_max, (int, float, np.number)):
+            return None
+        value_max = float(self.value_max)
+        return f"{self.factor} BETWEEN %s AND %s", [
+            value - tol, value_max + SQL_FILTER_TOLERANCE * max(1.0, abs(value_max))
+        ]
+
+    def evaluate(self, df: pd.DataFrame, cache: Optional[Dict[tuple, Any]] = None) -> np.ndarray:
+        """
+        整列计算条件是否满足，当日值与常量比较时语义与 check 一致（缺失列与 NaN 均为 False）
+
+        Args:
+            df: 指标数据
+            cache: 该数据帧的条件掩码缓存 {条件标识: 掩码}，命中时直接返回
+
+        Returns:
+            与 df 等长的布尔数组
+        """
+        if cache is not None:
+            mask = cache.get(self.key)
+            if mask is None:
+                mask = cache[self.key] = self._evaluate(df, cache)
+            return mask
+        return self._evaluate(df, None)
+
+    def _evaluate(self, df: pd.DataFrame, cache: Optional[Dict[tuple, Any]]) -> np.ndarray:
+        if self.factor not in df.columns or (isinstance(self.value, str) and self.value not in df.columns):
+            return np.zeros(len(df), dtype=bool)
+
+        # 转为 float64 比较，与逐行取出标量后比较的结果一致（float32 列按阈值精度比较会有差异）
+        values = df[self.factor].to_numpy(dtype=np.float64, na_value=np.nan)
+        if not self.needs_frame:
+            return _compare(values, self.operator, self.value, self.value_max)
+
+        # 在 (ts_code, trade_date) 排序后的数组上计算，再还原为原行顺序
+        index = _frame_index(df, cache)
+        values = index.to_sorted(values)
+        if self.kind == 'cs_rank':
+            values = index.cs_rank(values)
+        elif self.kind == 'ts_rank':
+            values = index.ts_rank(values, self.window)
+        elif self.kind == 'shift':
+            values = index.shift(values, self.lag)
+
+        if isinstance(self.value, str):
+            ref = index.to_sorted(df[self.value].to_numpy(dtype=np.float64, na_value=np.nan))
+        else:
+            ref = self.value
+
+        if self.operator in CROSS_OPERATORS:
+            prev = index.shift(values, 1)
+            prev_ref = index.shift(ref, 1) if isinstance(ref, np.ndarray) else ref
+            if self.operator == 'cross_above':
+                mask = _compare(values, '>', ref) & _compare(prev, '<=', prev_ref)
+            else:
+                mask = _compare(values, '<', ref) & _compare(prev, '>=', prev_ref)
+        else:
+            mask = _compare(values, self.operator, ref, self.value_max)
+        return index.from_sorted(mask)
+
+
+def _jit_compile(func: Callable) -> Callable:
+    """用 numba.njit 编译函数，未安装 numba 时返回原函数"""
+    try:
+        import numba
+    except ImportError:
+        logger.warning(f"未安装 numba，评分函数 {func.__qualname__} 以 NumPy 执行")
+        return func
+    return numba.njit(func)
+
+
+@dataclass
+class VectorScore:
+    """
+    向量化评分函数：按 inputs 顺序接收各列的 float64 数组，返回与行数等长的得分数组
+
+        @vector_score(inputs=['j_value', 'rsi6'])
+        def oversold_depth(j, rsi):
+            return np.clip(-j, 0, 50) / 50 + np.clip(30 - rsi, 0, 30) / 30
+
+    缺失的列以全 NaN 数组传入。jit 为 True 时以 numba.njit 编译（函数只能使用 numba
+    支持的 NumPy 子集），未安装 numba 时回退到原函数。
+    """
+    func: Callable[..., np.ndarray]     # 评分函数
+    inputs: List[str]                   # 输入列
+    jit: bool = False                   # 是否 JIT 编译
+    _compiled: Optional[Callable] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def name(self) -> str:
+        """函数全名 module.qualname"""
+        return f"{self.func.__module__}.{self.func.__qualname__}"
+
+    def __call__(self, df: pd.DataFrame) -> np.ndarray:
+        if self._compiled is None:
+            self._compiled = _jit_compile(self.func) if self.jit else self.func
+
+        n = len(df)
+        arrays = [
+            df[col].to_numpy(dtype=np.float64, na_value=np.nan) if col in df.columns else np.full(n, np.nan)
+            for col in self.inputs
+        ]
+        score = np.asarray(self._compiled(*arrays), dtype=np.float64)
+        if score.ndim == 0:
+            score = np.full(n, float(score))
+        if score.shape != (n,):
+            raise ValueError(f"评分函数 {self.name} 返回形状 {score.shape}，应为 ({n},)")
+        return score
+
+
+def vector_score(inputs: List[str], jit: bool = False):
+    """将函数包装为 VectorScore 的装饰器，用作 SignalStrategy.score_func"""
+    def decorator(func: Callable[..., np.ndarray]) -> VectorScore:
+        return VectorScore(func=func, inputs=list(inputs), jit=jit)
+
+    return decorator
+
 
 @dataclass
 class SignalStrategy:
@@ -56,12 +398,14 @@ class SignalStrategy:
     combine_mode: str = 'and'           # 组合模式: 'and', 'or'
     weight: float = 1.0                 # 策略权重
     description: str = ""               # 策略描述
-    score_func: Optional[Callable] = None  # 自定义评分函数
+    score_func: Optional[Callable] = None  # 自定义评分函数：逐行函数 (row -> float) 或 VectorScore（整列计算）
 
     def check_signal(self, row: pd.Series) -> bool:
-        """检查是否产生信号"""
+        """检查是否产生信号（逐行，只支持当日值与常量比较的条件）"""
         results = []
         for cond in self.conditions:
+            if cond.needs_frame:
+                raise ValueError(f"条件 {cond.key} 依赖其他行或列，请使用 evaluate 整列计算")
             if cond.factor not in row.index:
                 results.append(False)
             else:
@@ -74,22 +418,330 @@ class SignalStrategy:
 
     def calculate_score(self, row: pd.Series) -> float:
         """计算信号得分"""
+        if isinstance(self.score_func, VectorScore):
+            return float(self.score_func(row.to_frame().T)[0])
         if self.score_func is not None:
             return self.score_func(row)
 
         # 默认评分：基于满足条件的数量
         score = 0
         for cond in self.conditions:
+            if cond.needs_frame:
+                raise ValueError(f"条件 {cond.key} 依赖其他行或列，请使用 evaluate 整列计算")
             if cond.factor in row.index and cond.check(row[cond.factor]):
                 score += 1
         return score / len(self.conditions) * self.weight
 
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典（评分函数以 module:qualname 导入路径保存，须为模块级函数）"""
+        data = {
+            'name': self.name,
+            'signal_type': self.signal_type.value,
+            'conditions': [cond.to_dict() for cond in self.conditions],
+            'combine_mode': self.combine_mode,
+            'weight': _plain(self.weight),
+            'description': self.description,
+        }
+        if self.score_func is not None:
+            data['score_func'] = _func_path(self.score_func)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SignalStrategy':
+        """由字典创建，格式见 to_dict（signal_type 默认 custom）"""
+        combine_mode = data.get('combine_mode', 'and')
+        if combine_mode not in ('and', 'or'):
+            raise ValueError(f"不支持的组合模式: {combine_mode}")
+        score_func = data.get('score_func')
+        return cls(
+            name=data['name'],
+            signal_type=SignalType(data.get('signal_type', SignalType.CUSTOM.value)),
+            conditions=[FactorCondition.from_dict(cond) for cond in data.get('conditions', [])],
+            combine_mode=combine_mode,
+            weight=float(data.get('weight', 1.0)),
+            description=data.get('description', ''),
+            score_func=_import_func(score_func) if score_func else None,
+        )
+
+    def content_hash(self) -> str:
+        """策略定义哈希：条件、组合模式、权重或评分函数变化时改变（类型与描述不影响）"""
+        definition = {
+            'name': self.name,
+            'conditions': [[_hash_value(v) for v in cond.key] for cond in self.conditions],
+            'combine_mode': self.combine_mode,
+            'weight': _hash_value(self.weight),
+            'score_func': None,
+        }
+        func = self.score_func
+        if isinstance(func, VectorScore):
+            definition['score_func'] = {'name': func.name, 'inputs': func.inputs}
+        elif func is not None:
+            definition['score_func'] = f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+        payload = json.dumps(definition, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    @property
+    def lookback(self) -> int:
+        """条件需要的历史交易日数（不含当日），逐日计算时需保留这么多天的数据"""
+        return max((cond.lookback for cond in self.conditions), default=0)
+
+    def to_sql(self, columns: Collection[str]) -> Optional[Tuple[str, list]]:
+        """
+        编译为 SQL 条件，按 combine_mode 以 AND / OR 组合各因子条件
+
+        Returns:
+            (SQL 条件, 参数列表)，有条件无法下推时返回 None
+        """
+        if not self.conditions:
+            return ('TRUE', []) if self.combine_mode == 'and' else ('FALSE', [])
+
+        parts = []
+        params = []
+        for cond in self.conditions:
+            compiled = cond.to_sql(columns)
+            if compiled is None:
+                return None
+            parts.append(compiled[0])
+            params.extend(compiled[1])
+
+        joiner = ' AND ' if self.combine_mode == 'and' else ' OR '
+        return '(' + joiner.join(parts) + ')', params
+
+    def evaluate(
+        self,
+        df: pd.DataFrame,
+        cache: Optional[Dict[tuple, np.ndarray]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        整列计算信号与得分，结果与逐行调用 check_signal / calculate_score 一致
+
+        Args:
+            df: 指标数据
+            cache: 该数据帧的条件掩码缓存，多个策略共用的条件只计算一次
+
+        Returns:
+            (信号布尔数组, 得分数组)
+        """
+        n = len(df)
+        masks = [cond.evaluate(df, cache) for cond in self.conditions]
+
+        if self.combine_mode == 'and':
+            signal = np.logical_and.reduce(masks) if masks else np.ones(n, dtype=bool)
+        else:  # 'or'
+            signal = np.logical_or.reduce(masks) if masks else np.zeros(n, dtype=bool)
+
+        if isinstance(self.score_func, VectorScore):
+            score = self.score_func(df)
+        elif self.score_func is not None:
+            # 逐行评分函数，最慢的路径，建议改写为 VectorScore
+            score = df.apply(self.score_func, axis=1).to_numpy(dtype=np.float64) if n else np.zeros(0)
+        elif masks:
+            # 默认评分：满足条件的数量（布尔掩码累加）/ 条件数 × 权重
+            met = np.zeros(n, dtype=np.int32)
+            for mask in masks:
+                met += mask
+            score = met / len(masks) * self.weight
+        else:
+            score = np.zeros(n)
+
+        return signal, score
+
+
+class ConditionMaskCache:
+    """
+    按数据帧缓存条件掩码 {条件标识: 布尔数组}
+
+    以弱引用跟踪数据帧，数据帧被回收时对应缓存自动删除；同一数据帧上重复检测
+    （如参数寻优中策略组合互相重叠）只计算新出现的条件。数据帧被原地修改后需调用 clear。
+    """
+
+    def __init__(self):
+        self._frames: Dict[int, Tuple[weakref.ref, Dict[tuple, np.ndarray]]] = {}
+
+    def masks_for(self, df: pd.DataFrame) -> Dict[tuple, np.ndarray]:
+        """数据帧对应的掩码缓存（不存在时创建）"""
+        key = id(df)
+        entry = self._frames.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+
+        masks: Dict[tuple, np.ndarray] = {}
+        ref = weakref.ref(df, lambda _, key=key: self._frames.pop(key, None))
+        self._frames[key] = (ref, masks)
+        return masks
+
+    def clear(self, df: Optional[pd.DataFrame] = None):
+        """清空指定数据帧的缓存，df 为空时清空全部"""
+        if df is None:
+            self._frames.clear()
+        else:
+            self._frames.pop(id(df), None)
+
+
+# 默认在所有信号引擎间共享，同一数据帧上的不同引擎实例也能复用
+_shared_mask_cache = ConditionMaskCache()
+
+
+def signal_type_labels(signals: np.ndarray, names: List[str]) -> np.ndarray:
+    """
+    由信号矩阵生成每行的信号类型字符串（触发的策略名以 | 连接，无信号为空字符串）
+
+    每行的触发组合编码为位掩码，只对出现过的组合拼接一次字符串再映射回各行。
+
+    Args:
+        signals: [行数, 策略数] 布尔矩阵
+        names: 与列对应的策略名称
+    """
+    n_rows = len(signals)
+    if len(names) == 0:
+        return np.full(n_rows, '', dtype=object)
+
+    # 每 64 个策略一个 uint64 字
+    words = []
+    for start in range(0, len(names), 64):
+        word = np.zeros(n_rows, dtype=np.uint64)
+        for bit, col in enumerate(range(start, min(start + 64, len(names)))):
+            word |= signals[:, col].astype(np.uint64) << np.uint64(bit)
+        words.append(word)
+
+    if len(words) == 1:
+        inverse, uniques = pd.factorize(words[0])
+        uniques = uniques.reshape(-1, 1)
+    else:
+        uniques, inverse = np.unique(np.column_stack(words), axis=0, return_inverse=True)
+
+    labels = np.empty(len(uniques), dtype=object)
+    for i, code in enumerate(uniques):
+        labels[i] = '|'.join(
+            names[w * 64 + bit]
+            for w, word in enumerate(code)
+            for bit in range(64)
+            if w * 64 + bit < len(names) and (int(word) >> bit) & 1
+        )
+    return labels[inverse.ravel()]
+
+
+class SignalRanking:
+    """
+    每日信号排名索引：一次构建，按交易日取得分最高的 K 只股票
+
+    构建时按交易日分组，每组用 argpartition 选出前 K 行并只对这 K 行排序（O(n + K log K)），
+    不做全量排序；查询 top(trade_date, k) 为 O(K)。k 超过预排序数量时再对该日剩余行排序并缓存。
+    得分相同时按原数据帧中的行顺序排列。
+
+    Args:
+        df: 已检测信号的数据（含 trade_date 与得分列）
+        k: 每日预排序的行数
+        score_col: 排序得分列
+        mask_col: 只保留该列为真的行，None 表示全部行
+        min_score: 最小得分
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        k: int = 50,
+        score_col: str = 'total_score',
+        mask_col: Optional[str] = 'has_signal',
+        min_score: Optional[float] = None
+    ):
+        self.df = df
+        self.k = k
+        self.score_col = score_col
+
+        keep = np.ones(len(df), dtype=bool)
+        if mask_col is not None:
+            keep &= df[mask_col].to_numpy(dtype=bool)
+        scores = df[score_col].to_numpy(dtype=np.float64)
+        if min_score is not None:
+            keep &= scores >= min_score
+        rows = np.flatnonzero(keep)
+
+        codes, dates = pd.factorize(df['trade_date'].to_numpy()[rows])
+        group_order = np.argsort(codes, kind='stable')
+        self._rows = rows[group_order]             # 按交易日分组，组内保持原行顺序
+        self._scores = scores[self._rows]
+        bounds = np.searchsorted(codes[group_order], np.arange(len(dates) + 1))
+        self._groups: Dict[str, Tuple[int, int]] = {
+            str(date): (int(bounds[i]), int(bounds[i + 1])) for i, date in enumerate(dates)
+        }
+        self._sorted: Dict[str, int] = {}          # 交易日 -> 组内已排序的行数
+
+        for date in self._groups:
+            self._sort_group(date, k)
+
+    def _sort_group(self, date: str, k: int) -> int:
+        """将该日得分最高的 k 行排到组首，返回已排序的行数"""
+        start, end = self._groups[date]
+        done = self._sorted.get(date, 0)
+        k = min(k, end - start)
+        if k <= done:
+            return done
+
+        # 已排序部分之后的行仍保持原行顺序，按 (-得分, 原行号) 选出并排序
+        lo = start + done
+        rows = self._rows[lo:end]
+        scores = self._scores[lo:end]
+        need = k - done
+        if need < len(rows):
+            # 第 need 大的得分作为阈值：高于阈值的全部入选，等于阈值的按行顺序补足
+            threshold = -np.partition(-scores, need - 1)[need - 1]
+            above = np.flatnonzero(scores > threshold)
+            ties = np.flatnonzero(scores == threshold)[:need - len(above)]
+            picked = np.concatenate([above, ties])
+        else:
+            picked = np.arange(len(rows))
+        picked = picked[np.lexsort((rows[picked], -scores[picked]))]
+
+        rest = np.ones(len(rows), dtype=bool)
+        rest[picked] = False
+        rest = np.flatnonzero(rest)
+        self._rows[lo:end] = np.concatenate([rows[picked], rows[rest]])
+        self._scores[lo:end] = np.concatenate([scores[picked], scores[rest]])
+        self._sorted[date] = k
+        return k
+
+    @property
+    def dates(self) -> List[str]:
+        """有候选行的交易日"""
+        return list(self._groups.keys())
+
+    def count(self, trade_date: str) -> int:
+        """该日候选行数"""
+        start, end = self._groups.get(trade_date, (0, 0))
+        return end - start
+
+    def top_rows(self, trade_date: str, k: Optional[int] = None) -> np.ndarray:
+        """该日得分最高的 k 行在 df 中的位置（降序），k 为空时返回全部行"""
+        if trade_date not in self._groups:
+            return np.empty(0, dtype=np.int64)
+        start, end = self._groups[trade_date]
+        k = end - start if k is None else min(k, end - start)
+        if k > self._sorted[trade_date]:
+            self._sort_group(trade_date, k)
+        return self._rows[start:start + k]
+
+    def top(self, trade_date: str, k: Optional[int] = None) -> pd.DataFrame:
+        """该日得分最高的 k 行（降序）"""
+        return self.df.iloc[self.top_rows(trade_date, k)]
+
+    def iter_ranked(self, trade_date: str) -> Iterator[int]:
+        """按得分降序逐个返回该日行位置，先使用预排序的前 K 行，不够时再排序剩余行"""
+        k = self.k or 1
+        done = 0
+        while done < self.count(trade_date):
+            rows = self.top_rows(trade_date, done + k)
+            yield from rows[done:].tolist()
+            done = len(rows)
+            k *= 2
+
 
 class SignalEngine:
     """信号引擎"""
 
-    def __init__(self):
+    def __init__(self, mask_cache: Optional[ConditionMaskCache] = None):
         self.strategies: Dict[str, SignalStrategy] = {}
+        self.mask_cache = mask_cache if mask_cache is not None else _shared_mask_cache
         self._register_builtin_strategies()
 
     def _register_builtin_strategies(self):
@@ -371,6 +1023,89 @@ class SignalEngine:
             strategies = [s for s in strategies if s.signal_type == signal_type]
         return strategies
 
+    def clear_cache(self, df: Optional[pd.DataFrame] = None):
+        """清空条件掩码缓存（数据帧被原地修改后调用），df 为空时清空全部"""
+        self.mask_cache.clear(df)
+
+    def required_columns(self, strategy_names: Optional[List[str]] = None) -> Optional[List[str]]:
+        """
+        所选策略用到的指标列，用于按需加载数据
+
+        Args:
+            strategy_names: 策略名称列表，None 表示全部
+
+        Returns:
+            指标列列表；有策略使用逐行评分函数（无法确定依赖列）时返回 None 表示需要全部列
+        """
+        if strategy_names is None:
+            strategy_names = list(self.strategies.keys())
+
+        columns = []
+        for name in strategy_names:
+            strategy = self.strategies.get(name)
+            if strategy is None:
+                continue
+            if isinstance(strategy.score_func, VectorScore):
+                columns.extend(strategy.score_func.inputs)
+            elif strategy.score_func is not None:
+                return None
+            for cond in strategy.conditions:
+                columns.append(cond.factor)
+                if isinstance(cond.value, str):
+                    columns.append(cond.value)
+        return list(dict.fromkeys(columns))
+
+    def max_lookback(self, strategy_names: Optional[List[str]] = None) -> int:
+        """所选策略需要的同一股票最长历史行数（不含当日，停牌日不计）"""
+        if strategy_names is None:
+            strategy_names = list(self.strategies.keys())
+        return max((self.strategies[name].lookback for name in strategy_names if name in self.strategies),
+                   default=0)
+
+    def compile_sql_filter(
+        self,
+        strategy_names: Optional[List[str]] = None,
+        columns: Optional[Collection[str]] = None
+    ) -> Optional[Tuple[str, list]]:
+        """
+        将所选策略编译为 daily_indicator 的 SQL 筛选条件（各策略之间为 OR）
+
+        只用于缩小从数据库读取的行数：得到的是任一策略可能产生信号的候选行，
+        信号与得分仍由 detect_signals 精确计算。
+
+        Args:
+            strategy_names: 策略名称列表，None 表示全部
+            columns: 表中存在的列，None 表示按 DailyIndicator 模型
+
+        Returns:
+            (SQL 条件, 参数列表)；有策略无法下推或恒为真（无法缩小范围）时返回 None
+        """
+        if columns is None:
+            from strategy.data_loader import table_columns
+            columns = table_columns('daily_indicator')
+        columns = set(columns)
+
+        if strategy_names is None:
+            strategy_names = list(self.strategies.keys())
+
+        parts = []
+        params = []
+        for name in strategy_names:
+            strategy = self.strategies.get(name)
+            if strategy is None:
+                continue
+            compiled = strategy.to_sql(columns)
+            if compiled is None or compiled[0] == 'TRUE':
+                return None
+            if compiled[0] == 'FALSE':
+                continue
+            parts.append(compiled[0])
+            params.extend(compiled[1])
+
+        if not parts:
+            return 'FALSE', []
+        return ' OR '.join(parts), params
+
     def detect_signals(
         self,
         df: pd.DataFrame,
@@ -388,55 +1123,63 @@ class SignalEngine:
         Returns:
             添加了信号列的 DataFrame
         """
-        result_df = df.copy()
-
         if strategy_names is None:
             strategy_names = list(self.strategies.keys())
 
-        # 为每个策略添加信号列
+        # 为每个策略计算信号列与得分列（整列向量化，相同条件只计算一次）
+        cache = self.mask_cache.masks_for(df)
+        columns = {}
+        names = []
         for name in strategy_names:
             strategy = self.strategies.get(name)
             if strategy is None:
                 logger.warning(f"策略 {name} 不存在，跳过")
                 continue
 
-            result_df[f'signal_{name}'] = result_df.apply(
-                lambda row: strategy.check_signal(row), axis=1
-            )
-            result_df[f'score_{name}'] = result_df.apply(
-                lambda row: strategy.calculate_score(row), axis=1
-            )
-
-        # 综合信号
-        signal_cols = [f'signal_{name}' for name in strategy_names]
-        result_df['has_signal'] = result_df[signal_cols].any(axis=1)
+            signal, score = strategy.evaluate(df, cache)
+            columns[f'signal_{name}'] = signal
+            columns[f'score_{name}'] = score
+            names.append(name)
 
-        # 信号数量
-        result_df['signal_count'] = result_df[signal_cols].sum(axis=1)
+        signals = np.zeros((len(df), len(names)), dtype=bool)
+        scores = np.zeros((len(df), len(names)))
+        for i, name in enumerate(names):
+            signals[:, i] = columns[f'signal_{name}']
+            scores[:, i] = columns[f'score_{name}']
 
-        # 综合得分
-        score_cols = [f'score_{name}' for name in strategy_names]
-        result_df['total_score'] = result_df[score_cols].sum(axis=1)
+        # 综合信号、信号数量、综合得分
+        columns['has_signal'] = signals.any(axis=1)
+        columns['signal_count'] = signals.sum(axis=1)
+        columns['total_score'] = scores.sum(axis=1)
 
         # 信号类型列表
-        def get_signal_types(row):
-            types = []
-            for name in strategy_names:
-                if row.get(f'signal_{name}', False):
-                    types.append(name)
-            return '|'.join(types) if types else ''
+        columns['signal_types'] = signal_type_labels(signals, names)
 
-        result_df['signal_types'] = result_df.apply(get_signal_types, axis=1)
+        new_df = pd.DataFrame(columns, index=df.index)
+        result_df = pd.concat([df.drop(columns=new_df.columns, errors='ignore'), new_df], axis=1)
 
         return result_df
 
+    def rank_signals(self, df: pd.DataFrame, k: int = 50, min_score: Optional[float] = None) -> SignalRanking:
+        """
+        构建每日信号排名索引（按综合得分），供逐日取前 K 只信号股票
+
+        Args:
+            df: 已检测信号的指标数据
+            k: 每日预排序的股票数
+            min_score: 最小综合得分
+        """
+        return SignalRanking(df, k=k, min_score=min_score)
+
     def get_signals_by_date(
         self,
         df: pd.DataFrame,
         trade_date: str,
         strategy_names: Optional[List[str]] = None,
         sort_by: str = 'total_score',
-        ascending: bool = False
+        ascending: bool = False,
+        top_n: Optional[int] = None,
+        ranking: Optional[SignalRanking] = None
     ) -> pd.DataFrame:
         """
         获取指定日期的信号股票
@@ -447,17 +1190,69 @@ class SignalEngine:
             strategy_names: 策略名称列表
             sort_by: 排序字段
             ascending: 是否升序
+            top_n: 返回数量，None 表示全部
+            ranking: rank_signals 构建的排名索引，按其得分降序取数时不再筛选和排序
 
         Returns:
             信号股票列表
         """
+        if ranking is not None and ranking.df is df and sort_by == ranking.score_col and not ascending:
+            return ranking.top(trade_date, top_n)
+
         day_df = df[df['trade_date'] == trade_date].copy()
         day_df = day_df[day_df['has_signal'] == True]
 
         if len(day_df) == 0:
             return pd.DataFrame()
 
-        return day_df.sort_values(sort_by, ascending=ascending)
+        day_df = day_df.sort_values(sort_by, ascending=ascending)
+        return day_df if top_n is None else day_df.head(top_n)
+
+    def iter_signals(
+        self,
+        bind,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        strategy_names: Optional[List[str]] = None,
+        min_score: float = 0.0,
+        top_n: Optional[int] = None,
+        pushdown: bool = False
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        逐个交易日流式生成信号，内存只保留一个交易日的数据
+
+        Args:
+            bind: 数据库引擎
+            start_date: 开始日期 (YYYYMMDD)，含
+            end_date: 结束日期 (YYYYMMDD)，含
+            strategy_names: 策略名称列表，None 表示全部
+            min_score: 最小综合得分
+            top_n: 每日最多返回的股票数，None 表示全部
+            pushdown: 策略条件下推到 SQL，只读取候选行（没有候选行的交易日不返回）
+
+        Yields:
+            (trade_date, 当日有信号的股票，按综合得分降序并带 rank 列)
+        """
+        from strategy.data_loader import iter_indicator_frames
+
+        sql_filter = self.compile_sql_filter(strategy_names) if pushdown else None
+        columns = self.required_columns(strategy_names)
+
+        # 时间序列条件需要每只股票自身之前若干行的数据（停牌日不计），随当日数据一起读取
+        lookback = self.max_lookback(strategy_names)
+
+        for trade_date, day_df, frame in iter_indicator_frames(bind, start_date, end_date, lookback,
+                                                               columns=columns, sql_filter=sql_filter):
+            result_df = self.detect_signals(frame, strategy_names)
+            if lookback:
+                result_df = result_df.iloc[len(frame) - len(day_df):]
+            result_df = result_df[result_df['has_signal'] & (result_df['total_score'] >= min_score)]
+            result_df = result_df.sort_values(['total_score', 'signal_count'], ascending=False, kind='stable')
+            if top_n is not None:
+                result_df = result_df.head(top_n)
+            result_df = result_df.reset_index(drop=True)
+            result_df.insert(0, 'rank', np.arange(1, len(result_df) + 1))
+            yield trade_date, result_df
 
     def create_custom_strategy(
         self,
@@ -471,22 +1266,15 @@ class SignalEngine:
 
         Args:
             name: 策略名称
-            conditions: 条件列表，格式: [{'factor': 'j_value', 'operator': '<', 'value': 0}]
+            conditions: 条件列表，格式: [{'factor': 'j_value', 'operator': '<', 'value': 0}]，
+                可选 kind / lag / window（见 FactorCondition）
             combine_mode: 组合模式
             description: 描述
 
         Returns:
             SignalStrategy 对象
         """
-        factor_conditions = []
-        for cond in conditions:
-            fc = FactorCondition(
-                factor=cond['factor'],
-                operator=cond['operator'],
-                value=cond['value'],
-                value_max=cond.get('value_max')
-            )
-            factor_conditions.append(fc)
+        factor_conditions = [FactorCondition.from_dict(cond) for cond in conditions]
 
         strategy = SignalStrategy(
             name=name,
@@ -503,29 +1291,41 @@ class SignalEngine:
 def run_signal_detection(
     start_date: str = '20240101',
     end_date: str = '20260424',
-    strategies: Optional[List[str]] = None
+    strategies: Optional[List[str]] = None,
+    use_cache: bool = False,
+    pushdown: bool = False
 ):
-    """运行信号检测"""
+    """
+    运行信号检测
+
+    pushdown 为 True 时将策略条件下推到 SQL，只读取可能产生信号的候选行
+    （结果只包含候选行；策略无法下推时回退到全量读取）。
+    """
     from app.core.database import get_db_context
-    from sqlalchemy import text
+    from strategy.data_loader import load_indicator_frame
 
     with get_db_context() as db:
-        # 加载指标数据
-        query = text("""
-            SELECT * FROM daily_indicator
-            WHERE trade_date >= :start_date
-              AND trade_date <= :end_date
-            ORDER BY ts_code, trade_date
-        """)
-        df = pd.read_sql(query, db.bind, params={'start_date': start_date, 'end_date': end_date})
-        logger.info(f"加载数据: {len(df)} 条")
-
         # 初始化信号引擎
         engine = SignalEngine()
 
+        sql_filter = None
+        if pushdown:
+            sql_filter = engine.compile_sql_filter(strategies)
+            if sql_filter is None:
+                logger.info("所选策略无法下推到 SQL，改为全量读取")
+
+        # 加载指标数据（只读取所选策略用到的列；时间序列条件需要每只股票更早的若干行历史）
+        lookback = engine.max_lookback(strategies)
+        df = load_indicator_frame(
+            db.get_bind(), start_date, end_date, columns=engine.required_columns(strategies),
+            use_cache=use_cache, sql_filter=sql_filter, lookback=lookback
+        )
+
         # 检测信号
         logger.info("检测信号...")
         result_df = engine.detect_signals(df, strategies)
+        if lookback:
+            result_df = result_df[result_df['trade_date'].astype(str) >= start_date]
 
         # 统计
         signal_count = result_df['has_signal'].sum()
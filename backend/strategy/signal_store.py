@@ -0,0 +1,359 @@
+"""
+每日信号物化
+将各策略每个交易日的信号与得分写入 daily_signal，回测与 API 直接读取预计算结果：
+
+    daily_signal        (trade_date, strategy, ts_code) -> is_signal, score
+    daily_signal_state  strategy -> strategy_hash, start_date, last_date
+
+增量物化只计算 last_date 之后的新交易日；策略定义变化（哈希不一致）时删除该策略的
+全部信号并从 start_date 重算。除触发信号的行外也保存得分非零的行，
+按任意策略组合读取时综合得分与 SignalEngine.detect_signals 一致。
+
+运行方式（backend 目录下）: python -m strategy.signal_store
+"""
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sqlalchemy import text
+
+from strategy.data_loader import iter_indicator_frames, iter_query_chunks
+from strategy.signal_engine import SignalEngine, SignalStrategy, signal_type_labels
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 每物化多少个交易日提交一次（同时推进 last_date）
+COMMIT_DAYS = 20
+
+# 每条 INSERT 语句的行数
+BATCH_ROWS = 1000
+
+
+def strategy_hash(strategy: SignalStrategy) -> str:
+    """策略定义哈希（见 SignalStrategy.content_hash）"""
+    return strategy.content_hash()
+
+
+# ============== 状态 ==============
+
+def load_signal_states(bind) -> Dict[str, Dict]:
+    """读取全部策略的物化状态 {策略名: {'strategy_hash', 'start_date', 'last_date', 'updated_at'}}"""
+    states = {}
+    for chunk in iter_query_chunks(
+        bind, "SELECT strategy, strategy_hash, start_date, last_date, updated_at FROM daily_signal_state"
+    ):
+        for row in chunk.to_dict('records'):
+            states[row.pop('strategy')] = row
+    return states
+
+
+def _save_states(conn, states: List[Dict]):
+    """写入/更新策略物化状态（不提交事务）"""
+    conn.execute(text("""
+        INSERT INTO daily_signal_state (strategy, strategy_hash, start_date, last_date, updated_at)
+        VALUES (:strategy, :strategy_hash, :start_date, :last_date, :updated_at)
+        ON DUPLICATE KEY UPDATE
+            strategy_hash=VALUES(strategy_hash), start_date=VALUES(start_date),
+            last_date=VALUES(last_date), updated_at=VALUES(updated_at)
+    """), states)
+
+
+def _write_signal_rows(conn, rows: List[tuple]):
+    """多行 INSERT ... ON DUPLICATE KEY UPDATE 写入信号 (trade_date, strategy, ts_code, is_signal, score)"""
+    row_placeholder = '(%s, %s, %s, %s, %s)'
+    for start in range(0, len(rows), BATCH_ROWS):
+        batch = rows[start:start + BATCH_ROWS]
+        sql = (
+            "INSERT INTO daily_signal (trade_date, strategy, ts_code, is_signal, score) VALUES "
+            + ', '.join([row_placeholder] * len(batch))
+            + " ON DUPLICATE KEY UPDATE is_signal=VALUES(is_signal), score=VALUES(score)"
+        )
+        conn.exec_driver_sql(sql, tuple(value for row in batch for value in row))
+
+
+def _delete_strategies(conn, names: List[str]):
+    """删除策略的全部信号与物化状态"""
+    for start in range(0, len(names), BATCH_ROWS):
+        batch = names[start:start + BATCH_ROWS]
+        placeholders = ', '.join(['%s'] * len(batch))
+        conn.exec_driver_sql(f"DELETE FROM daily_signal WHERE strategy IN ({placeholders})", tuple(batch))
+        conn.exec_driver_sql(f"DELETE FROM daily_signal_state WHERE strategy IN ({placeholders})", tuple(batch))
+
+
+# ============== 物化 ==============
+
+def materialize_signals(
+    bind,
+    strategy_names: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    full: bool = False,
+    engine: Optional[SignalEngine] = None
+) -> Dict:
+    """
+    增量物化策略信号
+
+    Args:
+        bind: 数据库引擎
+        strategy_names: 策略名称列表，None 表示全部
+        start_date: 重算策略的起始交易日期，None 表示沿用状态中的起始日期（没有则为全部历史）
+        full: 忽略状态，重算所选策略
+        engine: 信号引擎（含自定义策略），None 时使用内置策略
+
+    Returns:
+        {'strategies': 物化的策略数, 'rebuilt': 重算的策略数, 'days': 交易日数, 'rows': 写入行数}
+    """
+    engine = engine or SignalEngine()
+    if strategy_names is None:
+        strategy_names = list(engine.strategies.keys())
+    strategies = [engine.strategies[name] for name in strategy_names if name in engine.strategies]
+
+    states = load_signal_states(bind)
+    hashes = {s.name: strategy_hash(s) for s in strategies}
+
+    # since: 物化起始交易日期；after: 已物化到的交易日期（重算的策略为 None），只计算其后的交易日
+    rebuild = []
+    after: Dict[str, Optional[str]] = {}
+    since: Dict[str, Optional[str]] = {}
+    for strategy in strategies:
+        state = states.get(strategy.name)
+        if full or state is None or state['strategy_hash'] != hashes[strategy.name]:
+            if state is not None and not full:
+                logger.info(f"策略 {strategy.name} 定义已变化，重算全部信号")
+            rebuild.append(strategy.name)
+            since[strategy.name] = start_date or (state or {}).get('start_date')
+            after[strategy.name] = None
+        else:
+            since[strategy.name] = state['start_date']
+            after[strategy.name] = state['last_date']
+
+    # 所有策略共用一次逐日读取，从最早需要的交易日开始（None 表示全部历史）
+    read_from = [after[s.name] if after[s.name] is not None else since[s.name] for s in strategies]
+    read_start = None if None in read_from else min(read_from, default=None)
+
+    # 时间序列条件需要每只股票自身之前若干行的数据（停牌日不计），随当日数据一起读取
+    lookback = engine.max_lookback([s.name for s in strategies])
+
+    stats = {'strategies': len(strategies), 'rebuilt': len(rebuild), 'days': 0, 'rows': 0}
+    if not strategies:
+        return stats
+
+    columns = engine.required_columns([s.name for s in strategies])
+    last_done: Dict[str, str] = {}
+    pending_rows: List[tuple] = []
+    pending_days = 0
+    # 重算策略的旧信号与状态在写入第一批新结果的同一事务中删除，
+    # 中途失败或没有可计算的交易日时保留旧数据（状态哈希不一致，读取时仍回退实时计算）
+    pending_delete = set(rebuild)
+
+    def flush():
+        nonlocal pending_rows, pending_days
+        if not pending_days:
+            return
+        now = datetime.now()
+        with bind.begin() as conn:
+            replaced = [name for name in rebuild if name in pending_delete and name in last_done]
+            _delete_strategies(conn, replaced)
+            pending_delete.difference_update(replaced)
+            _write_signal_rows(conn, pending_rows)
+            _save_states(conn, [
+                {'strategy': name, 'strategy_hash': hashes[name], 'start_date': since[name],
+                 'last_date': last_date, 'updated_at': now}
+                for name, last_date in last_done.items()
+            ])
+        stats['rows'] += len(pending_rows)
+        pending_rows = []
+        pending_days = 0
+
+    for trade_date, day_df, frame in iter_indicator_frames(bind, read_start, lookback=lookback, columns=columns):
+        active = [
+            s for s in strategies
+            if (after[s.name] is None or trade_date > after[s.name])
+            and (since[s.name] is None or trade_date >= since[s.name])
+        ]
+        if not active:
+            continue
+
+        # 当日数据位于 frame 末尾
+        offset = len(frame) - len(day_df)
+        codes = day_df['ts_code'].to_numpy()
+        cache = engine.mask_cache.masks_for(frame)
+        for strategy in active:
+            signal, score = strategy.evaluate(frame, cache)
+            signal, score = signal[offset:], score[offset:]
+            keep = np.flatnonzero(signal | (score != 0))
+            pending_rows.extend(
+                (trade_date, strategy.name, code, bool(is_signal), float(value))
+                for code, is_signal, value in zip(codes[keep], signal[keep], score[keep])
+            )
+            last_done[strategy.name] = trade_date
+
+        stats['days'] += 1
+        pending_days += 1
+        if pending_days >= COMMIT_DAYS:
+            logger.info(f"信号物化进度: {trade_date}, 累计 {stats['days']} 个交易日")
+            flush()
+
+    flush()
+    logger.info(f"信号物化完成: {stats['strategies']} 个策略（重算 {stats['rebuilt']} 个）, "
+                f"{stats['days']} 个交易日, {stats['rows']} 行")
+    return stats
+
+
+# ============== 读取 ==============
+
+def _latest_indicator_date(bind) -> Optional[str]:
+    for chunk in iter_query_chunks(bind, "SELECT MAX(trade_date) AS trade_date FROM daily_indicator"):
+        if len(chunk):
+            return chunk['trade_date'].iloc[0]
+    return None
+
+
+def signals_up_to_date(
+    bind,
+    strategy_names: List[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    engine: Optional[SignalEngine] = None
+) -> bool:
+    """所选策略的物化信号是否覆盖 [start_date, end_date] 且与当前策略定义一致"""
+    engine = engine or SignalEngine()
+    states = load_signal_states(bind)
+
+    latest = _latest_indicator_date(bind)
+    if latest is None:
+        return False
+    need_until = min(end_date, latest) if end_date else latest
+
+    for name in strategy_names:
+        strategy = engine.strategies.get(name)
+        state = states.get(name)
+        if strategy is None or state is None or state['strategy_hash'] != strategy_hash(strategy):
+            return False
+        if state['last_date'] is None or state['last_date'] < need_until:
+            return False
+        if state['start_date'] is not None and (start_date is None or start_date < state['start_date']):
+            return False
+    return True
+
+
+def load_signal_frame(
+    bind,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    strategy_names: Optional[List[str]] = None,
+    engine: Optional[SignalEngine] = None
+) -> Optional[pd.DataFrame]:
+    """
+    从 daily_signal 读取有信号的 (股票, 交易日)，列与 SignalEngine.detect_signals 的信号列一致
+
+    Args:
+        bind: 数据库引擎
+        start_date: 开始日期 (YYYYMMDD)，含
+        end_date: 结束日期 (YYYYMMDD)，含
+        strategy_names: 策略名称列表，None 表示全部
+        engine: 信号引擎（含自定义策略），None 时使用内置策略
+
+    Returns:
+        按 (ts_code, trade_date) 升序的信号数据
+        (ts_code, trade_date, signal_*, score_*, has_signal, signal_count, total_score, signal_types)；
+        物化结果不完整或已过期时返回 None
+    """
+    engine = engine or SignalEngine()
+    if strategy_names is None:
+        strategy_names = list(engine.strategies.keys())
+    names = [name for name in strategy_names if name in engine.strategies]
+
+    if not signals_up_to_date(bind, names, start_date, end_date, engine):
+        return None
+
+    conditions = [f"strategy IN ({', '.join(['%s'] * len(names))})"] if names else ["FALSE"]
+    params = list(names)
+    if start_date:
+        conditions.append("trade_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("trade_date <= %s")
+        params.append(end_date)
+    sql = (f"SELECT ts_code, trade_date, strategy, is_signal, score FROM daily_signal "
+           f"WHERE {' AND '.join(conditions)}")
+
+    chunks = list(iter_query_chunks(bind, sql, tuple(params)))
+    rows = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(
+        columns=['ts_code', 'trade_date', 'strategy', 'is_signal', 'score'])
+    rows['is_signal'] = rows['is_signal'].astype(bool)
+
+    # 只保留至少一个策略触发信号的 (股票, 交易日)
+    fired = rows.loc[rows['is_signal'], ['ts_code', 'trade_date']].drop_duplicates()
+    rows = rows.merge(fired, on=['ts_code', 'trade_date'])
+
+    keys = fired.sort_values(['ts_code', 'trade_date']).reset_index(drop=True)
+    signal_wide = rows.assign(is_signal=rows['is_signal'].astype(np.int8)).pivot(
+        index=['ts_code', 'trade_date'], columns='strategy', values='is_signal')
+    score_wide = rows.pivot(index=['ts_code', 'trade_date'], columns='strategy', values='score')
+    index = pd.MultiIndex.from_frame(keys)
+    signals = signal_wide.reindex(index=index, columns=names).fillna(0).to_numpy() > 0
+    scores = score_wide.reindex(index=index, columns=names).fillna(0.0).to_numpy(dtype=np.float64)
+
+    columns = {'ts_code': keys['ts_code'].to_numpy(), 'trade_date': keys['trade_date'].to_numpy()}
+    for i, name in enumerate(names):
+        columns[f'signal_{name}'] = signals[:, i]
+        columns[f'score_{name}'] = scores[:, i]
+    columns['has_signal'] = signals.any(axis=1)
+    columns['signal_count'] = signals.sum(axis=1)
+    columns['total_score'] = scores.sum(axis=1)
+    columns['signal_types'] = signal_type_labels(signals, names)
+
+    result_df = pd.DataFrame(columns)
+    logger.info(f"从信号表读取: {len(result_df)} 条信号")
+    return result_df
+
+
+def load_day_signals(
+    bind,
+    trade_date: str,
+    strategy_names: Optional[List[str]] = None,
+    min_score: float = 0.0,
+    top_n: Optional[int] = None,
+    engine: Optional[SignalEngine] = None
+) -> Optional[pd.DataFrame]:
+    """
+    读取指定交易日的物化信号，按综合得分降序并带 rank 列（与 SignalEngine.iter_signals 一致）
+
+    Returns:
+        当日信号；物化结果不完整或已过期时返回 None
+    """
+    result_df = load_signal_frame(bind, trade_date, trade_date, strategy_names, engine)
+    if result_df is None:
+        return None
+    result_df = result_df[result_df['total_score'] >= min_score]
+    result_df = result_df.sort_values(['total_score', 'signal_count'], ascending=False, kind='stable')
+    if top_n is not None:
+        result_df = result_df.head(top_n)
+    result_df = result_df.reset_index(drop=True)
+    result_df.insert(0, 'rank', np.arange(1, len(result_df) + 1))
+    return result_df
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from app.core.logging import setup_logging
+
+    load_dotenv(os.path.join(BACKEND_DIR, '.env'))
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description='每日信号物化')
+    parser.add_argument('--full', action='store_true', help='忽略物化状态，重算所选策略')
+    parser.add_argument('--start-date', type=str, default=None, help='重算的起始交易日期 (YYYYMMDD)')
+    parser.add_argument('--strategies', type=str, default=None, help='策略名称，逗号分隔（默认全部）')
+    args = parser.parse_args()
+
+    from app.core.database import engine as db_engine
+    from strategy.strategy_store import get_signal_engine
+    names = args.strategies.split(',') if args.strategies else None
+    result = materialize_signals(db_engine, strategy_names=names, start_date=args.start_date,
+                                 full=args.full, engine=get_signal_engine())
+    print(f"策略: {result['strategies']} (重算 {result['rebuilt']}), 交易日: {result['days']}, 写入: {result['rows']} 行")
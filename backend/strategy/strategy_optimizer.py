@@ -20,7 +20,8 @@ from datetime import datetime
 
 from app.core.database import get_db_context
 from strategy.signal_engine import SignalEngine, SignalStrategy, FactorCondition
-from strategy.backtest_engine import BacktestEngine, BacktestConfig
+from strategy.backtest_engine import BacktestConfig
+from strategy.sweep_runner import run_sweep
 
 
 def run_strategy_optimization():
@@ -115,54 +116,30 @@ def run_strategy_optimization():
     start_date = '20240101'
     end_date = '20260424'
 
-    results = []
-
+    # 数据只加载一次、信号只计算一次，策略组合 × 配置并行回测
     with get_db_context() as db:
-        total_tests = len(strategy_combinations) * len(configs)
-        test_count = 0
-
-        for config_idx, config in enumerate(configs):
-            logger.info(f"\n测试配置 {config_idx + 1}: 持仓{config.max_positions}只, 止损{config.stop_loss_pct:.0%}, 止盈{config.take_profit_pct:.0%}")
-
-            for strategies in strategy_combinations:
-                test_count += 1
-
-                try:
-                    engine = BacktestEngine(config)
-                    performance = engine.run_backtest(
-                        db, start_date, end_date,
-                        strategy_names=strategies,
-                        min_score=0.3
-                    )
-
-                    if performance and performance.get('total_trades', 0) > 0:
-                        result = {
-                            'strategies': '|'.join(strategies),
-                            'config': f"持仓{config.max_positions}_止损{config.stop_loss_pct:.0%}_止盈{config.take_profit_pct:.0%}",
-                            'max_positions': config.max_positions,
-                            'stop_loss': config.stop_loss_pct,
-                            'take_profit': config.take_profit_pct,
-                            'max_hold_days': config.max_hold_days,
-                            'total_return': performance['total_return'],
-                            'annual_return': performance['annual_return'],
-                            'max_drawdown': performance['max_drawdown'],
-                            'sharpe_ratio': performance['sharpe_ratio'],
-                            'win_rate': performance['win_rate'],
-                            'total_trades': performance['total_trades'],
-                            'avg_profit_pct': performance['avg_profit_pct'],
-                            'final_value': performance['final_value'],
-                        }
-                        results.append(result)
-
-                        logger.info(
-                            f"[{test_count}/{total_tests}] {strategies}: "
-                            f"收益={performance['total_return']:.2%}, "
-                            f"胜率={performance['win_rate']:.2%}, "
-                            f"回撤={performance['max_drawdown']:.2%}"
-                        )
-
-                except Exception as e:
-                    logger.error(f"[{test_count}/{total_tests}] {strategies} 失败: {e}")
+        sweep_df = run_sweep(db, start_date, end_date, strategy_combinations, configs, min_score=0.3)
+
+    results = []
+    for _, performance in sweep_df.iterrows():
+        if performance['total_trades'] <= 0:
+            continue
+        results.append({
+            'strategies': performance['strategies'],
+            'config': f"持仓{performance['max_positions']}_止损{performance['stop_loss_pct']:.0%}_止盈{performance['take_profit_pct']:.0%}",
+            'max_positions': performance['max_positions'],
+            'stop_loss': performance['stop_loss_pct'],
+            'take_profit': performance['take_profit_pct'],
+            'max_hold_days': performance['max_hold_days'],
+            'total_return': performance['total_return'],
+            'annual_return': performance['annual_return'],
+            'max_drawdown': performance['max_drawdown'],
+            'sharpe_ratio': performance['sharpe_ratio'],
+            'win_rate': performance['win_rate'],
+            'total_trades': performance['total_trades'],
+            'avg_profit_pct': performance['avg_profit_pct'],
+            'final_value': performance['final_value'],
+        })
 
     # 分析结果
     if len(results) == 0:
@@ -0,0 +1,244 @@
+"""
+策略定义存储
+策略以 JSON / YAML 文件保存在 strategy/strategies/ 目录，加载到 SignalEngine 并按内容哈希热更新：
+
+    {"strategies": [{"name": "custom_j_rsi_vol", "conditions": [{"factor": "j_value", "operator": "<", "value": -10}, ...]}]}
+
+文件格式见 SignalStrategy.to_dict（也可以是单个策略字典或策略列表）。
+条件掩码按条件标识缓存、物化信号按策略哈希失效，修改策略后只重算定义变化的部分。
+
+运行方式（backend 目录下）: python -m strategy.strategy_store      # 校验并列出目录中的策略
+"""
+import os
+import json
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from strategy.signal_engine import SignalEngine, SignalStrategy
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 策略定义目录
+STRATEGY_DIR = os.path.join(BACKEND_DIR, 'strategy', 'strategies')
+
+# 支持的文件扩展名
+STRATEGY_FILE_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+
+# ============== 文件读写 ==============
+
+def _load_yaml():
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("读取 YAML 策略文件需要安装 PyYAML（pip install pyyaml）")
+    return yaml
+
+
+def load_strategy_file(path: str) -> List[SignalStrategy]:
+    """
+    读取策略文件
+
+    Args:
+        path: JSON / YAML 文件路径
+
+    Returns:
+        文件中的策略列表
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            data = json.load(f)
+        else:
+            data = _load_yaml().safe_load(f)
+
+    if isinstance(data, dict):
+        items = data['strategies'] if 'strategies' in data else [data]
+    elif isinstance(data, list):
+        items = data
+    else:
+        raise ValueError(f"策略文件格式错误: {path}")
+
+    strategies = [SignalStrategy.from_dict(item) for item in items]
+    names = [strategy.name for strategy in strategies]
+    if len(names) != len(set(names)):
+        raise ValueError(f"策略文件中存在重名策略: {path}")
+    return strategies
+
+
+def save_strategy_file(strategies: List[SignalStrategy], path: str):
+    """将策略写入 JSON / YAML 文件（按扩展名）"""
+    data = {'strategies': [strategy.to_dict() for strategy in strategies]}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        else:
+            _load_yaml().safe_dump(data, f, allow_unicode=True, sort_keys=False)
+
+
+def load_strategies(name: Optional[str] = None, directory: Optional[str] = None) -> List[SignalStrategy]:
+    """
+    读取策略目录下的策略
+
+    Args:
+        name: 文件名（可省略扩展名，如 'short_term'），None 表示目录下全部文件
+        directory: 策略目录，默认 STRATEGY_DIR
+    """
+    directory = directory or STRATEGY_DIR
+    if name is None:
+        return [strategy for path in _strategy_files(directory) for strategy in load_strategy_file(path)]
+
+    for ext in ('',) + STRATEGY_FILE_EXTENSIONS:
+        path = os.path.join(directory, name + ext)
+        if os.path.isfile(path):
+            return load_strategy_file(path)
+    raise FileNotFoundError(f"策略文件不存在: {os.path.join(directory, name)}")
+
+
+def _strategy_files(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(STRATEGY_FILE_EXTENSIONS)
+    )
+
+
+# ============== 热加载 ==============
+
+class StrategyStore:
+    """
+    将策略目录加载到信号引擎，refresh 时按文件修改时间重新读取、按内容哈希判断策略是否变化
+
+    文件中删除的策略从引擎移除；与内置策略重名的策略覆盖内置策略，移除后恢复内置策略。
+    读取失败的文件保留上一次加载的策略。
+    """
+
+    def __init__(self, engine: Optional[SignalEngine] = None, directory: Optional[str] = None):
+        self.engine = engine if engine is not None else SignalEngine()
+        self.directory = directory or STRATEGY_DIR
+        self._mtimes: Dict[str, float] = {}           # 文件 -> 修改时间
+        self._owners: Dict[str, str] = {}             # 策略名 -> 所在文件
+        self._hashes: Dict[str, str] = {}             # 策略名 -> 内容哈希
+        self._shadowed: Dict[str, SignalStrategy] = {}  # 被覆盖的内置策略
+
+    def _remove(self, name: str):
+        self._owners.pop(name, None)
+        self._hashes.pop(name, None)
+        if name in self._shadowed:
+            self.engine.register_strategy(self._shadowed.pop(name))
+        else:
+            self.engine.strategies.pop(name, None)
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """
+        重新加载有变化的策略文件
+
+        先读取全部有变化的文件，按新内容重建策略归属，再统一移除和注册（策略在文件间移动时不会丢失）。
+        同名策略优先归属原文件，其余按文件名顺序；定义被忽略的文件不记录修改时间，下次刷新重新读取。
+
+        Returns:
+            {'added': 新增策略, 'updated': 定义变化的策略, 'removed': 移除的策略}
+        """
+        changes = {'added': [], 'updated': [], 'removed': []}
+        files = {path: os.path.getmtime(path) for path in _strategy_files(self.directory)}
+
+        # 读取有变化的文件
+        parsed: Dict[str, List[SignalStrategy]] = {}
+        for path, mtime in files.items():
+            if self._mtimes.get(path) == mtime:
+                continue
+            try:
+                parsed[path] = load_strategy_file(path)
+            except (OSError, ValueError, KeyError, TypeError, ImportError, AttributeError) as e:
+                logger.error(f"加载策略文件失败 {path}: {e}")
+
+        # 未重新读取的文件（未变化或读取失败）保留原有策略
+        owners: Dict[str, str] = {
+            name: owner for name, owner in self._owners.items() if owner in files and owner not in parsed
+        }
+        definitions: Dict[str, SignalStrategy] = {}
+        skipped = set()
+
+        # 原归属文件中仍有定义的策略保持归属，其余按文件名顺序归属第一个定义的文件
+        for keep_owner in (True, False):
+            for path, strategies in parsed.items():
+                for strategy in strategies:
+                    if (self._owners.get(strategy.name) == path) != keep_owner:
+                        continue
+                    owner = owners.get(strategy.name)
+                    if owner is not None and owner != path:
+                        logger.warning(f"策略 {strategy.name} 已在 {owner} 中定义，忽略 {path} 中的定义")
+                        skipped.add(path)
+                        continue
+                    owners[strategy.name] = path
+                    definitions[strategy.name] = strategy
+
+        # 不再有定义的策略
+        for name in [name for name in self._owners if name not in owners]:
+            self._remove(name)
+            changes['removed'].append(name)
+
+        for name, strategy in definitions.items():
+            content_hash = strategy.content_hash()
+            if name not in self._hashes:
+                changes['added'].append(name)
+                existing = self.engine.get_strategy(name)
+                if existing is not None:
+                    self._shadowed[name] = existing
+            elif self._hashes[name] != content_hash:
+                changes['updated'].append(name)
+            self.engine.register_strategy(strategy)
+            self._hashes[name] = content_hash
+        self._owners = owners
+
+        # 记录已完整加载的文件
+        for path in list(self._mtimes):
+            if path not in files or path in skipped:
+                del self._mtimes[path]
+        for path in parsed:
+            if path not in skipped:
+                self._mtimes[path] = files[path]
+
+        if any(changes.values()):
+            logger.info(f"策略已更新: 新增 {changes['added']}, 变化 {changes['updated']}, 移除 {changes['removed']}")
+        return changes
+
+    def strategy_names(self) -> List[str]:
+        """从文件加载的策略名称"""
+        return list(self._owners.keys())
+
+
+# 默认策略存储（内置策略 + 策略目录），供定时任务与 API 共用
+_default_store: Optional[StrategyStore] = None
+
+
+def get_signal_engine(refresh: bool = True) -> SignalEngine:
+    """
+    获取包含内置策略与策略目录中策略的信号引擎（进程内共享）
+
+    Args:
+        refresh: 先检查策略文件是否有变化并热加载
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = StrategyStore()
+        refresh = True
+    if refresh:
+        _default_store.refresh()
+    return _default_store.engine
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='校验并列出策略定义文件')
+    parser.add_argument('--dir', type=str, default=None, help='策略目录')
+    args = parser.parse_args()
+
+    store = StrategyStore(directory=args.dir)
+    store.refresh()
+    for strategy_name in store.strategy_names():
+        strategy = store.engine.get_strategy(strategy_name)
+        print(f"{strategy_name:<24}{strategy.content_hash()[:12]}  {strategy.description}")
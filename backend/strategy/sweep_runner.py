@@ -0,0 +1,294 @@
+"""
+参数寻优批量回测
+指标与价格数据只加载一次、所有策略的信号只计算一次，再将 (策略组合, BacktestConfig) 分发到进程池，
+用数组化回测（strategy.vector_backtest）逐个模拟，汇总为一张结果表。
+
+共享数据（价格矩阵、候选行的各策略信号与得分）以 .npy 写入临时目录，worker 进程以内存映射只读打开，
+不复制数据也不重新加载。结果与逐个 BacktestEngine(config).run_backtest(strategy_names=组合) 相同。
+
+运行方式（backend 目录下）:
+    python -m strategy.sweep_runner --strategies "kdj_oversold;kdj_oversold,rsi_oversold" --workers 4
+"""
+import os
+import json
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from strategy.backtest_engine import (
+    BacktestConfig, BacktestEngine, PriceIndex, calculate_performance, execution_bars, get_execution_model
+)
+from strategy.signal_engine import SignalEngine
+from strategy.vector_backtest import label_positions, order_candidates, result_frames, simulate
+
+# 结果表中的绩效指标
+METRIC_COLUMNS = [
+    'total_return', 'annual_return', 'max_drawdown', 'sharpe_ratio', 'win_rate',
+    'total_trades', 'buy_count', 'sell_count', 'avg_profit', 'avg_profit_pct', 'total_profit', 'final_value',
+]
+
+# 共享数组文件
+SWEEP_ARRAYS = ('close', 'open', 'high', 'low', 'pct_chg', 'present',
+                'cand_date', 'cand_stock', 'cand_row', 'cand_priced', 'signals', 'scores')
+META_FILE = 'meta.json'
+
+
+# ============== 共享数据 ==============
+
+def prepare_sweep_data(
+    signal_engine: SignalEngine,
+    indicator_df: pd.DataFrame,
+    price_df: pd.DataFrame,
+    strategy_names: List[str]
+) -> Dict:
+    """
+    计算所有策略的信号与得分，只保留至少一个策略有信号且交易日、股票在价格数据中的行
+
+    Returns:
+        {'close', 'open', 'high', 'low', 'pct_chg', 'present': [n_dates, n_stocks] 价格矩阵,
+         'cand_date', 'cand_stock', 'cand_row', 'cand_priced': 候选行的交易日/股票位置、行号与信号日是否有价格,
+         'signals', 'scores': [候选行数, 策略数] 各策略信号与得分,
+         'strategies', 'dates', 'codes': 策略名称、交易日、股票代码}
+    """
+    prices = PriceIndex(price_df)
+    cache = signal_engine.mask_cache.masks_for(indicator_df)
+
+    names, signals, scores = [], [], []
+    for name in strategy_names:
+        strategy = signal_engine.get_strategy(name)
+        if strategy is None:
+            logger.warning(f"策略 {name} 不存在，跳过")
+            continue
+        signal, score = strategy.evaluate(indicator_df, cache)
+        names.append(name)
+        signals.append(signal)
+        scores.append(score)
+
+    n_rows = len(indicator_df)
+    signals = np.column_stack(signals) if signals else np.zeros((n_rows, 0), dtype=bool)
+    scores = np.column_stack(scores).astype(np.float64) if scores else np.zeros((n_rows, 0))
+
+    rows = np.flatnonzero(signals.any(axis=1))
+    date_idx = label_positions(indicator_df['trade_date'].iloc[rows], prices.dates)
+    stock_idx = label_positions(indicator_df['ts_code'].iloc[rows], prices.codes)
+    valid = (date_idx >= 0) & (stock_idx >= 0)
+    rows, date_idx, stock_idx = rows[valid], date_idx[valid], stock_idx[valid]
+
+    arrays = prices.arrays()
+    nan = np.full(prices.present.shape, np.nan)
+    return {
+        **{field: arrays.get(field, nan).astype(np.float64, copy=False)
+           for field in ('close', 'open', 'high', 'low', 'pct_chg')},
+        'present': prices.present,
+        'cand_date': date_idx.astype(np.int64),
+        'cand_stock': stock_idx.astype(np.int64),
+        'cand_row': rows.astype(np.int64),
+        'cand_priced': prices.present[date_idx, stock_idx],
+        'signals': np.ascontiguousarray(signals[rows]),
+        'scores': np.ascontiguousarray(scores[rows]),
+        'strategies': names,
+        'dates': prices.dates,
+        'codes': prices.codes,
+    }
+
+
+def save_sweep_data(data: Dict, data_dir: str):
+    """将共享数据写入目录（.npy + meta.json）"""
+    os.makedirs(data_dir, exist_ok=True)
+    for name in SWEEP_ARRAYS:
+        np.save(os.path.join(data_dir, f'{name}.npy'), data[name])
+    with open(os.path.join(data_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({key: data[key] for key in ('strategies', 'dates', 'codes')}, f)
+
+
+def load_sweep_data(data_dir: str) -> Dict:
+    """以内存映射只读打开共享数据"""
+    data = {name: np.load(os.path.join(data_dir, f'{name}.npy'), mmap_mode='r') for name in SWEEP_ARRAYS}
+    with open(os.path.join(data_dir, META_FILE), 'r', encoding='utf-8') as f:
+        data.update(json.load(f))
+    return data
+
+
+# ============== 单次模拟 ==============
+
+def simulate_combination(
+    data: Dict,
+    strategies: List[str],
+    config: BacktestConfig,
+    min_score: float = 0.3,
+    jit: bool = True
+) -> Dict:
+    """
+    用共享数据回测一个 (策略组合, 配置)
+
+    综合信号与得分的计算方式与 detect_signals 相同（按组合内策略顺序求和），成交模型取 config.execution，
+    结果与逐个回测一致。
+
+    Returns:
+        绩效指标（METRIC_COLUMNS）
+    """
+    columns = [data['strategies'].index(name) for name in strategies if name in data['strategies']]
+    signals = data['signals'][:, columns]
+    total_score = data['scores'][:, columns].sum(axis=1)
+    keep = signals.any(axis=1) & (total_score >= min_score)
+    model = get_execution_model(config.execution)
+    if model.entry == 'close':
+        keep &= data['cand_priced']
+    keep = np.flatnonzero(keep)
+
+    cand_offsets, cand_stocks, _ = order_candidates(
+        data['cand_date'][keep], data['cand_stock'][keep], data['cand_row'][keep], total_score[keep],
+        len(data['dates'])
+    )
+    bars = execution_bars(data, model)
+    result = simulate(bars, data['present'], cand_offsets, cand_stocks, config, jit)
+    values_df, trades_df = result_frames(result, data['dates'], data['codes'])
+    performance = calculate_performance(values_df, trades_df, config.initial_capital)
+    return {key: performance.get(key, 0) for key in METRIC_COLUMNS}
+
+
+# 每个 worker 进程内存映射打开的共享数据（由 _init_worker 初始化）
+_worker_data: Optional[Dict] = None
+
+
+def _init_worker(data_dir: str):
+    """进程池初始化：内存映射打开共享数据"""
+    global _worker_data
+    _worker_data = load_sweep_data(data_dir)
+
+
+def _run_task(strategies: List[str], config: BacktestConfig, min_score: float, jit: bool) -> Dict:
+    """worker 进程：回测一个 (策略组合, 配置)"""
+    return simulate_combination(_worker_data, strategies, config, min_score, jit)
+
+
+# ============== 批量回测 ==============
+
+def run_sweep(
+    db,
+    start_date: str,
+    end_date: str,
+    strategy_sets: List[List[str]],
+    configs: List[BacktestConfig],
+    min_score: float = 0.3,
+    workers: Optional[int] = None,
+    engine: Optional[BacktestEngine] = None,
+    jit: bool = True,
+    data_context=None
+) -> pd.DataFrame:
+    """
+    批量回测 策略组合 × 回测配置
+
+    Args:
+        db: 数据库会话
+        start_date: 开始日期
+        end_date: 结束日期
+        strategy_sets: 策略组合列表
+        configs: 回测配置列表
+        min_score: 最小信号得分
+        workers: 进程数，None 为 CPU 核数，1 表示在当前进程中运行
+        engine: 用于加载数据与检测信号的回测引擎（可带缓存 / 面板存储 / 自定义策略），默认 BacktestEngine()
+        jit: 可用时以 numba 编译逐日循环
+        data_context: 回测数据上下文 (MarketDataContext)，提供时从上下文读取数据而不经过 engine.load_data
+
+    Returns:
+        每个 (配置, 策略组合) 一行：strategies、config_index、配置字段与绩效指标，按配置、组合顺序排列
+    """
+    engine = engine or BacktestEngine()
+    signal_engine = engine.signal_engine
+    union = list(dict.fromkeys(name for strategies in strategy_sets for name in strategies))
+
+    # 一次加载所有策略需要的指标列（回看取各策略最大值）与价格数据
+    start_time = datetime.now()
+    columns, lookback = signal_engine.required_columns(union), signal_engine.max_lookback(union)
+    if data_context is not None:
+        indicator_df, price_df = data_context.frames(db, start_date, end_date, columns, lookback)
+    else:
+        indicator_df, price_df = engine.load_data(db, start_date, end_date, columns, None, lookback)
+    data = prepare_sweep_data(signal_engine, indicator_df, price_df, union)
+    del indicator_df, price_df
+    logger.info(f"数据准备完成: {len(union)} 个策略, {len(data['cand_row']):,} 个候选行, "
+                f"{len(data['dates'])} 个交易日, 耗时 {(datetime.now() - start_time).total_seconds():.1f} 秒")
+
+    tasks: List[Tuple[int, List[str], BacktestConfig]] = [
+        (config_idx, strategies, config)
+        for config_idx, config in enumerate(configs)
+        for strategies in strategy_sets
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) if tasks else 1
+    results: Dict[int, Dict] = {}
+
+    def collect(task_idx: int, metrics: Dict):
+        config_idx, strategies, config = tasks[task_idx]
+        results[task_idx] = {'strategies': '|'.join(strategies), 'config_index': config_idx,
+                             **asdict(config), **metrics}
+        logger.info(f"[{len(results)}/{len(tasks)}] {strategies}: 收益={metrics['total_return']:.2%}, "
+                    f"胜率={metrics['win_rate']:.2%}, 回撤={metrics['max_drawdown']:.2%}")
+
+    if workers <= 1:
+        for task_idx, (_, strategies, config) in enumerate(tasks):
+            try:
+                collect(task_idx, simulate_combination(data, strategies, config, min_score, jit))
+            except Exception as e:
+                logger.error(f"[{task_idx + 1}/{len(tasks)}] {strategies} 失败: {e}")
+    else:
+        data_dir = tempfile.mkdtemp(prefix='sweep_')
+        try:
+            save_sweep_data(data, data_dir)
+            del data
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_dir,)) as executor:
+                futures = {
+                    executor.submit(_run_task, strategies, config, min_score, jit): task_idx
+                    for task_idx, (_, strategies, config) in enumerate(tasks)
+                }
+                for future in as_completed(futures):
+                    task_idx = futures[future]
+                    try:
+                        collect(task_idx, future.result())
+                    except Exception as e:
+                        logger.error(f"[{task_idx + 1}/{len(tasks)}] {tasks[task_idx][1]} 失败: {e}")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    logger.info(f"批量回测完成: {len(results)}/{len(tasks)} 组, "
+                f"总耗时 {(datetime.now() - start_time).total_seconds():.1f} 秒")
+    return pd.DataFrame([results[task_idx] for task_idx in sorted(results)])
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from app.core.logging import setup_logging
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    load_dotenv(os.path.join(backend_dir, '.env'))
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description='参数寻优批量回测')
+    parser.add_argument('--start-date', type=str, default='20240101', help='开始日期 (YYYYMMDD)')
+    parser.add_argument('--end-date', type=str, default='20260424', help='结束日期 (YYYYMMDD)')
+    parser.add_argument('--strategies', type=str, required=True,
+                        help='策略组合，组合间用分号、组合内用逗号分隔，如 "kdj_oversold;kdj_oversold,rsi_oversold"')
+    parser.add_argument('--min-score', type=float, default=0.3, help='最小信号得分')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--output', type=str, default=None, help='结果 CSV 路径')
+    args = parser.parse_args()
+
+    from app.core.database import get_db_context
+
+    sets = [[name.strip() for name in group.split(',') if name.strip()] for group in args.strategies.split(';')]
+    with get_db_context() as db:
+        sweep_df = run_sweep(db, args.start_date, args.end_date, [s for s in sets if s], [BacktestConfig()],
+                             min_score=args.min_score, workers=args.workers)
+
+    print(sweep_df[['strategies'] + METRIC_COLUMNS].to_string(index=False))
+    if args.output:
+        sweep_df.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"结果已保存: {args.output}")
@@ -14,8 +14,9 @@ from loguru import logger
 from datetime import datetime
 
 from app.core.database import get_db_context
-from strategy.signal_engine import SignalEngine, SignalStrategy, SignalType, FactorCondition
+from strategy.strategy_store import load_strategies
 from strategy.backtest_engine import BacktestEngine, BacktestConfig
+from strategy.market_context import MarketDataContext
 
 
 def test_custom_strategy():
@@ -24,18 +25,8 @@ def test_custom_strategy():
     logger.info("测试自定义策略: J<-10 + RSI<15 + 量比>1")
     logger.info("=" * 80)
 
-    # 创建自定义策略
-    custom_strategy = SignalStrategy(
-        name='custom_j_rsi_vol',
-        signal_type=SignalType.CUSTOM,
-        conditions=[
-            FactorCondition('j_value', '<', -10),      # J值 < -10
-            FactorCondition('rsi6', '<', 15),          # RSI6 < 15
-            FactorCondition('vol_ratio', '>', 1.0),    # 量比 > 1
-        ],
-        combine_mode='and',
-        description='自定义策略: J<-10 + RSI<15 + 量比>1'
-    )
+    # 自定义策略定义见 strategy/strategies/short_term.json
+    custom_strategy = next(s for s in load_strategies('short_term') if s.name == 'custom_j_rsi_vol')
 
     # 回测配置
     config = BacktestConfig(
@@ -53,6 +44,9 @@ def test_custom_strategy():
     start_date = '20240101'
     end_date = '20260424'
 
+    # 指标与价格数据只加载一次，各次回测共用
+    context = MarketDataContext(start_date, end_date)
+
     with get_db_context() as db:
         engine = BacktestEngine(config)
 
@@ -63,7 +57,8 @@ def test_custom_strategy():
         performance = engine.run_backtest(
             db, start_date, end_date,
             strategy_names=['custom_j_rsi_vol'],
-            min_score=0.3
+            min_score=0.3,
+            data_context=context
         )
 
         # 打印绩效
@@ -79,7 +74,8 @@ def test_custom_strategy():
         perf_baseline = engine2.run_backtest(
             db, start_date, end_date,
             strategy_names=['oversold_reversal'],
-            min_score=0.3
+            min_score=0.3,
+            data_context=context
         )
 
         print("\n【对比结果】")
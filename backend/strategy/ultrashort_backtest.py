@@ -16,8 +16,10 @@ from loguru import logger
 from datetime import datetime
 
 from app.core.database import get_db_context
-from strategy.signal_engine import SignalEngine, SignalStrategy, SignalType, FactorCondition
+from strategy.signal_engine import SignalEngine
+from strategy.strategy_store import load_strategies
 from strategy.backtest_engine import BacktestEngine, BacktestConfig
+from strategy.market_context import MarketDataContext
 
 
 def run_ultrashort_backtest():
@@ -28,24 +30,8 @@ def run_ultrashort_backtest():
 
     # 测试两个策略
     strategies_to_test = [
-        {
-            'name': 'oversold_reversal',
-            'conditions': [
-                FactorCondition('j_value', '<', -10),
-                FactorCondition('macd_hist', '>', 0),
-                FactorCondition('vol_ratio', '>', 1.0),
-            ],
-            'description': 'J<-10 + MACD金叉 + 放量'
-        },
-        {
-            'name': 'custom_j_rsi_vol',
-            'conditions': [
-                FactorCondition('j_value', '<', -10),
-                FactorCondition('rsi6', '<', 15),
-                FactorCondition('vol_ratio', '>', 1.0),
-            ],
-            'description': 'J<-10 + RSI<15 + 放量'
-        }
+        SignalEngine().get_strategy('oversold_reversal'),   # J<-10 + MACD金叉 + 放量
+        *load_strategies('short_term'),                     # J<-10 + RSI<15 + 放量
     ]
 
     # 超短线配置组
@@ -93,36 +79,31 @@ def run_ultrashort_backtest():
     start_date = '20240101'
     end_date = '20260424'
 
+    # 指标与价格数据只加载一次，各次回测共用
+    context = MarketDataContext(start_date, end_date)
+
     results = []
 
     with get_db_context() as db:
         for strat in strategies_to_test:
-            logger.info(f"\n测试策略: {strat['name']}")
+            logger.info(f"\n测试策略: {strat.name}")
 
             for config_idx, config in enumerate(ultra_short_configs):
                 logger.info(f"  配置: {config_names[config_idx]}")
 
-                # 创建策略
-                custom_strategy = SignalStrategy(
-                    name=strat['name'],
-                    signal_type=SignalType.CUSTOM,
-                    conditions=strat['conditions'],
-                    combine_mode='and',
-                    description=strat['description']
-                )
-
                 engine = BacktestEngine(config)
-                engine.signal_engine.register_strategy(custom_strategy)
+                engine.signal_engine.register_strategy(strat)
 
                 # 运行回测
                 performance = engine.run_backtest(
                     db, start_date, end_date,
-                    strategy_names=[strat['name']],
-                    min_score=0.3
+                    strategy_names=[strat.name],
+                    min_score=0.3,
+                    data_context=context
                 )
 
                 results.append({
-                    'strategy': strat['name'],
+                    'strategy': strat.name,
                     'config': config_names[config_idx],
                     'max_hold_days': config.max_hold_days,
                     'stop_loss': config.stop_loss_pct,
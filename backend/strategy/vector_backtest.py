@@ -0,0 +1,442 @@
+"""
+数组化组合回测
+与 BacktestEngine 逐日循环相同的 BacktestConfig 语义（最大持仓数、仓位比例、止损/止盈、最大持仓天数、
+佣金/印花税/滑点、100 股一手、成交模型），持仓与交易记录保存在 NumPy 数组中，逐日内层循环可用 numba 编译。
+开高低价与涨跌停标记由 execution_bars 一次性向量化计算，循环内只按位置读取。
+
+输入为已检测信号的数据与 PriceIndex，结果与 BacktestEngine.run_backtest 相同：
+    engine = BacktestEngine(config, vectorized=True)
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from strategy.backtest_engine import (
+    BacktestConfig, PriceIndex, calculate_performance, execution_bars, get_execution_model
+)
+
+# 交易类型编码
+TRADE_BUY = 0
+TRADE_SELL = 1        # 止损/止盈/到期
+TRADE_SELL_END = 2    # 回测结束清算
+
+SELL_REASONS = {TRADE_SELL: "止损/止盈/到期", TRADE_SELL_END: "回测结束"}
+
+
+# ============== 候选股票 ==============
+
+def label_positions(values: pd.Series, labels) -> np.ndarray:
+    """values 中各值在 labels 中的位置（不存在为 -1），只对去重后的值做字符串转换与查找"""
+    codes, uniques = pd.factorize(values)
+    lookup = pd.Index(labels).get_indexer(np.asarray(uniques).astype(str))
+    return np.where(codes >= 0, lookup[codes], -1)
+
+
+def build_candidates(
+    signal_df: pd.DataFrame,
+    prices: PriceIndex,
+    min_score: float = 0.5,
+    require_price: bool = True
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    每日买入候选：有信号且得分不低于 min_score、当日有价格的行，按 (交易日, -综合得分, 原行顺序) 排列
+
+    与 SignalRanking 的排序一致；当日无价格的行在逐日循环中也会被跳过，这里直接去掉
+    （次日开盘买入时 require_price 为 False，是否有价格在成交日判断）。
+
+    Returns:
+        (offsets[n_dates + 1], 股票位置, signal_df 中的行位置)，第 d 个交易日的候选为 offsets[d]:offsets[d + 1]
+    """
+    scores = signal_df['total_score'].to_numpy(dtype=np.float64)
+    keep = signal_df['has_signal'].to_numpy(dtype=bool) & (scores >= min_score)
+    rows = np.flatnonzero(keep)
+
+    date_idx = label_positions(signal_df['trade_date'].iloc[rows], prices.dates)
+    stock_idx = label_positions(signal_df['ts_code'].iloc[rows], prices.codes)
+    valid = (date_idx >= 0) & (stock_idx >= 0)
+    if require_price:
+        valid[valid] = prices.present[date_idx[valid], stock_idx[valid]]
+    rows, date_idx, stock_idx = rows[valid], date_idx[valid], stock_idx[valid]
+    return order_candidates(date_idx, stock_idx, rows, scores[rows], len(prices.dates))
+
+
+def order_candidates(
+    date_idx: np.ndarray,
+    stock_idx: np.ndarray,
+    rows: np.ndarray,
+    scores: np.ndarray,
+    n_dates: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    候选行按 (交易日, -得分, 行号) 排列并按交易日分段
+
+    Args:
+        date_idx / stock_idx: 候选行的交易日、股票位置
+        rows: 候选行的行号（得分相同时的顺序）
+        scores: 候选行的综合得分
+        n_dates: 交易日数量
+
+    Returns:
+        (offsets[n_dates + 1], 股票位置, 行号)
+    """
+    order = np.lexsort((rows, -scores, date_idx))
+    offsets = np.searchsorted(date_idx[order], np.arange(n_dates + 1))
+    return offsets.astype(np.int64), stock_idx[order].astype(np.int64), rows[order].astype(np.int64)
+
+
+# ============== 逐日模拟 ==============
+
+def _buy_candidates(
+    fill, present, no_buy, cand_offsets, cand_stocks, signal_day, d, cash, n_pos, n_trades,
+    max_positions, position_size, min_position_value, commission_rate, slippage,
+    slot_stock, slot_shares, slot_buy_price, slot_value, slot_profit_pct, slot_hold, slot_buy_day, held,
+    t_kind, t_day, t_stock, t_price, t_shares, t_amount, t_cand
+):
+    """第 d 天按 signal_day 的候选顺序以 fill 价买入，跳过已持仓、无价格与涨停不可买的股票"""
+    for c in range(cand_offsets[signal_day], cand_offsets[signal_day + 1]):
+        if n_pos >= max_positions:
+            break
+        s = cand_stocks[c]
+        if held[s] or not present[d, s] or no_buy[d, s]:
+            continue
+
+        price = fill[d, s]
+        shares = int(cash * position_size / price / 100) * 100
+        if shares * price < min_position_value:
+            shares = int(min_position_value / price / 100) * 100
+        actual_price = price * (1 + slippage)
+        amount = shares * actual_price
+        total_cost = amount + max(amount * commission_rate, 5.0)
+        if total_cost > cash:
+            shares = int(cash / (actual_price * (1 + commission_rate)) / 100) * 100
+            amount = shares * actual_price
+            total_cost = amount + max(amount * commission_rate, 5.0)
+        if shares <= 0:
+            continue
+
+        cash -= total_cost
+        t_kind[n_trades] = TRADE_BUY
+        t_day[n_trades] = d
+        t_stock[n_trades] = s
+        t_price[n_trades] = actual_price
+        t_shares[n_trades] = shares
+        t_amount[n_trades] = shares * price * (1 + slippage)
+        t_cand[n_trades] = c
+        n_trades += 1
+
+        slot_stock[n_pos] = s
+        slot_shares[n_pos] = shares
+        slot_buy_price[n_pos] = actual_price
+        slot_value[n_pos] = shares * price
+        slot_profit_pct[n_pos] = 0.0
+        slot_hold[n_pos] = 0
+        slot_buy_day[n_pos] = d
+        held[s] = True
+        n_pos += 1
+    return cash, n_pos, n_trades
+
+
+def _simulate(
+    close, open_, high, low, present, no_buy, no_sell_close, no_sell_intrabar, cand_offsets, cand_stocks,
+    next_open, intrabar,
+    initial_capital, max_positions, position_size, min_position_value,
+    commission_rate, stamp_duty_rate, slippage, max_hold_days, stop_loss_pct, take_profit_pct
+):
+    """
+    逐日模拟（numba 可编译的子集），运算顺序与 BacktestEngine 相同以保证结果一致
+
+    持仓按买入顺序保存在槽位数组中（卖出后保持剩余持仓的顺序），held 按股票位置标记是否持仓。
+    next_open 时第 d 天开盘买入第 d-1 天的候选；intrabar 时按最低/最高价触发止损/止盈。
+    """
+    n_dates, n_stocks = close.shape
+
+    # 持仓槽位
+    slot_stock = np.zeros(max_positions, dtype=np.int64)
+    slot_shares = np.zeros(max_positions, dtype=np.int64)
+    slot_buy_price = np.zeros(max_positions, dtype=np.float64)
+    slot_value = np.zeros(max_positions, dtype=np.float64)
+    slot_profit_pct = np.zeros(max_positions, dtype=np.float64)
+    slot_hold = np.zeros(max_positions, dtype=np.int64)
+    slot_buy_day = np.zeros(max_positions, dtype=np.int64)
+    slot_sell = np.zeros(max_positions, dtype=np.bool_)
+    slot_fill = np.zeros(max_positions, dtype=np.float64)
+    held = np.zeros(n_stocks, dtype=np.bool_)
+    n_pos = 0
+    cash = initial_capital
+
+    # 每日市值
+    day_cash = np.zeros(n_dates, dtype=np.float64)
+    day_position_value = np.zeros(n_dates, dtype=np.float64)
+    day_total_value = np.zeros(n_dates, dtype=np.float64)
+    day_position_count = np.zeros(n_dates, dtype=np.int64)
+
+    # 交易记录（买入次数不超过候选数与 交易日数 × 最大持仓数，卖出不超过买入）
+    capacity = 2 * min(len(cand_stocks), n_dates * max_positions) + 1
+    t_kind = np.zeros(capacity, dtype=np.int8)
+    t_day = np.zeros(capacity, dtype=np.int64)
+    t_stock = np.zeros(capacity, dtype=np.int64)
+    t_price = np.zeros(capacity, dtype=np.float64)
+    t_shares = np.zeros(capacity, dtype=np.int64)
+    t_amount = np.zeros(capacity, dtype=np.float64)
+    t_profit = np.zeros(capacity, dtype=np.float64)
+    t_profit_pct = np.zeros(capacity, dtype=np.float64)
+    t_cand = np.full(capacity, -1, dtype=np.int64)
+    n_trades = 0
+
+    for d in range(n_dates):
+        # 次日开盘买入：前一交易日的候选以今日开盘价成交
+        if next_open and d > 0:
+            cash, n_pos, n_trades = _buy_candidates(
+                open_, present, no_buy, cand_offsets, cand_stocks, d - 1, d, cash, n_pos, n_trades,
+                max_positions, position_size, min_position_value, commission_rate, slippage,
+                slot_stock, slot_shares, slot_buy_price, slot_value, slot_profit_pct, slot_hold, slot_buy_day, held,
+                t_kind, t_day, t_stock, t_price, t_shares, t_amount, t_cand
+            )
+
+        # 更新持仓市值
+        for k in range(n_pos):
+            s = slot_stock[k]
+            if present[d, s]:
+                value = slot_shares[k] * close[d, s]
+                cost = slot_shares[k] * slot_buy_price[k]
+                slot_value[k] = value
+                slot_profit_pct[k] = (value - cost) / cost
+
+        position_value = 0.0
+        for k in range(n_pos):
+            position_value += slot_value[k]
+        day_cash[d] = cash
+        day_position_value[d] = position_value
+        day_total_value[d] = cash + position_value
+        day_position_count[d] = n_pos
+
+        # 卖出信号：止损 → 止盈 → 最大持仓天数（当日无价格、跌停不可卖的持仓保留）
+        for k in range(n_pos):
+            slot_sell[k] = False
+            s = slot_stock[k]
+            if slot_buy_day[k] == d:
+                continue    # 当日开盘买入，T+1
+            slot_hold[k] += 1
+            if not present[d, s]:
+                continue
+
+            hit = False
+            if intrabar:
+                stop_price = slot_buy_price[k] * (1 + stop_loss_pct)
+                take_price = slot_buy_price[k] * (1 + take_profit_pct)
+                if low[d, s] <= stop_price:
+                    hit = True
+                    slot_fill[k] = min(open_[d, s], stop_price)
+                elif high[d, s] >= take_price:
+                    hit = True
+                    slot_fill[k] = max(open_[d, s], take_price)
+                if hit:
+                    slot_sell[k] = not no_sell_intrabar[d, s]
+                    continue
+            elif slot_profit_pct[k] <= stop_loss_pct or slot_profit_pct[k] >= take_profit_pct:
+                hit = True
+            if hit or slot_hold[k] >= max_hold_days:
+                slot_fill[k] = close[d, s]
+                slot_sell[k] = not no_sell_close[d, s]
+
+        # 执行卖出，剩余持仓保持原顺序
+        kept = 0
+        for k in range(n_pos):
+            s = slot_stock[k]
+            if slot_sell[k]:
+                actual_price = slot_fill[k] * (1 - slippage)
+                amount = slot_shares[k] * actual_price
+                commission = max(amount * commission_rate, 5.0)
+                net_amount = amount - (commission + amount * stamp_duty_rate)
+                cash += net_amount
+                cost = slot_shares[k] * slot_buy_price[k]
+                t_kind[n_trades] = TRADE_SELL
+                t_day[n_trades] = d
+                t_stock[n_trades] = s
+                t_price[n_trades] = actual_price
+                t_shares[n_trades] = slot_shares[k]
+                t_amount[n_trades] = amount
+                t_profit[n_trades] = net_amount - cost
+                t_profit_pct[n_trades] = (net_amount - cost) / cost
+                n_trades += 1
+                held[s] = False
+            else:
+                slot_stock[kept] = slot_stock[k]
+                slot_shares[kept] = slot_shares[k]
+                slot_buy_price[kept] = slot_buy_price[k]
+                slot_value[kept] = slot_value[k]
+                slot_profit_pct[kept] = slot_profit_pct[k]
+                slot_hold[kept] = slot_hold[k]
+                slot_buy_day[kept] = slot_buy_day[k]
+                kept += 1
+        n_pos = kept
+
+        # 收盘买入：当日候选以收盘价成交
+        if not next_open:
+            cash, n_pos, n_trades = _buy_candidates(
+                close, present, no_buy, cand_offsets, cand_stocks, d, d, cash, n_pos, n_trades,
+                max_positions, position_size, min_position_value, commission_rate, slippage,
+                slot_stock, slot_shares, slot_buy_price, slot_value, slot_profit_pct, slot_hold, slot_buy_day, held,
+                t_kind, t_day, t_stock, t_price, t_shares, t_amount, t_cand
+            )
+
+    # 清算剩余持仓
+    if n_dates > 0:
+        d = n_dates - 1
+        for k in range(n_pos):
+            s = slot_stock[k]
+            if present[d, s]:
+                actual_price = close[d, s] * (1 - slippage)
+                amount = slot_shares[k] * actual_price
+                commission = max(amount * commission_rate, 5.0)
+                net_amount = amount - (commission + amount * stamp_duty_rate)
+                cash += net_amount
+                cost = slot_shares[k] * slot_buy_price[k]
+                t_kind[n_trades] = TRADE_SELL_END
+                t_day[n_trades] = d
+                t_stock[n_trades] = s
+                t_price[n_trades] = actual_price
+                t_shares[n_trades] = slot_shares[k]
+                t_amount[n_trades] = amount
+                t_profit[n_trades] = net_amount - cost
+                t_profit_pct[n_trades] = (net_amount - cost) / cost
+                n_trades += 1
+
+    return (day_cash, day_position_value, day_total_value, day_position_count,
+            t_kind[:n_trades], t_day[:n_trades], t_stock[:n_trades], t_price[:n_trades], t_shares[:n_trades],
+            t_amount[:n_trades], t_profit[:n_trades], t_profit_pct[:n_trades], t_cand[:n_trades])
+
+
+_compiled_kernel = None
+
+
+def _get_kernel(jit: bool):
+    """numba 编译后的模拟函数，未安装 numba 或 jit 为 False 时返回 Python 版本"""
+    global _compiled_kernel
+    if not jit:
+        return _simulate
+    if _compiled_kernel is None:
+        try:
+            import numba
+            from numba.extending import register_jitable
+            register_jitable(_buy_candidates)   # 编译版 _simulate 内调用，Python 版本保持不变
+            _compiled_kernel = numba.njit(cache=True)(_simulate)
+        except ImportError:
+            logger.info("未安装 numba，数组化回测以 Python 循环执行")
+            _compiled_kernel = _simulate
+    return _compiled_kernel
+
+
+def simulate(
+    bars: Dict[str, np.ndarray],
+    present: np.ndarray,
+    cand_offsets: np.ndarray,
+    cand_stocks: np.ndarray,
+    config: BacktestConfig,
+    jit: bool = True
+) -> Tuple[np.ndarray, ...]:
+    """
+    按候选股票逐日模拟
+
+    Args:
+        bars: 成交模型数组（见 execution_bars，按 config.execution 的成交模型计算）
+        present: [n_dates, n_stocks] 当日是否有价格
+        cand_offsets / cand_stocks: 每日买入候选（见 order_candidates），次日开盘买入时为信号日的候选
+        config: 回测配置
+        jit: 可用时以 numba 编译逐日循环
+
+    Returns:
+        (每日现金, 持仓市值, 总市值, 持仓数, 交易类型, 交易日位置, 股票位置, 价格, 股数, 金额, 盈亏, 盈亏比例, 候选位置)
+    """
+    model = get_execution_model(config.execution)
+    return _get_kernel(jit)(
+        bars['close'], bars['open'], bars['high'], bars['low'], present,
+        bars['no_buy'], bars['no_sell_close'], bars['no_sell_intrabar'], cand_offsets, cand_stocks,
+        model.entry == 'next_open', model.exit == 'intrabar',
+        float(config.initial_capital), int(config.max_positions), float(config.position_size),
+        float(config.min_position_value), float(config.commission_rate), float(config.stamp_duty_rate),
+        float(config.slippage), int(config.max_hold_days), float(config.stop_loss_pct),
+        float(config.take_profit_pct)
+    )
+
+
+def result_frames(
+    result: Tuple[np.ndarray, ...],
+    dates: List[str],
+    codes: List[str],
+    buy_labels: Optional[np.ndarray] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    模拟结果转为 (每日市值, 交易记录)，字段同 BacktestEngine
+
+    Args:
+        result: simulate 的返回值
+        dates / codes: 交易日、股票代码（与价格数组的行、列对应）
+        buy_labels: 各候选位置的信号类型（买入原因为 "信号: 类型"），None 时买入原因为空字符串
+    """
+    (day_cash, day_position_value, day_total_value, day_position_count,
+     t_kind, t_day, t_stock, t_price, t_shares, t_amount, t_profit, t_profit_pct, t_cand) = result
+
+    dates = np.asarray(dates, dtype=object)
+    values_df = pd.DataFrame({
+        'trade_date': dates,
+        'cash': day_cash,
+        'position_value': day_position_value,
+        'total_value': day_total_value,
+        'position_count': day_position_count,
+    })
+
+    trades_df = pd.DataFrame()
+    if len(t_kind) > 0:
+        reasons = np.array([
+            (f"信号: {buy_labels[cand]}" if buy_labels is not None else '') if kind == TRADE_BUY
+            else SELL_REASONS[kind]
+            for kind, cand in zip(t_kind.tolist(), t_cand.tolist())
+        ], dtype=object)
+        trades_df = pd.DataFrame({
+            'ts_code': np.asarray(codes, dtype=object)[t_stock],
+            'trade_type': np.where(t_kind == TRADE_BUY, 'buy', 'sell').astype(object),
+            'trade_date': dates[t_day],
+            'price': t_price,
+            'shares': t_shares,
+            'amount': t_amount,
+            'profit': t_profit,
+            'profit_pct': t_profit_pct,
+            'reason': reasons,
+        })
+    return values_df, trades_df
+
+
+# ============== 回测入口 ==============
+
+def run_vector_backtest(
+    signal_df: pd.DataFrame,
+    prices: PriceIndex,
+    config: BacktestConfig,
+    min_score: float = 0.5,
+    jit: bool = True
+) -> Dict:
+    """
+    数组化回测
+
+    Args:
+        signal_df: 已检测信号的数据（detect_signals / load_signal_frame 的结果）
+        prices: 回测区间的价格索引，交易日即回测交易日
+        config: 回测配置
+        min_score: 最小信号得分
+        jit: 可用时以 numba 编译逐日循环
+
+    Returns:
+        回测绩效，格式同 BacktestEngine.run_backtest
+    """
+    model = get_execution_model(config.execution)
+    cand_offsets, cand_stocks, cand_rows = build_candidates(signal_df, prices, min_score,
+                                                            require_price=model.entry == 'close')
+    bars = execution_bars(prices.arrays(), model)
+    result = simulate(bars, prices.present, cand_offsets, cand_stocks, config, jit)
+
+    buy_labels = signal_df['signal_types'].to_numpy()[cand_rows]
+    values_df, trades_df = result_frames(result, prices.dates, prices.codes, buy_labels)
+    return calculate_performance(values_df, trades_df, config.initial_capital)
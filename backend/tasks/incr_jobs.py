@@ -288,6 +288,15 @@ def import_daily_sector_limit_data(start_date: str, end_date: str):
         logger.error(f"计算板块涨跌停数据出错: {e}")
 
 
+def refresh_daily_cache():
+    """增量刷新本地行情缓存中的日线数据（未建立缓存时跳过）"""
+    try:
+        from strategy.market_cache import refresh_market_cache
+        refresh_market_cache(['daily_data'], skip_missing=True)
+    except Exception as e:
+        logger.error(f"刷新日线缓存出错: {e}")
+
+
 def run_incr_jobs():
     """运行所有增量任务"""
     today = datetime.now().strftime('%Y%m%d')
@@ -298,5 +307,6 @@ def run_incr_jobs():
     import_daily_limit_data(today, today)
     import_hm_detail_data(today, today)
     import_daily_sector_limit_data(today, today)
+    refresh_daily_cache()
 
     logger.info("========== 增量任务执行完成 ==========")
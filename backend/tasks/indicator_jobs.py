@@ -11,6 +11,15 @@ from app.core.logging import setup_logging
 setup_logging()
 
 
+def refresh_indicator_cache(full: bool = False):
+    """刷新本地行情缓存中的指标数据（未建立缓存时跳过）"""
+    try:
+        from strategy.market_cache import refresh_market_cache
+        refresh_market_cache(['daily_indicator'], full=full, skip_missing=True)
+    except Exception as e:
+        logger.error(f"刷新指标缓存出错: {e}")
+
+
 def run_indicator_incremental_job():
     """运行增量指标计算（每天执行）"""
     logger.info("开始执行增量指标计算...")
@@ -20,6 +29,14 @@ def run_indicator_incremental_job():
         logger.info(f"增量指标计算完成: 成功={result['success']}, 错误={result['error']}, 耗时={result['elapsed_seconds']:.1f}秒")
     except Exception as e:
         logger.error(f"增量指标计算失败: {e}")
+        return
+
+    refresh_indicator_cache()
+
+    # 指标更新后生成最新交易日的信号，并物化新交易日的信号
+    from .signal_jobs import run_signal_job, run_signal_materialize_job
+    run_signal_job()
+    run_signal_materialize_job()
 
 
 def run_indicator_full_job():
@@ -31,3 +48,6 @@ def run_indicator_full_job():
         logger.info(f"全量指标计算完成: 成功={result['success']}, 错误={result['error']}, 总记录={result['total_records']}, 耗时={result['elapsed_seconds']:.1f}秒")
     except Exception as e:
         logger.error(f"全量指标计算失败: {e}")
+        return
+
+    refresh_indicator_cache(full=True)
@@ -0,0 +1,22 @@
+"""
+面板存储定时任务
+在指标计算完成后重建内存映射面板存储
+"""
+from loguru import logger
+from strategy.panel_store import build_panel_store
+from app.core.database import engine
+from app.core.logging import setup_logging
+
+# 初始化日志配置
+setup_logging()
+
+
+def run_panel_store_job():
+    """重建内存映射面板存储（每天执行）"""
+    logger.info("开始构建面板存储...")
+
+    try:
+        result = build_panel_store(engine)
+        logger.info(f"面板存储构建完成: 交易日={result['dates']}, 股票={result['stocks']}, 字段={result['fields']}")
+    except Exception as e:
+        logger.error(f"面板存储构建失败: {e}")
@@ -66,7 +66,7 @@ def start_scheduler():
         replace_existing=True
     )
 
-    # 交易日 20:00 执行增量指标计算（在日线数据更新后）
+    # 交易日 20:00 执行增量指标计算（在日线数据更新后），完成后生成最新交易日信号并物化信号表
     scheduler.add_job(
         lambda: __import__('tasks.indicator_jobs', fromlist=['run_indicator_incremental_job']).run_indicator_incremental_job(),
         CronTrigger(hour=20, minute=0),
@@ -84,6 +84,15 @@ def start_scheduler():
         replace_existing=True
     )
 
+    # 每天 21:00 重建面板存储（在增量指标计算后；周日包含全量指标计算结果）
+    scheduler.add_job(
+        lambda: __import__('tasks.panel_jobs', fromlist=['run_panel_store_job']).run_panel_store_job(),
+        CronTrigger(hour=21, minute=0),
+        id='panel_store_job',
+        name='面板存储构建',
+        replace_existing=True
+    )
+
     # 交易日 18:00 执行每日基本面数据采集（在日线数据更新后）
     scheduler.add_job(
         lambda: __import__('tasks.basic_jobs', fromlist=['run_basic_incremental_job']).run_basic_incremental_job(),
@@ -118,8 +127,9 @@ def start_scheduler():
     logger.info("  - 增量任务: 交易日 17:00, 19:00")
     logger.info("  - 周K线导入: 每周日 04:00")
     logger.info("  - 月K线导入: 每月1号 05:00")
-    logger.info("  - 增量指标计算: 每天 20:00")
+    logger.info("  - 增量指标计算: 每天 20:00 (完成后生成当日信号并物化信号表)")
     logger.info("  - 全量指标计算: 每周日 06:00")
+    logger.info("  - 面板存储构建: 每天 21:00")
     logger.info("  - 增量基本面数据采集: 每天 18:00")
     logger.info("  - 增量财务指标采集: 每季度首月15日 02:00")
     logger.info("  - 全量基本面数据补充: 每月1号 03:30")
@@ -0,0 +1,61 @@
+"""
+信号生成定时任务
+在增量指标计算完成后，生成最新交易日的信号并增量物化到 daily_signal
+"""
+import os
+from typing import Optional
+from loguru import logger
+from sqlalchemy import text
+from strategy.strategy_store import get_signal_engine
+from app.core.database import engine
+from app.core.logging import setup_logging
+
+# 初始化日志配置
+setup_logging()
+
+# 信号结果输出目录（相对 backend 目录）
+SIGNAL_OUTPUT_DIR = 'strategy/signal_results'
+
+
+def run_signal_job(trade_date: Optional[str] = None, top_n: int = 50):
+    """
+    生成指定交易日（默认最新交易日）的信号并保存为 CSV
+
+    Args:
+        trade_date: 交易日期 (YYYYMMDD)，None 表示 daily_indicator 中的最新交易日
+        top_n: 保存的股票数量（按综合得分排序）
+    """
+    logger.info("开始生成每日信号...")
+
+    try:
+        if trade_date is None:
+            with engine.connect() as conn:
+                trade_date = conn.execute(text("SELECT MAX(trade_date) FROM daily_indicator")).scalar()
+            if trade_date is None:
+                logger.warning("daily_indicator 没有数据，跳过信号生成")
+                return
+
+        os.makedirs(SIGNAL_OUTPUT_DIR, exist_ok=True)
+        for date, signals in get_signal_engine().iter_signals(engine, trade_date, trade_date, top_n=top_n):
+            path = os.path.join(SIGNAL_OUTPUT_DIR, f'signals_{date}.csv')
+            signals.to_csv(path, index=False, encoding='utf-8-sig')
+            logger.info(f"{date} 信号生成完成: {len(signals)} 只股票, 已保存到 {path}")
+            for row in signals.head(10).itertuples(index=False):
+                logger.info(f"  {row.rank}. {row.ts_code} 得分={row.total_score:.2f} 信号={row.signal_types}")
+    except Exception as e:
+        logger.error(f"信号生成失败: {e}")
+
+
+def run_signal_materialize_job():
+    """增量物化全部策略（内置 + 策略目录）的信号（只计算新交易日，策略定义变化时重算该策略）"""
+    from strategy.signal_store import materialize_signals
+
+    logger.info("开始物化每日信号...")
+
+    try:
+        signal_engine = get_signal_engine()
+        result = materialize_signals(engine, engine=signal_engine)
+        logger.info(f"信号物化完成: 策略={result['strategies']}, 重算={result['rebuilt']}, "
+                    f"交易日={result['days']}, 写入={result['rows']} 行")
+    except Exception as e:
+        logger.error(f"信号物化失败: {e}")